@@ -0,0 +1,274 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import wraps
+import numpy as np
+from database import _como_data
+from cache import PREFIXOS_ESCRITA
+from series_diarias import COLUNAS, CacheSeriesDiarias, serie_densa
+
+DIRETORIO_PADRAO = os.path.join(os.path.expanduser("~"), ".tabacaria")
+INTERVALO_SINCRONIZACAO = 30.0
+MARGEM_DIAS = 1
+
+
+def _centavos(valor):
+    return int((Decimal(valor) * 100).to_integral_value())
+
+
+class AgregadosLocais:
+    def __init__(self, caminho, identidade, intervalo=INTERVALO_SINCRONIZACAO):
+        self.caminho = caminho
+        self.identidade = identidade
+        self.intervalo = intervalo
+        self.pendente = True
+        self.revisao = 0
+        self._ultima_sincronizacao = 0.0
+        self._lock = threading.RLock()
+        self.series = CacheSeriesDiarias(self._buscar_fechados)
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(caminho, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (
+                chave TEXT PRIMARY KEY,
+                valor TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS agregados (
+                dia TEXT NOT NULL,
+                produto_id INTEGER NOT NULL,
+                categoria TEXT,
+                qtd INTEGER NOT NULL,
+                receita_centavos INTEGER NOT NULL,
+                num_vendas INTEGER NOT NULL,
+                PRIMARY KEY (dia, produto_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_agregados_categoria_dia ON agregados (categoria, dia);
+        """)
+        self._meta = dict(self.conn.execute("SELECT chave, valor FROM meta").fetchall())
+        if self._meta.get('identidade') != identidade:
+            with self.conn:
+                self.conn.execute("DELETE FROM agregados")
+                self.conn.execute("DELETE FROM meta")
+            self._meta = {}
+
+    @property
+    def fechado_ate(self):
+        valor = self._meta.get('fechado_ate')
+        return date.fromisoformat(valor) if valor else None
+
+    def _gravar_meta(self, **valores):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO meta (chave, valor) VALUES (?, ?)",
+            [(chave, str(valor)) for chave, valor in valores.items()]
+        )
+
+    def sincronizar(self, db, forcar=False):
+        with self._lock:
+            agora = time.monotonic()
+            if not (forcar or self.pendente or agora - self._ultima_sincronizacao >= self.intervalo):
+                return 0
+            self.pendente = False
+            try:
+                return self._sincronizar(db, agora)
+            except Exception:
+                self.pendente = True
+                raise
+
+    def _sincronizar(self, db, agora):
+        with db.cursor() as cursor:
+            cursor.execute("""
+                SELECT CURRENT_DATE,
+                    txid_snapshot_xmin(txid_current_snapshot()),
+                    (SELECT COALESCE(MAX(id), 0) FROM vendas),
+                    (SELECT COALESCE(MAX(versao), 0) FROM vendas_dias_alterados),
+                    (SELECT MAX(xid) FROM vendas_dias_alterados WHERE dia = '-infinity')
+            """)
+            hoje, xmin, max_id, max_versao, xid_truncate = cursor.fetchone()
+            fechado_ate = self.fechado_ate
+            local_id = int(self._meta.get('max_id', 0))
+            local_versao = int(self._meta.get('max_versao', 0))
+            local_xmin = self._meta.get('xmin')
+            completo = (fechado_ate is None or local_xmin is None or max_id < local_id
+                        or max_versao < local_versao
+                        or (xid_truncate is not None and xid_truncate >= int(local_xmin)))
+            if completo:
+                dias = []
+                inicio = None
+                cursor.execute("""
+                    SELECT dia, produto_id, categoria, qtd, receita, num_vendas
+                    FROM vendas_diarias
+                    WHERE dia < %s
+                """, (hoje,))
+            else:
+                cursor.execute("""
+                    SELECT dia FROM vendas_dias_alterados
+                    WHERE xid >= %s AND dia <> '-infinity' AND dia < %s
+                """, (int(local_xmin), hoje))
+                dias = [row[0] for row in cursor.fetchall()]
+                inicio = fechado_ate - timedelta(days=MARGEM_DIAS)
+                cursor.execute("""
+                    SELECT dia, produto_id, categoria, qtd, receita, num_vendas
+                    FROM vendas_diarias
+                    WHERE dia < %s AND (dia >= %s OR dia = ANY(%s))
+                """, (hoje, inicio, dias))
+            linhas = cursor.fetchall()
+
+        with self.conn:
+            if completo:
+                self.conn.execute("DELETE FROM agregados")
+            else:
+                self.conn.execute("DELETE FROM agregados WHERE dia >= ? AND dia < ?",
+                                  (inicio.isoformat(), hoje.isoformat()))
+                self.conn.executemany("DELETE FROM agregados WHERE dia = ?", [(dia.isoformat(),) for dia in dias])
+            self.conn.executemany("""
+                INSERT OR REPLACE INTO agregados (dia, produto_id, categoria, qtd, receita_centavos, num_vendas)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(dia.isoformat(), produto_id, categoria, int(qtd), _centavos(receita), int(num_vendas))
+                  for dia, produto_id, categoria, qtd, receita, num_vendas in linhas])
+            self._meta.update(
+                identidade=self.identidade, fechado_ate=hoje.isoformat(),
+                max_id=str(max_id), max_versao=str(max_versao), xmin=str(xmin)
+            )
+            self._gravar_meta(**self._meta)
+        if completo:
+            self.series.limpar()
+        else:
+            self.series.invalidar(dias)
+            self.series.cortar(inicio)
+        if completo or dias or max_id != local_id:
+            self.revisao += 1
+        self._ultima_sincronizacao = agora
+        return len(linhas)
+
+    def _buscar_fechados(self, inicio, fim, categoria):
+        conditions = ["dia BETWEEN ? AND ?"]
+        params = [inicio.isoformat(), fim.isoformat()]
+        if categoria:
+            conditions.append("categoria = ?")
+            params.append(categoria)
+        with self._lock:
+            rows = self.conn.execute(f"""
+                SELECT dia, SUM(qtd), SUM(receita_centavos), SUM(num_vendas)
+                FROM agregados
+                WHERE {' AND '.join(conditions)}
+                GROUP BY dia
+            """, params).fetchall()
+        return [(date.fromisoformat(dia), qtd, receita, num_vendas) for dia, qtd, receita, num_vendas in rows]
+
+    def por_dia(self, db, data_inicio, data_fim, categoria=None):
+        self.sincronizar(db)
+        inicio = _como_data(data_inicio)
+        fim = _como_data(data_fim)
+        if fim < inicio:
+            return inicio, np.zeros((0, len(COLUNAS)), dtype=np.int64)
+        with self._lock:
+            fechado_ate = self.fechado_ate
+            fechados = self.series.obter(inicio, min(fim, fechado_ate - timedelta(days=1)), categoria)
+        if fim < fechado_ate:
+            return inicio, fechados
+        abertos_inicio = max(inicio, fechado_ate)
+        conditions = ["dia BETWEEN %s AND %s"]
+        params = [abertos_inicio, fim]
+        if categoria:
+            conditions.append("categoria = %s")
+            params.append(categoria)
+        with db.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT dia, SUM(qtd), SUM(receita), SUM(num_vendas)
+                FROM vendas_diarias
+                WHERE {' AND '.join(conditions)}
+                GROUP BY dia
+            """, tuple(params))
+            linhas = [(dia, qtd, _centavos(receita), num_vendas) for dia, qtd, receita, num_vendas in cursor.fetchall()]
+        return inicio, np.concatenate([fechados, serie_densa(abertos_inicio, fim, linhas)])
+
+    def fechar(self):
+        with self._lock:
+            self.conn.close()
+
+
+def _reais(centavos):
+    return Decimal(int(centavos)).scaleb(-2)
+
+
+def _dias(inicio, valores):
+    return np.datetime64(inicio, 'D') + np.arange(len(valores))
+
+
+def _agrupar(valores, chaves):
+    presentes = valores[:, 2] > 0
+    grupos, indices = np.unique(chaves[presentes], return_inverse=True)
+    somas = np.zeros(len(grupos), dtype=np.int64)
+    np.add.at(somas, indices, valores[presentes, 1])
+    return grupos, somas
+
+
+def _como_datetime(dia):
+    return datetime.combine(dia.astype('datetime64[D]').astype(date), datetime.min.time())
+
+
+def ativar_agregados_locais(db, diretorio=DIRETORIO_PADRAO):
+    identidade = f"{db.host}:{db.port}/{db.dbname}"
+    nome = hashlib.sha1(identidade.encode()).hexdigest()[:12]
+    agregados = AgregadosLocais(os.path.join(diretorio, f"agregados_{nome}.sqlite"), identidade)
+    db.agregados = agregados
+
+    def get_vendas_por_periodo(data_inicio, data_fim, categoria=None):
+        inicio, valores = agregados.por_dia(db, data_inicio, data_fim, categoria)
+        return [(inicio + timedelta(days=int(i)), _reais(valores[i, 1])) for i in np.flatnonzero(valores[:, 2] > 0)]
+
+    def get_receita_por_periodo(data_inicio, data_fim, agrupamento='dia', categoria=None):
+        if agrupamento not in ('semana', 'mes'):
+            return get_vendas_por_periodo(data_inicio, data_fim, categoria)
+        inicio, valores = agregados.por_dia(db, data_inicio, data_fim, categoria)
+        dias = _dias(inicio, valores)
+        if agrupamento == 'semana':
+            chaves = dias - (dias.astype(np.int64) + 3) % 7
+        else:
+            chaves = dias.astype('datetime64[M]').astype('datetime64[D]')
+        grupos, somas = _agrupar(valores, chaves)
+        return [(_como_datetime(grupo), _reais(soma)) for grupo, soma in zip(grupos, somas)]
+
+    def get_vendas_por_dia_semana(data_inicio, data_fim, categoria=None):
+        inicio, valores = agregados.por_dia(db, data_inicio, data_fim, categoria)
+        dias_semana = (_dias(inicio, valores).astype(np.int64) + 4) % 7
+        grupos, somas = _agrupar(valores, dias_semana)
+        return [(int(grupo), _reais(soma)) for grupo, soma in zip(grupos, somas)]
+
+    def get_total_vendas_periodo(data_inicio, data_fim, categoria=None):
+        _, valores = agregados.por_dia(db, data_inicio, data_fim, categoria)
+        return _reais(valores[:, 1].sum()) or 0
+
+    def get_numero_vendas_periodo(data_inicio, data_fim, categoria=None):
+        _, valores = agregados.por_dia(db, data_inicio, data_fim, categoria)
+        return int(valores[:, 2].sum())
+
+    def get_ticket_medio(data_inicio, data_fim, categoria=None):
+        _, valores = agregados.por_dia(db, data_inicio, data_fim, categoria)
+        num_vendas = int(valores[:, 2].sum())
+        if not num_vendas:
+            return 0
+        return _reais(valores[:, 1].sum()) / num_vendas
+
+    for funcao in (get_vendas_por_periodo, get_receita_por_periodo, get_vendas_por_dia_semana,
+                   get_total_vendas_periodo, get_numero_vendas_periodo, get_ticket_medio):
+        setattr(db, funcao.__name__, funcao)
+
+    for nome in dir(type(db)):
+        if nome.startswith(PREFIXOS_ESCRITA):
+            setattr(db, nome, _escrita_sincronizante(agregados, getattr(db, nome)))
+    return db
+
+
+def _escrita_sincronizante(agregados, metodo):
+    @wraps(metodo)
+    def sincronizante(*args, **kwargs):
+        try:
+            return metodo(*args, **kwargs)
+        finally:
+            agregados.pendente = True
+    return sincronizante
@@ -2,70 +2,110 @@ from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
     QLineEdit, QLabel, QComboBox, QDateEdit, QGroupBox, QGridLayout, QScrollArea, QTabWidget
 )
-from PyQt6.QtCore import Qt, QDate
+from PyQt6.QtCore import Qt, QDate, QThreadPool
 from PyQt6.QtGui import QFont
-from database import Database
+from database import Database, TokenCancelamento, ContextoConsulta, variacao_percentual
+from tarefas import TarefaConsulta
 from datetime import datetime
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
+from collections import OrderedDict
+from functools import partial
+from graficos import Grafico
+from lod import agrupamento_adaptativo, indices_reduzidos, PIXELS_POR_PONTO, PIXELS_POR_MARCADOR, PIXELS_POR_BARRA
+from cache import tamanho_aproximado
 import numpy as np
 
+ORCAMENTO_PREFETCH = 32 * 1024 * 1024
+PRIORIDADE_PREFETCH = -1
+
+ROTULOS_AGRUPAMENTO = {'dia': "Dia", 'semana': "Semana", 'mes': "Mês"}
+
+DIAS_SEMANA = ['Dom', 'Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb']
+
+CARDS_DASHBOARD = [
+    ("Total de Vendas", 'num_vendas', "{}"),
+    ("Receita Total", 'receita', "R$ {:,.2f}"),
+    ("Ticket Médio", 'ticket_medio', "R$ {:,.2f}"),
+    ("Clientes", 'clientes', "{}"),
+    ("Unidades Vendidas", 'unidades', "{}")
+]
+
 class AnaliseWidget(QWidget):
-    def __init__(self, db: Database):
+    def __init__(self, db: Database, orcamento_prefetch=ORCAMENTO_PREFETCH, renderizador=None):
         super().__init__()
         self.db = db
+        self.orcamento_prefetch = orcamento_prefetch
+        self.renderizador = renderizador
+        self.pool_tarefas = QThreadPool()
+        self.pool_tarefas.setMaxThreadCount(max(1, db.pool_max - 1))
+        self._geracao = 0
+        self._contexto = ContextoConsulta()
+        self._token = None
+        self._pendente = None
+        self.graficos = {}
+        self._montados = set()
+        self._renderizadas = {}
+        self._prefetch = OrderedDict()
+        self._prefetch_bytes = 0
+        self._prefetch_ignorados = set()
+        self._token_prefetch = None
         self.init_ui()
 
-    def _criar_grafico_vazio(self, titulo, figsize=(8, 4)):
-        fig = Figure(figsize=figsize)
-        canvas = FigureCanvas(fig)
-        ax = fig.add_subplot(111)
-        ax.text(0.5, 0.5, "Sem dados", ha='center', va='center', transform=ax.transAxes)
-        ax.set_title(titulo)
-        fig.tight_layout()
-        return canvas
-
-    def _criar_grafico_linha(self, dados, titulo, xlabel, ylabel, figsize=(8, 4), mostrar_tendencia=True):
-        fig = Figure(figsize=figsize)
-        canvas = FigureCanvas(fig)
-        ax = fig.add_subplot(111)
-        if dados:
-            datas = [d[0] for d in dados]
-            valores = [float(d[1]) for d in dados]
-            ax.plot(datas, valores, marker='o', linewidth=2, markersize=4)
+    def _grafico(self, nome, figsize=(8, 4), subplots=(111,)):
+        grafico = self.graficos.get(nome)
+        if grafico is None:
+            grafico = Grafico(figsize, subplots, self.renderizador)
+            self.graficos[nome] = grafico
+        return grafico
+
+    def _montar(self, nome, widget, montar):
+        if nome not in self._montados:
+            montar(self._preparar_layout(widget))
+            self._montados.add(nome)
+
+    def _area_rolavel(self, conteudo):
+        scroll_widget = QWidget()
+        scroll_widget.setLayout(conteudo)
+        scroll_area = QScrollArea()
+        scroll_area.setWidget(scroll_widget)
+        scroll_area.setWidgetResizable(True)
+        return scroll_area
+
+    def _atualizar_linha(self, grafico, dados, mostrar_tendencia=True):
+        grafico.iniciar()
+        if len(dados):
+            largura = grafico.largura_pixels()
+            indices = indices_reduzidos(dados, largura // PIXELS_POR_PONTO)
+            datas = dados['periodo'][indices]
+            valores = dados['receita']
+            marcador = 'o' if len(indices) <= largura // PIXELS_POR_MARCADOR else ''
+            grafico.linha('valores', datas, valores[indices], marker=marcador, linewidth=2, markersize=4)
             if len(valores) > 1 and mostrar_tendencia:
                 x_numeric = np.arange(len(valores))
-                z = np.polyfit(x_numeric, valores, 1)
-                p = np.poly1d(z)
-                ax.plot(datas, p(x_numeric), "r--", alpha=0.5, label="Tendência")
-                ax.legend()
-            ax.set_xlabel(xlabel)
-            ax.set_ylabel(ylabel)
-            ax.set_title(titulo)
-            ax.grid(True, alpha=0.3)
-            fig.autofmt_xdate()
+                p = np.poly1d(np.polyfit(x_numeric, valores, 1))
+                grafico.linha('tendencia', datas, p(x_numeric[indices]), linestyle='--', color='r', alpha=0.5, label="Tendência")
+            else:
+                grafico.ocultar('tendencia')
+            grafico.legenda()
         else:
-            ax.text(0.5, 0.5, "Sem dados", ha='center', va='center', transform=ax.transAxes)
-            ax.set_title(titulo)
-        fig.tight_layout()
-        return canvas
-
-    def _criar_grafico_barra_h(self, dados, titulo, xlabel, limite_nome=20, figsize=(8, 4)):
-        fig = Figure(figsize=figsize)
-        canvas = FigureCanvas(fig)
-        ax = fig.add_subplot(111)
-        if dados:
-            nomes = [d[0][:limite_nome] for d in dados]
-            valores = [int(d[1]) for d in dados]
-            ax.barh(nomes, valores)
-            ax.set_xlabel(xlabel)
-            ax.set_title(titulo)
-            ax.grid(True, alpha=0.3, axis='x')
+            grafico.vazio()
+        grafico.concluir()
+
+    def _atualizar_barra_h(self, grafico, dados, limite_nome=20):
+        grafico.iniciar()
+        if len(dados):
+            grafico.barras('valores', [nome[:limite_nome] for nome in dados['nome']], dados['total'])
         else:
-            ax.text(0.5, 0.5, "Sem dados", ha='center', va='center', transform=ax.transAxes)
-            ax.set_title(titulo)
-        fig.tight_layout()
-        return canvas
+            grafico.vazio()
+        grafico.concluir()
+
+    def _atualizar_dia_semana(self, grafico, dados):
+        grafico.iniciar()
+        if len(dados):
+            grafico.barras('valores', [DIAS_SEMANA[d] for d in dados['dia_semana']], dados['receita'],
+                           horizontal=False, alpha=0.7)
+        else:
+            grafico.vazio()
+        grafico.concluir()
 
     def init_ui(self):
         main_layout = QHBoxLayout()
@@ -107,11 +147,13 @@ class AnaliseWidget(QWidget):
         filters_layout.addWidget(self.categoria)
         
         update_btn = QPushButton("Atualizar")
-        update_btn.clicked.connect(self.on_filtro_changed)
+        update_btn.clicked.connect(self.atualizar_forcado)
         filters_layout.addWidget(update_btn)
         
         filters_group.setLayout(filters_layout)
         sidebar_layout.addWidget(filters_group)
+        self.status_carregamento = QLabel()
+        sidebar_layout.addWidget(self.status_carregamento)
         sidebar_layout.addStretch()
         
         main_layout.addWidget(sidebar)
@@ -121,160 +163,207 @@ class AnaliseWidget(QWidget):
         self.on_filtro_changed()
 
     def criar_tabs_categorias(self):
-        self.tabs_analises.currentChanged.connect(self.on_tab_changed)
-        
-        dashboard_tab = QWidget()
-        self.tabs_analises.addTab(dashboard_tab, "Dashboard")
+        self.vistas = {}
+        self.subtabs = {}
+        self._adicionar_vista(self.tabs_analises, "Dashboard", 'dashboard', 'carregar_dashboard', 'mostrar_dashboard')
+        self._adicionar_vista(self.tabs_analises, "Temporais", 'temporais', 'carregar_temporais', 'mostrar_temporais')
         
-        temporais_tab = QWidget()
-        self.tabs_analises.addTab(temporais_tab, "Temporais")
+        tabs_produtos = self._adicionar_subtabs("Produtos")
+        self._adicionar_vista(tabs_produtos, "Análise de Produtos", 'produtos', 'carregar_produtos', 'mostrar_produtos')
+        self._adicionar_vista(tabs_produtos, "Análise de Margem", 'margem', 'carregar_margem', 'mostrar_margem')
         
-        produtos_tab = QWidget()
-        self.tabs_analises.addTab(produtos_tab, "Produtos")
+        self._adicionar_vista(self.tabs_analises, "Estatísticas", 'estatisticas', 'carregar_estatisticas',
+                              'mostrar_estatisticas')
+        self._adicionar_vista(self.tabs_analises, "Estoque", 'estoque', 'carregar_estoque', 'mostrar_estoque')
         
-        estatisticas_tab = QWidget()
-        self.tabs_analises.addTab(estatisticas_tab, "Estatísticas")
+        tabs_clientes = self._adicionar_subtabs("Clientes")
+        self._adicionar_vista(tabs_clientes, "Visão Geral", 'clientes', 'carregar_clientes', 'mostrar_clientes',
+                              usa_categoria=False)
+        self._adicionar_vista(tabs_clientes, "Detalhes", 'clientes_detalhes', 'carregar_clientes_detalhes',
+                              'mostrar_clientes_detalhes', usa_categoria=False)
         
-        estoque_tab = QWidget()
-        self.tabs_analises.addTab(estoque_tab, "Estoque")
-        
-        clientes_tab = QWidget()
-        self.tabs_analises.addTab(clientes_tab, "Clientes")
+        self.tabs_analises.currentChanged.connect(self.on_tab_changed)
+        for tabs in self.subtabs.values():
+            tabs.currentChanged.connect(self.on_tab_changed)
+
+    def _adicionar_vista(self, tabs, titulo, nome, carregar, mostrar, usa_categoria=True):
+        widget = QWidget()
+        tabs.addTab(widget, titulo)
+        self.vistas[widget] = (nome, carregar, mostrar, usa_categoria)
+
+    def _adicionar_subtabs(self, titulo):
+        widget = QWidget()
+        layout = QVBoxLayout()
+        widget.setLayout(layout)
+        tabs = QTabWidget()
+        layout.addWidget(tabs)
+        self.tabs_analises.addTab(widget, titulo)
+        self.subtabs[widget] = tabs
+        return tabs
+
+    def _vista_atual(self):
+        widget = self.tabs_analises.currentWidget()
+        if widget in self.subtabs:
+            widget = self.subtabs[widget].currentWidget()
+        return widget, self.vistas.get(widget)
+
+    def marcar_desatualizadas(self):
+        self._renderizadas.clear()
+        self.cancelar_prefetch()
+        self._prefetch.clear()
+        self._prefetch_bytes = 0
+        self._prefetch_ignorados.clear()
 
     def load_categorias(self):
-        if not self.db.conn:
+        if not self.db.pool:
             return
         
         categorias = self.db.get_categorias()
+        self.categoria.blockSignals(True)
         self.categoria.clear()
         self.categoria.addItem("Todas")
         self.categoria.addItems(categorias)
+        self.categoria.blockSignals(False)
+
+    def atualizar_forcado(self):
+        if self.db.cache:
+            self.db.cache.invalidar()
+        if self.db.agregados:
+            self.db.agregados.pendente = True
+        if self.db.motor:
+            self.db.motor.invalidar()
+        self.marcar_desatualizadas()
+        self.on_filtro_changed()
 
     def on_tab_changed(self, index):
         self.on_filtro_changed()
 
-    def on_filtro_changed(self):
-        if not self.db.conn:
-            return
-        
+    def _argumentos(self):
         data_inicio = self.data_inicio.date().toPyDate()
         data_fim = self.data_fim.date().toPyDate()
         categoria = None if self.categoria.currentText() == "Todas" else self.categoria.currentText()
-        
-        current_tab = self.tabs_analises.currentIndex()
-        current_widget = self.tabs_analises.currentWidget()
-        
-        if not current_widget:
-            return
-        
-        if current_tab == 0:
-            self.mostrar_dashboard(current_widget, data_inicio, data_fim, categoria)
-        elif current_tab == 1:
-            self.mostrar_temporais(current_widget, data_inicio, data_fim, categoria)
-        elif current_tab == 2:
-            self.mostrar_produtos(current_widget, data_inicio, data_fim, categoria)
-        elif current_tab == 3:
-            self.mostrar_estatisticas(current_widget, data_inicio, data_fim, categoria)
-        elif current_tab == 4:
-            self.mostrar_estoque(current_widget, data_inicio, data_fim, categoria)
-        elif current_tab == 5:
-            self.mostrar_clientes(current_widget, data_inicio, data_fim, categoria)
-
-    def mostrar_dashboard(self, widget, data_inicio, data_fim, categoria):
-        layout = widget.layout()
-        if layout:
-            while layout.count():
-                item = layout.takeAt(0)
-                widget_item = item.widget()
-                if widget_item:
-                    widget_item.setParent(None)
-                    widget_item.deleteLater()
-        else:
-            layout = QVBoxLayout()
-            widget.setLayout(layout)
-        self.graph_layout = layout
-        self.show_dashboard_completo(data_inicio, data_fim, categoria)
+        return data_inicio, data_fim, categoria
 
-    def mostrar_temporais(self, widget, data_inicio, data_fim, categoria):
-        layout = widget.layout()
-        if layout:
-            while layout.count():
-                item = layout.takeAt(0)
-                widget_item = item.widget()
-                if widget_item:
-                    widget_item.setParent(None)
-                    widget_item.deleteLater()
-        else:
-            layout = QVBoxLayout()
-            widget.setLayout(layout)
-        self.graph_layout = layout
-        self.show_analises_temporais(data_inicio, data_fim, categoria)
+    def _filtros(self, usa_categoria):
+        data_inicio, data_fim, categoria = self._argumentos()
+        versao = self.db.cache.geracao if self.db.cache else None
+        return (data_inicio, data_fim, categoria if usa_categoria else None, versao)
 
-    def mostrar_produtos(self, widget, data_inicio, data_fim, categoria):
-        layout = widget.layout()
-        if layout:
-            while layout.count():
-                item = layout.takeAt(0)
-                widget_item = item.widget()
-                if widget_item:
-                    widget_item.setParent(None)
-                    widget_item.deleteLater()
-        else:
-            layout = QVBoxLayout()
-            widget.setLayout(layout)
+    def on_filtro_changed(self):
+        if not self.db.pool:
+            return
         
-        tabs_produtos = QTabWidget()
-        layout.addWidget(tabs_produtos)
+        widget, vista = self._vista_atual()
+        if vista is None:
+            return
+        nome, carregar, mostrar, usa_categoria = vista
+        carregar = getattr(self, carregar)
+        filtros = self._filtros(usa_categoria)
+        
+        self.cancelar_carregamento()
+        self.cancelar_prefetch()
+        self._geracao += 1
+        self._contexto = ContextoConsulta()
+        if self._renderizadas.get(nome) == filtros:
+            self.status_carregamento.setText("")
+            self.agendar_prefetch()
+            return
         
-        produtos_widget = QWidget()
-        produtos_layout = QVBoxLayout()
-        produtos_widget.setLayout(produtos_layout)
-        temp_layout = self.graph_layout if hasattr(self, 'graph_layout') else None
-        self.graph_layout = produtos_layout
-        self.show_analise_produtos(data_inicio, data_fim, categoria)
-        tabs_produtos.addTab(produtos_widget, "Análise de Produtos")
+        antecipado = self._retirar_prefetch(nome)
+        if antecipado and antecipado[0] == filtros:
+            self.status_carregamento.setText("")
+            getattr(self, mostrar)(widget, antecipado[1])
+            self._renderizadas[nome] = filtros
+            self.agendar_prefetch()
+            return
         
-        margem_widget = QWidget()
-        margem_layout = QVBoxLayout()
-        margem_widget.setLayout(margem_layout)
-        self.graph_layout = margem_layout
-        self.show_analise_margem(data_inicio, data_fim, categoria)
-        tabs_produtos.addTab(margem_widget, "Análise de Margem")
+        self._token = TokenCancelamento()
+        self._pendente = (nome, filtros, mostrar, widget)
+        self.status_carregamento.setText("Carregando...")
         
-        if temp_layout is not None:
-            self.graph_layout = temp_layout
+        tarefa = TarefaConsulta(self.db, self._token, self._geracao, carregar, *self._argumentos(),
+                                contexto=self._contexto)
+        tarefa.sinais.concluida.connect(self.on_dados_carregados)
+        tarefa.sinais.falhou.connect(self.on_dados_falhou)
+        self.pool_tarefas.start(tarefa)
 
-    def mostrar_estatisticas(self, widget, data_inicio, data_fim, categoria):
-        layout = widget.layout()
-        if layout:
-            while layout.count():
-                item = layout.takeAt(0)
-                widget_item = item.widget()
-                if widget_item:
-                    widget_item.setParent(None)
-                    widget_item.deleteLater()
-        else:
-            layout = QVBoxLayout()
-            widget.setLayout(layout)
-        self.graph_layout = layout
-        self.show_analises_estatisticas(data_inicio, data_fim, categoria)
+    def cancelar_carregamento(self):
+        if self._token:
+            self._token.cancelar()
+            self._token = None
 
-    def mostrar_estoque(self, widget, data_inicio, data_fim, categoria):
-        layout = widget.layout()
-        if layout:
-            while layout.count():
-                item = layout.takeAt(0)
-                widget_item = item.widget()
-                if widget_item:
-                    widget_item.setParent(None)
-                    widget_item.deleteLater()
-        else:
-            layout = QVBoxLayout()
-            widget.setLayout(layout)
-        self.graph_layout = layout
-        self.show_giro_estoque(data_inicio, data_fim, categoria)
+    def on_dados_carregados(self, geracao, dados):
+        if geracao != self._geracao:
+            return
+        self._token = None
+        self.status_carregamento.setText("")
+        nome, filtros, mostrar, widget = self._pendente
+        getattr(self, mostrar)(widget, dados)
+        self._renderizadas[nome] = filtros
+        self.agendar_prefetch()
+
+    def on_dados_falhou(self, geracao, erro):
+        if geracao != self._geracao:
+            return
+        self._token = None
+        self.status_carregamento.setText("Erro ao carregar dados.")
 
-    def mostrar_clientes(self, widget, data_inicio, data_fim, categoria):
+    def cancelar_prefetch(self):
+        if self._token_prefetch:
+            self._token_prefetch.cancelar()
+            self._token_prefetch = None
+
+    def _retirar_prefetch(self, nome):
+        entrada = self._prefetch.pop(nome, None)
+        if entrada is None:
+            return None
+        filtros, dados, tamanho = entrada
+        self._prefetch_bytes -= tamanho
+        return filtros, dados
+
+    def agendar_prefetch(self):
+        if self._token or self._token_prefetch or not self.db.pool:
+            return
+        if self._prefetch_bytes >= self.orcamento_prefetch:
+            return
+        atuais = {self._filtros(False), self._filtros(True)}
+        self._prefetch_ignorados = {item for item in self._prefetch_ignorados if item[1] in atuais}
+        for nome, carregar, _, usa_categoria in self.vistas.values():
+            filtros = self._filtros(usa_categoria)
+            if nome in self._prefetch and self._prefetch[nome][0] != filtros:
+                self._retirar_prefetch(nome)
+            if self._renderizadas.get(nome) == filtros or nome in self._prefetch:
+                continue
+            if (nome, filtros) in self._prefetch_ignorados:
+                continue
+            self._token_prefetch = TokenCancelamento()
+            tarefa = TarefaConsulta(self.db, self._token_prefetch, self._geracao, getattr(self, carregar),
+                                    *self._argumentos(), contexto=self._contexto)
+            tarefa.sinais.concluida.connect(partial(self.on_prefetch_concluido, nome, filtros))
+            tarefa.sinais.falhou.connect(self.on_prefetch_falhou)
+            self.pool_tarefas.start(tarefa, PRIORIDADE_PREFETCH)
+            return
+
+    def on_prefetch_concluido(self, nome, filtros, geracao, dados):
+        if geracao != self._geracao:
+            return
+        self._token_prefetch = None
+        tamanho = tamanho_aproximado(dados)
+        if tamanho > self.orcamento_prefetch:
+            self._prefetch_ignorados.add((nome, filtros))
+            self.agendar_prefetch()
+            return
+        while self._prefetch and self._prefetch_bytes + tamanho > self.orcamento_prefetch:
+            self._retirar_prefetch(next(iter(self._prefetch)))
+        self._prefetch[nome] = (filtros, dados, tamanho)
+        self._prefetch_bytes += tamanho
+        self.agendar_prefetch()
+
+    def on_prefetch_falhou(self, geracao, erro):
+        if geracao == self._geracao:
+            self._token_prefetch = None
+
+    def _preparar_layout(self, widget):
         layout = widget.layout()
         if layout:
             while layout.count():
@@ -286,241 +375,271 @@ class AnaliseWidget(QWidget):
         else:
             layout = QVBoxLayout()
             widget.setLayout(layout)
-        self.graph_layout = layout
-        self.show_analises_clientes(data_inicio, data_fim, categoria)
+        return layout
 
-    def show_dashboard_completo(self, data_inicio, data_fim, categoria):
-        scroll_widget = QWidget()
+    def _largura_grafico(self, nome, padrao=800):
+        grafico = self.graficos.get(nome)
+        return grafico.largura_pixels() if grafico else padrao
+
+    def carregar_dashboard(self, data_inicio, data_fim, categoria):
+        agrupamento = agrupamento_adaptativo(data_inicio, data_fim,
+                                             self._largura_grafico('dashboard_receita') // PIXELS_POR_BARRA)
+        return {
+            'snapshot': self.db.get_dashboard_snapshot(data_inicio, data_fim, categoria),
+            'vendas_periodo': self.db.get_vendas_por_periodo(data_inicio, data_fim, categoria),
+            'mais_vendidos': self.db.get_produtos_mais_vendidos(5, False, data_inicio, data_fim, categoria),
+            'agrupamento_receita': agrupamento,
+            'receita_periodo': self.db.get_receita_por_periodo(data_inicio, data_fim, agrupamento, categoria),
+            'dia_semana': self.db.get_vendas_por_dia_semana(data_inicio, data_fim, categoria)
+        }
+
+    def carregar_temporais(self, data_inicio, data_fim, categoria):
+        return {
+            'dia_semana': self.db.get_vendas_por_dia_semana(data_inicio, data_fim, categoria),
+            'tendencias': self.db.get_tendencias_produtos(data_inicio, data_fim, categoria)
+        }
+
+    def carregar_produtos(self, data_inicio, data_fim, categoria):
+        return self.db.get_produtos_mais_vendidos(10, False, data_inicio, data_fim, categoria)
+
+    def carregar_margem(self, data_inicio, data_fim, categoria):
+        return self.db.get_analise_margem(data_inicio, data_fim, categoria)
+
+    def carregar_estatisticas(self, data_inicio, data_fim, categoria):
+        return {
+            'categoria': categoria,
+            'descritivas': self.db.get_estatisticas_descritivas(categoria),
+            'correlacao': self.db.get_correlacoes(data_inicio, data_fim, categoria),
+            'vendas_periodo': self.db.get_vendas_por_periodo(data_inicio, data_fim, categoria),
+            'anomalias': self.db.get_anomalias_vendas(data_inicio, data_fim, categoria)
+        }
+
+    def carregar_estoque(self, data_inicio, data_fim, categoria):
+        return self.db.get_giro_estoque(data_inicio, data_fim, categoria)
+
+    def carregar_clientes(self, data_inicio, data_fim, categoria):
+        return {
+            'estatisticas': self.db.get_estatisticas_clientes(data_inicio, data_fim),
+            'frequentes': self.db.get_clientes_mais_frequentes(8, data_inicio, data_fim)
+        }
+
+    def carregar_clientes_detalhes(self, data_inicio, data_fim, categoria):
+        return {
+            'ticket': self.db.get_clientes_maior_ticket_medio(8, data_inicio, data_fim),
+            'por_cliente': self.db.get_vendas_por_cliente(data_inicio, data_fim)
+        }
+
+    def mostrar_dashboard(self, widget, dados):
+        self._montar('dashboard', widget, self._montar_dashboard)
+        self.show_dashboard_completo(dados)
+
+    def mostrar_temporais(self, widget, dados):
+        self._montar('temporais', widget, self._montar_temporais)
+        self.show_analises_temporais(dados)
+
+    def mostrar_produtos(self, widget, dados):
+        self._montar('produtos', widget, self._montar_produtos)
+        self.show_analise_produtos(dados)
+
+    def mostrar_margem(self, widget, dados):
+        self._montar('margem', widget, self._montar_margem)
+        self.show_analise_margem(dados)
+
+    def mostrar_estatisticas(self, widget, dados):
+        self._montar('estatisticas', widget, self._montar_estatisticas)
+        self.show_analises_estatisticas(dados)
+
+    def mostrar_estoque(self, widget, dados):
+        self._montar('estoque', widget, self._montar_estoque)
+        self.show_giro_estoque(dados)
+
+    def mostrar_clientes(self, widget, dados):
+        self._montar('clientes', widget, self._montar_clientes)
+        self.show_analises_clientes(dados)
+
+    def mostrar_clientes_detalhes(self, widget, dados):
+        self._montar('clientes_detalhes', widget, self._montar_clientes_detalhes)
+        self.show_detalhes_clientes(dados)
+
+    def _montar_dashboard(self, layout):
         scroll_layout = QVBoxLayout()
-        scroll_widget.setLayout(scroll_layout)
-        
-        graphs_grid = QGridLayout()
-        
-        total_vendas = self.db.get_numero_vendas_periodo(data_inicio, data_fim, categoria)
-        receita_total = self.db.get_total_vendas_periodo(data_inicio, data_fim, categoria)
-        ticket_medio = self.db.get_ticket_medio(data_inicio, data_fim, categoria)
         
         cards_layout = QGridLayout()
-        cards = [
-            ("Total de Vendas", f"{total_vendas}"),
-            ("Receita Total", f"R$ {receita_total:,.2f}"),
-            ("Ticket Médio", f"R$ {ticket_medio:,.2f}")
-        ]
-        
-        for i, (titulo, valor) in enumerate(cards):
+        self.cards = {}
+        for i, (titulo, chave, _) in enumerate(CARDS_DASHBOARD):
             card = QGroupBox(titulo)
             card_layout = QVBoxLayout()
-            label = QLabel(valor)
+            label = QLabel()
             label.setFont(QFont("Arial", 14, QFont.Weight.Bold))
             label.setAlignment(Qt.AlignmentFlag.AlignCenter)
             card_layout.addWidget(label)
+            label_variacao = QLabel()
+            label_variacao.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            card_layout.addWidget(label_variacao)
             card.setLayout(card_layout)
             cards_layout.addWidget(card, 0, i)
+            self.cards[chave] = (label, label_variacao)
         
         cards_widget = QWidget()
         cards_widget.setLayout(cards_layout)
         scroll_layout.addWidget(cards_widget)
         
-        row = 1
-        col = 0
-        canvas1 = self._criar_grafico_linha(
-            self.db.get_vendas_por_periodo(data_inicio, data_fim, categoria),
-            "Vendas ao Longo do Tempo", "Data", "Vendas (R$)"
-        )
-        graphs_grid.addWidget(canvas1, row, col)
-        col += 1
-        canvas2 = self._criar_grafico_barra_h(
-            self.db.get_produtos_mais_vendidos(5, False, data_inicio, data_fim, categoria),
-            "Top 5 Produtos Mais Vendidos", "Quantidade", 20
-        )
-        graphs_grid.addWidget(canvas2, row, col)
-        row += 1
-        col = 0
-        
-        dados_receita = self.db.get_receita_por_periodo(data_inicio, data_fim, 'dia', categoria)
-        fig3 = Figure(figsize=(8, 4))
-        canvas3 = FigureCanvas(fig3)
-        ax3 = fig3.add_subplot(111)
-        if dados_receita:
-            periodos = [d[0] for d in dados_receita]
-            receitas = [float(d[1]) for d in dados_receita]
-            ax3.bar(range(len(periodos)), receitas, alpha=0.7)
-            ax3.set_xticks(range(0, len(periodos), max(1, len(periodos)//10)))
-            ax3.set_xticklabels([str(p)[:10] for p in periodos[::max(1, len(periodos)//10)]], rotation=45, ha='right')
-            ax3.set_xlabel("Período")
-            ax3.set_ylabel("Receita (R$)")
-            ax3.set_title("Receita por Período")
-            ax3.grid(True, alpha=0.3, axis='y')
-        else:
-            ax3.text(0.5, 0.5, "Sem dados", ha='center', va='center', transform=ax3.transAxes)
-            ax3.set_title("Receita por Período")
-        fig3.tight_layout()
-        graphs_grid.addWidget(canvas3, row, col)
-        col += 1
-        vendas_dia_semana = self.db.get_vendas_por_dia_semana(data_inicio, data_fim, categoria)
-        fig4 = Figure(figsize=(8, 4))
-        canvas4 = FigureCanvas(fig4)
-        ax4 = fig4.add_subplot(111)
-        if vendas_dia_semana:
-            dias_nomes = ['Dom', 'Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb']
-            dias = [int(d[0]) for d in vendas_dia_semana]
-            valores = [float(d[1]) for d in vendas_dia_semana]
-            ax4.bar([dias_nomes[d] for d in dias], valores, alpha=0.7)
-            ax4.set_xlabel("Dia da Semana")
-            ax4.set_ylabel("Vendas (R$)")
-            ax4.set_title("Vendas por Dia da Semana")
-            ax4.grid(True, alpha=0.3, axis='y')
-        else:
-            ax4.text(0.5, 0.5, "Sem dados", ha='center', va='center', transform=ax4.transAxes)
-            ax4.set_title("Vendas por Dia da Semana")
-        fig4.tight_layout()
-        graphs_grid.addWidget(canvas4, row, col)
+        graphs_grid = QGridLayout()
+        vendas = self._grafico('dashboard_vendas')
+        vendas.configurar(titulo="Vendas ao Longo do Tempo", xlabel="Data", ylabel="Vendas (R$)", grade='both', datas=True)
+        graphs_grid.addWidget(vendas.canvas, 1, 0)
+        mais_vendidos = self._grafico('dashboard_mais_vendidos')
+        mais_vendidos.configurar(titulo="Top 5 Produtos Mais Vendidos", xlabel="Quantidade", grade='x')
+        graphs_grid.addWidget(mais_vendidos.canvas, 1, 1)
+        receita = self._grafico('dashboard_receita')
+        receita.configurar(titulo="Receita por Período", xlabel="Período", ylabel="Receita (R$)", grade='y')
+        graphs_grid.addWidget(receita.canvas, 2, 0)
+        dia_semana = self._grafico('dashboard_dia_semana')
+        dia_semana.configurar(titulo="Vendas por Dia da Semana", xlabel="Dia da Semana", ylabel="Vendas (R$)", grade='y')
+        graphs_grid.addWidget(dia_semana.canvas, 2, 1)
         
         graphs_widget = QWidget()
         graphs_widget.setLayout(graphs_grid)
         scroll_layout.addWidget(graphs_widget)
-        
-        scroll_area = QScrollArea()
-        scroll_area.setWidget(scroll_widget)
-        scroll_area.setWidgetResizable(True)
-        self.graph_layout.addWidget(scroll_area)
+        layout.addWidget(self._area_rolavel(scroll_layout))
 
-    def show_giro_estoque(self, data_inicio, data_fim, categoria):
-        dados = self.db.get_giro_estoque(data_inicio, data_fim, categoria)
+    def show_dashboard_completo(self, dados):
+        snapshot = dados['snapshot']
+        anterior = snapshot['anterior']
+        for _, chave, formato in CARDS_DASHBOARD:
+            label, label_variacao = self.cards[chave]
+            label.setText(formato.format(snapshot[chave]))
+            variacao = variacao_percentual(anterior[chave], snapshot[chave])
+            label_variacao.setText(f"{'▲' if variacao >= 0 else '▼'} {abs(variacao):.1f}% vs período anterior")
+            label_variacao.setStyleSheet(f"color: {'green' if variacao >= 0 else 'red'};")
+        
+        self._atualizar_linha(self.graficos['dashboard_vendas'], dados['vendas_periodo'])
+        self._atualizar_barra_h(self.graficos['dashboard_mais_vendidos'], dados['mais_vendidos'], 20)
+        
+        dados_receita = dados['receita_periodo']
+        receita = self.graficos['dashboard_receita']
+        receita.iniciar()
+        receita.titulo(f"Receita por {ROTULOS_AGRUPAMENTO[dados['agrupamento_receita']]}")
+        if len(dados_receita):
+            periodos = dados_receita['periodo']
+            receita.barras('valores', [str(p)[:10] for p in periodos], dados_receita['receita'], horizontal=False,
+                           passo=max(1, len(periodos) // 10), rotacao=45, alpha=0.7)
+        else:
+            receita.vazio()
+        receita.concluir()
         
-        if not dados:
-            label = QLabel("Sem dados para análise de giro de estoque.")
-            self.graph_layout.addWidget(label)
+        self._atualizar_dia_semana(self.graficos['dashboard_dia_semana'], dados['dia_semana'])
+
+    def _montar_estoque(self, layout):
+        grafico = self._grafico('estoque', figsize=(14, 8), subplots=(211, 212))
+        grafico.configurar(0, titulo="Top 20 Produtos - Giro de Estoque", xlabel="Giro de Estoque", grade='x')
+        grafico.configurar(1, titulo="Dias de Estoque Disponível (Top 20)", xlabel="Dias de Estoque Disponível", grade='x')
+        layout.addWidget(grafico.canvas)
+
+    def show_giro_estoque(self, dados):
+        grafico = self.graficos['estoque']
+        grafico.iniciar()
+        if not len(dados):
+            grafico.vazio("Sem dados para análise de giro de estoque.", 0)
+            grafico.vazio("Sem dados", 1)
+            grafico.concluir()
             return
         
-        dados_ordenados = sorted(dados, key=lambda x: x['giro'], reverse=True)[:20]
-        
-        fig = Figure(figsize=(14, 8))
-        canvas = FigureCanvas(fig)
-        
-        ax1 = fig.add_subplot(211)
-        produtos = [d['nome'][:25] for d in dados_ordenados]
-        giros = [d['giro'] for d in dados_ordenados]
-        ax1.barh(produtos, giros, alpha=0.7)
-        ax1.set_xlabel("Giro de Estoque")
-        ax1.set_title("Top 20 Produtos - Giro de Estoque")
-        ax1.grid(True, alpha=0.3, axis='x')
-        
-        ax2 = fig.add_subplot(212)
-        dias_estoques = [min(d['dias_estoque'], 365) for d in dados_ordenados]
-        ax2.barh(produtos, dias_estoques, alpha=0.7, color='orange')
-        ax2.set_xlabel("Dias de Estoque Disponível")
-        ax2.set_title("Dias de Estoque Disponível (Top 20)")
-        ax2.grid(True, alpha=0.3, axis='x')
-        
-        fig.tight_layout()
-        self.graph_layout.addWidget(canvas)
+        dados_ordenados = dados[np.argsort(-dados['giro'], kind='stable')[:20]]
+        produtos = [nome[:25] for nome in dados_ordenados['nome']]
+        grafico.barras('giro', produtos, dados_ordenados['giro'], eixo=0, alpha=0.7)
+        grafico.barras('dias_estoque', produtos, np.minimum(dados_ordenados['dias_estoque'], 365), eixo=1,
+                       alpha=0.7, color='orange')
+        grafico.concluir()
 
-    def show_analises_temporais(self, data_inicio, data_fim, categoria):
-        scroll_widget = QWidget()
-        scroll_layout = QVBoxLayout()
-        scroll_widget.setLayout(scroll_layout)
-        
+    def _montar_temporais(self, layout):
         graphs_grid = QGridLayout()
+        dia_semana = self._grafico('temporais_dia_semana', figsize=(10, 4))
+        dia_semana.configurar(titulo="Sazonalidade - Dia da Semana", xlabel="Dia da Semana", ylabel="Vendas (R$)", grade='y')
+        graphs_grid.addWidget(dia_semana.canvas, 0, 0)
+        tendencias = self._grafico('temporais_tendencias', figsize=(10, 4))
+        tendencias.configurar(titulo="Análise de Tendências - Top 10 Produtos", xlabel="Variação Percentual (%)", grade='x')
+        tendencias.eixo().axvline(x=0, color='black', linestyle='-', linewidth=0.8)
+        graphs_grid.addWidget(tendencias.canvas, 1, 0)
         
-        row = 0
-        col = 0
-        
-        vendas_dia_semana = self.db.get_vendas_por_dia_semana(data_inicio, data_fim, categoria)
-        
-        if vendas_dia_semana:
-            fig2 = Figure(figsize=(10, 4))
-            canvas2 = FigureCanvas(fig2)
-            ax2 = fig2.add_subplot(111)
-            dias_nomes = ['Dom', 'Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb']
-            if vendas_dia_semana:
-                dias = [int(d[0]) for d in vendas_dia_semana]
-                valores = [float(d[1]) for d in vendas_dia_semana]
-                ax2.bar([dias_nomes[d] for d in dias], valores, alpha=0.7)
-            ax2.set_xlabel("Dia da Semana")
-            ax2.set_ylabel("Vendas (R$)")
-            ax2.set_title("Sazonalidade - Dia da Semana")
-            ax2.grid(True, alpha=0.3, axis='y')
-            fig2.tight_layout()
-            graphs_grid.addWidget(canvas2, row, col)
-            row += 1
-            col = 0
-        
-        tendencias = self.db.get_tendencias_produtos(data_inicio, data_fim, categoria)
+        scroll_layout = QVBoxLayout()
+        graphs_widget = QWidget()
+        graphs_widget.setLayout(graphs_grid)
+        scroll_layout.addWidget(graphs_widget)
+        layout.addWidget(self._area_rolavel(scroll_layout))
+
+    def show_analises_temporais(self, dados):
+        vendas_dia_semana = dados['dia_semana']
+        dia_semana = self.graficos['temporais_dia_semana']
+        dia_semana.canvas.setVisible(len(vendas_dia_semana) > 0)
+        if len(vendas_dia_semana):
+            self._atualizar_dia_semana(dia_semana, vendas_dia_semana)
+        
+        tendencias = dados['tendencias']
+        grafico = self.graficos['temporais_tendencias']
+        grafico.canvas.setVisible(bool(tendencias))
         if tendencias:
-            fig3 = Figure(figsize=(10, 4))
-            canvas3 = FigureCanvas(fig3)
-            ax3 = fig3.add_subplot(111)
             top_tendencias = sorted(tendencias, key=lambda x: abs(x['variacao']), reverse=True)[:10]
-            nomes = [t['nome'][:20] for t in top_tendencias]
             variacoes = [t['variacao'] for t in top_tendencias]
-            cores = ['green' if v > 0 else 'red' for v in variacoes]
-            ax3.barh(nomes, variacoes, color=cores, alpha=0.7)
-            ax3.axvline(x=0, color='black', linestyle='-', linewidth=0.8)
-            ax3.set_xlabel("Variação Percentual (%)")
-            ax3.set_title("Análise de Tendências - Top 10 Produtos")
-            ax3.grid(True, alpha=0.3, axis='x')
-            fig3.tight_layout()
-            graphs_grid.addWidget(canvas3, row, col)
-        
+            grafico.iniciar()
+            grafico.barras('variacoes', [t['nome'][:20] for t in top_tendencias], variacoes,
+                           cores=['green' if v > 0 else 'red' for v in variacoes], alpha=0.7)
+            grafico.concluir()
+
+    def _montar_produtos(self, layout):
+        mais_vendidos = self._grafico('produtos_mais_vendidos', figsize=(10, 5))
+        mais_vendidos.configurar(titulo="Top 10 Produtos Mais Vendidos", xlabel="Quantidade Vendida", grade='x')
+        graphs_grid = QGridLayout()
+        graphs_grid.addWidget(mais_vendidos.canvas, 0, 0)
         graphs_widget = QWidget()
         graphs_widget.setLayout(graphs_grid)
+        scroll_layout = QVBoxLayout()
         scroll_layout.addWidget(graphs_widget)
-        
-        scroll_area = QScrollArea()
-        scroll_area.setWidget(scroll_widget)
-        scroll_area.setWidgetResizable(True)
-        self.graph_layout.addWidget(scroll_area)
+        layout.addWidget(self._area_rolavel(scroll_layout))
 
-    def show_analise_produtos(self, data_inicio, data_fim, categoria):
-        scroll_widget = QWidget()
-        scroll_layout = QVBoxLayout()
-        scroll_widget.setLayout(scroll_layout)
-        
+    def _montar_margem(self, layout):
+        margem = self._grafico('produtos_margem', figsize=(14, 10), subplots=(221, 222, 223, 224))
+        margem.configurar(0, titulo="Top 10 Produtos por Lucro", xlabel="Lucro Total (R$)", grade='x')
+        margem.configurar(1, titulo="Top 10 Produtos por Margem %", xlabel="Margem (%)", grade='x')
+        margem.configurar(2, titulo="Preço vs Custo", xlabel="Preço (R$)", ylabel="Custo (R$)", grade='both')
+        margem.configurar(3, desligado=True)
+        layout.addWidget(margem.canvas)
+
+    def show_analise_produtos(self, produtos_mais_vendidos):
+        grafico = self.graficos['produtos_mais_vendidos']
+        grafico.canvas.setVisible(len(produtos_mais_vendidos) > 0)
+        if len(produtos_mais_vendidos):
+            self._atualizar_barra_h(grafico, produtos_mais_vendidos, 25)
+
+    def _montar_estatisticas(self, layout):
         graphs_grid = QGridLayout()
+        descritivas = self._grafico('estatisticas_descritivas', figsize=(8, 5))
+        descritivas.configurar(desligado=True)
+        graphs_grid.addWidget(descritivas.canvas, 0, 0)
+        correlacao = self._grafico('estatisticas_correlacao', figsize=(8, 5))
+        correlacao.configurar(xlabel="Preço (R$)", ylabel="Quantidade Vendida", grade='both')
+        graphs_grid.addWidget(correlacao.canvas, 0, 1)
+        anomalias = self._grafico('estatisticas_anomalias', figsize=(12, 5))
+        anomalias.configurar(xlabel="Data", ylabel="Vendas (R$)", grade='both', datas=True)
+        graphs_grid.addWidget(anomalias.canvas, 1, 0, 1, 2)
         
-        produtos_mais_vendidos = self.db.get_produtos_mais_vendidos(10, False, data_inicio, data_fim, categoria)
-        if produtos_mais_vendidos:
-            fig1 = Figure(figsize=(10, 5))
-            canvas1 = FigureCanvas(fig1)
-            ax1 = fig1.add_subplot(111)
-            produtos = [d[0][:25] for d in produtos_mais_vendidos]
-            quantidades = [int(d[1]) for d in produtos_mais_vendidos]
-            ax1.barh(produtos, quantidades)
-            ax1.set_xlabel("Quantidade Vendida")
-            ax1.set_title("Top 10 Produtos Mais Vendidos")
-            ax1.grid(True, alpha=0.3, axis='x')
-            fig1.tight_layout()
-            graphs_grid.addWidget(canvas1, 0, 0)
-        
+        scroll_layout = QVBoxLayout()
         graphs_widget = QWidget()
         graphs_widget.setLayout(graphs_grid)
         scroll_layout.addWidget(graphs_widget)
-        
-        scroll_area = QScrollArea()
-        scroll_area.setWidget(scroll_widget)
-        scroll_area.setWidgetResizable(True)
-        self.graph_layout.addWidget(scroll_area)
+        layout.addWidget(self._area_rolavel(scroll_layout))
 
-    def show_analises_estatisticas(self, data_inicio, data_fim, categoria):
-        scroll_widget = QWidget()
-        scroll_layout = QVBoxLayout()
-        scroll_widget.setLayout(scroll_layout)
-        
-        graphs_grid = QGridLayout()
-        
-        stats = self.db.get_estatisticas_descritivas(categoria)
+    def show_analises_estatisticas(self, dados):
+        categoria = dados['categoria']
+        stats = dados['descritivas']
+        descritivas = self.graficos['estatisticas_descritivas']
+        descritivas.canvas.setVisible(bool(stats))
         if stats:
-            fig1 = Figure(figsize=(8, 5))
-            canvas1 = FigureCanvas(fig1)
-            ax1 = fig1.add_subplot(111)
-            ax1.axis('off')
+            descritivas.iniciar()
             titulo = "Estatísticas Descritivas - Preços"
             if categoria:
                 titulo += f" ({categoria})"
-            ax1.text(0.5, 0.95, titulo, ha='center', va='top', fontsize=12, fontweight='bold', transform=ax1.transAxes)
-            y_pos = 0.8
-            espacamento = 0.1
+            descritivas.texto('titulo', 0.5, 0.95, titulo, ha='center', va='top', fontsize=12, fontweight='bold')
             estatisticas = [
                 ('Total de Produtos', f"{stats['total']}"),
                 ('Média', f"R$ {stats['media']:.2f}"),
@@ -529,184 +648,144 @@ class AnaliseWidget(QWidget):
                 ('Máximo', f"R$ {stats['maximo']:.2f}"),
                 ('Desvio Padrão', f"R$ {stats['desvio_padrao']:.2f}")
             ]
-            for nome, valor in estatisticas:
-                ax1.text(0.3, y_pos, nome + ':', ha='right', va='center', fontsize=10, transform=ax1.transAxes)
-                ax1.text(0.35, y_pos, valor, ha='left', va='center', fontsize=10, fontweight='bold', transform=ax1.transAxes)
-                y_pos -= espacamento
-            fig1.tight_layout()
-            graphs_grid.addWidget(canvas1, 0, 0)
-        
-        dados_correlacao = self.db.get_correlacoes(data_inicio, data_fim, categoria)
-        if dados_correlacao and len(dados_correlacao) >= 2:
-            dados_validos = [(float(d[0]), float(d[1])) for d in dados_correlacao if d[0] is not None and d[1] is not None]
+            for i, (nome, valor) in enumerate(estatisticas):
+                y_pos = 0.8 - 0.1 * i
+                descritivas.texto(f'nome_{i}', 0.3, y_pos, nome + ':', ha='right', va='center', fontsize=10)
+                descritivas.texto(f'valor_{i}', 0.35, y_pos, valor, ha='left', va='center', fontsize=10, fontweight='bold')
+            descritivas.concluir()
+        
+        dados_correlacao = dados['correlacao']
+        grafico_correlacao = self.graficos['estatisticas_correlacao']
+        visivel = False
+        if len(dados_correlacao) >= 2:
+            dados_validos = dados_correlacao[~np.isnan(dados_correlacao['preco'])]
             if len(dados_validos) >= 2:
-                precos = [d[0] for d in dados_validos]
-                quantidades = [d[1] for d in dados_validos]
+                precos = dados_validos['preco']
+                quantidades = dados_validos['quantidade']
                 correlacao = np.corrcoef(precos, quantidades)[0, 1]
                 if not np.isnan(correlacao):
-                    fig2 = Figure(figsize=(8, 5))
-                    canvas2 = FigureCanvas(fig2)
-                    ax2 = fig2.add_subplot(111)
-                    ax2.scatter(precos, quantidades, alpha=0.6, s=50)
-                    z = np.polyfit(precos, quantidades, 1)
-                    p = np.poly1d(z)
-                    ax2.plot(precos, p(precos), "r--", alpha=0.8, linewidth=2, label=f'Tendência (r={correlacao:.3f})')
-                    ax2.set_xlabel("Preço (R$)")
-                    ax2.set_ylabel("Quantidade Vendida")
-                    ax2.set_title(f"Correlação Preço vs Quantidade\nr={correlacao:.3f}")
-                    ax2.legend()
-                    ax2.grid(True, alpha=0.3)
-                    fig2.tight_layout()
-                    graphs_grid.addWidget(canvas2, 0, 1)
-        
-        dados_anomalias = self.db.get_vendas_por_periodo(data_inicio, data_fim, categoria)
-        anomalias = self.db.get_anomalias_vendas(data_inicio, data_fim, categoria)
-        if dados_anomalias:
-            fig3 = Figure(figsize=(12, 5))
-            canvas3 = FigureCanvas(fig3)
-            ax3 = fig3.add_subplot(111)
-            datas = [d[0] for d in dados_anomalias]
-            valores = [float(d[1]) for d in dados_anomalias]
-            ax3.plot(datas, valores, 'b-', marker='o', linewidth=1, markersize=4, label='Vendas Normais', alpha=0.6)
-            if anomalias:
-                anomalias_altas = [a for a in anomalias if a['tipo'] == 'alta']
-                anomalias_baixas = [a for a in anomalias if a['tipo'] == 'baixa']
-                if anomalias_altas:
-                    datas_altas = [a['data'] for a in anomalias_altas]
-                    valores_altas = [a['valor'] for a in anomalias_altas]
-                    ax3.scatter(datas_altas, valores_altas, color='red', s=100, marker='^', label='Anomalias (Alta)', zorder=5)
-                if anomalias_baixas:
-                    datas_baixas = [a['data'] for a in anomalias_baixas]
-                    valores_baixas = [a['valor'] for a in anomalias_baixas]
-                    ax3.scatter(datas_baixas, valores_baixas, color='orange', s=100, marker='v', label='Anomalias (Baixa)', zorder=5)
-            valores_list = valores
-            if valores_list:
-                media = sum(valores_list) / len(valores_list)
-                variancia = sum((x - media) ** 2 for x in valores_list) / len(valores_list)
-                desvio_padrao = variancia ** 0.5
-                limite_superior = media + (2 * desvio_padrao)
-                limite_inferior = max(0, media - (2 * desvio_padrao))
-                ax3.axhline(y=media, color='green', linestyle='--', alpha=0.5, label=f'Média')
-                ax3.axhline(y=limite_superior, color='red', linestyle='--', alpha=0.5, label=f'+2σ')
-                ax3.axhline(y=limite_inferior, color='orange', linestyle='--', alpha=0.5, label=f'-2σ')
-            ax3.set_xlabel("Data")
-            ax3.set_ylabel("Vendas (R$)")
-            ax3.set_title(f"Detecção de Anomalias\n{len(anomalias)} anomalias detectadas")
-            ax3.legend()
-            ax3.grid(True, alpha=0.3)
-            fig3.autofmt_xdate()
-            fig3.tight_layout()
-            graphs_grid.addWidget(canvas3, 1, 0, 1, 2)
-        
-        graphs_widget = QWidget()
-        graphs_widget.setLayout(graphs_grid)
-        scroll_layout.addWidget(graphs_widget)
-        
-        scroll_area = QScrollArea()
-        scroll_area.setWidget(scroll_widget)
-        scroll_area.setWidgetResizable(True)
-        self.graph_layout.addWidget(scroll_area)
+                    visivel = True
+                    grafico_correlacao.iniciar()
+                    grafico_correlacao.pontos('pontos', precos, quantidades, alpha=0.6, markersize=7)
+                    p = np.poly1d(np.polyfit(precos, quantidades, 1))
+                    grafico_correlacao.linha('tendencia', precos, p(precos), linestyle='--', color='r', alpha=0.8,
+                                             linewidth=2, label=f'Tendência (r={correlacao:.3f})')
+                    grafico_correlacao.titulo(f"Correlação Preço vs Quantidade\nr={correlacao:.3f}")
+                    grafico_correlacao.legenda()
+                    grafico_correlacao.concluir()
+        grafico_correlacao.canvas.setVisible(visivel)
+        
+        dados_anomalias = dados['vendas_periodo']
+        anomalias = dados['anomalias']
+        grafico_anomalias = self.graficos['estatisticas_anomalias']
+        grafico_anomalias.canvas.setVisible(len(dados_anomalias) > 0)
+        if len(dados_anomalias):
+            grafico_anomalias.iniciar()
+            valores = dados_anomalias['receita']
+            largura = grafico_anomalias.largura_pixels()
+            datas_anomalas = np.array([a['data'] for a in anomalias], dtype='datetime64[D]')
+            indices = indices_reduzidos(dados_anomalias, largura // PIXELS_POR_PONTO,
+                                        np.isin(dados_anomalias['periodo'], datas_anomalas))
+            marcador_linha = 'o' if len(indices) <= largura // PIXELS_POR_MARCADOR else ''
+            grafico_anomalias.linha('valores', dados_anomalias['periodo'][indices], valores[indices], color='b',
+                                    marker=marcador_linha, linewidth=1,
+                                    markersize=4, label='Vendas Normais', alpha=0.6)
+            for tipo, cor, marcador, rotulo in (('alta', 'red', '^', 'Anomalias (Alta)'),
+                                                ('baixa', 'orange', 'v', 'Anomalias (Baixa)')):
+                selecionadas = [a for a in anomalias if a['tipo'] == tipo]
+                if selecionadas:
+                    grafico_anomalias.pontos(tipo, [a['data'] for a in selecionadas], [a['valor'] for a in selecionadas],
+                                             color=cor, marker=marcador, markersize=10, label=rotulo, zorder=5)
+                else:
+                    grafico_anomalias.ocultar(tipo)
+            media = valores.mean()
+            desvio_padrao = valores.std()
+            grafico_anomalias.linha_horizontal('media', media, color='green', linestyle='--', alpha=0.5, label='Média')
+            grafico_anomalias.linha_horizontal('superior', media + (2 * desvio_padrao), color='red', linestyle='--',
+                                               alpha=0.5, label='+2σ')
+            grafico_anomalias.linha_horizontal('inferior', max(0, media - (2 * desvio_padrao)), color='orange',
+                                               linestyle='--', alpha=0.5, label='-2σ')
+            grafico_anomalias.titulo(f"Detecção de Anomalias\n{len(anomalias)} anomalias detectadas")
+            grafico_anomalias.legenda()
+            grafico_anomalias.concluir()
 
-    def show_analise_margem(self, data_inicio, data_fim, categoria):
-        dados = self.db.get_analise_margem(data_inicio, data_fim, categoria)
-        if not dados:
-            canvas = self._criar_grafico_vazio("Análise de Margem\n(Sem dados)")
-            self.graph_layout.addWidget(canvas)
+    def show_analise_margem(self, dados):
+        grafico = self.graficos['produtos_margem']
+        grafico.iniciar()
+        if not len(dados):
+            for eixo in range(len(grafico.eixos)):
+                grafico.vazio("Sem dados", eixo)
+            grafico.concluir()
             return
         
-        produtos = []
-        for d in dados:
-            produtos.append({
-                'nome': d[1][:30],
-                'categoria': d[2],
-                'preco': float(d[3]),
-                'custo': float(d[4]),
-                'margem_unit': float(d[5]),
-                'margem_percent': float(d[6]),
-                'quantidade': float(d[7]),
-                'receita': float(d[8]),
-                'custo_total': float(d[9]),
-                'lucro': float(d[10])
-            })
-        
-        top_10 = produtos[:10]
-        
-        fig = Figure(figsize=(14, 10))
-        canvas = FigureCanvas(fig)
-        
-        ax1 = fig.add_subplot(221)
-        nomes = [p['nome'] for p in top_10]
-        lucros = [p['lucro'] for p in top_10]
-        ax1.barh(nomes, lucros)
-        ax1.set_xlabel("Lucro Total (R$)")
-        ax1.set_title("Top 10 Produtos por Lucro")
-        ax1.grid(True, alpha=0.3, axis='x')
-        fig.autofmt_xdate()
-        
-        ax2 = fig.add_subplot(222)
-        margens = [p['margem_percent'] for p in top_10]
-        ax2.barh(nomes, margens, color='green')
-        ax2.set_xlabel("Margem (%)")
-        ax2.set_title("Top 10 Produtos por Margem %")
-        ax2.grid(True, alpha=0.3, axis='x')
-        fig.autofmt_xdate()
-        
-        ax3 = fig.add_subplot(223)
-        precos = [p['preco'] for p in produtos]
-        custos = [p['custo'] for p in produtos]
-        ax3.scatter(precos, custos, alpha=0.6, s=50)
-        ax3.plot([0, max(precos)], [0, max(precos)], 'r--', alpha=0.5, label='Linha de Equilíbrio')
-        ax3.set_xlabel("Preço (R$)")
-        ax3.set_ylabel("Custo (R$)")
-        ax3.set_title("Preço vs Custo")
-        ax3.legend()
-        ax3.grid(True, alpha=0.3)
-        
-        ax4 = fig.add_subplot(224)
-        ax4.axis('off')
-        ax4.text(0.1, 0.9, "Resumo de Rentabilidade", ha='left', va='top', 
-                fontsize=12, fontweight='bold', transform=ax4.transAxes)
-        y_pos = 0.8
-        
-        receita_total = sum([p['receita'] for p in produtos])
-        custo_total = sum([p['custo_total'] for p in produtos])
-        lucro_total = sum([p['lucro'] for p in produtos])
-        margem_media = np.mean([p['margem_percent'] for p in produtos if p['margem_percent'] > 0])
+        top_10 = dados[:10]
+        nomes = [nome[:30] for nome in top_10['nome']]
+        grafico.barras('lucro', nomes, top_10['lucro_total'], eixo=0)
+        grafico.barras('margem', nomes, top_10['margem_percent'], eixo=1, color='green')
         
+        precos = dados['preco']
+        grafico.pontos('preco_custo', precos, dados['custo'], eixo=2, alpha=0.6, markersize=7)
+        grafico.linha('equilibrio', [0, precos.max()], [0, precos.max()], eixo=2, linestyle='--', color='r', alpha=0.5,
+                      label='Linha de Equilíbrio')
+        grafico.legenda(2)
+        
+        margens = dados['margem_percent']
         resumo = [
-            ("Receita Total", f"R$ {receita_total:,.2f}"),
-            ("Custo Total", f"R$ {custo_total:,.2f}"),
-            ("Lucro Total", f"R$ {lucro_total:,.2f}"),
-            ("Margem Média", f"{margem_media:.2f}%")
+            ("Receita Total", f"R$ {dados['receita'].sum():,.2f}"),
+            ("Custo Total", f"R$ {dados['custo_total'].sum():,.2f}"),
+            ("Lucro Total", f"R$ {dados['lucro_total'].sum():,.2f}"),
+            ("Margem Média", f"{np.mean(margens[margens > 0]):.2f}%")
         ]
-        
-        for nome, valor in resumo:
-            ax4.text(0.1, y_pos, f"{nome}: {valor}", ha='left', va='top', 
-                    fontsize=10, transform=ax4.transAxes)
-            y_pos -= 0.12
-        
-        fig.tight_layout()
-        self.graph_layout.addWidget(canvas)
+        grafico.texto('resumo', 0.1, 0.9, "Resumo de Rentabilidade", eixo=3, ha='left', va='top',
+                      fontsize=12, fontweight='bold')
+        for i, (nome, valor) in enumerate(resumo):
+            grafico.texto(f'resumo_{i}', 0.1, 0.8 - 0.12 * i, f"{nome}: {valor}", eixo=3, ha='left', va='top', fontsize=10)
+        grafico.concluir()
 
-    def show_analises_clientes(self, data_inicio, data_fim, categoria):
-        tabs_clientes = QTabWidget()
-        
-        overview_scroll = QScrollArea()
-        overview_scroll.setWidgetResizable(True)
-        overview_widget = QWidget()
+    def _montar_clientes(self, layout):
         overview_layout = QVBoxLayout()
-        overview_widget.setLayout(overview_layout)
-        overview_scroll.setWidget(overview_widget)
-        
-        stats = self.db.get_estatisticas_clientes(data_inicio, data_fim)
+        estatisticas = self._grafico('clientes_estatisticas', figsize=(12, 2.5))
+        estatisticas.configurar(desligado=True)
+        overview_layout.addWidget(estatisticas.canvas)
+        frequentes = self._grafico('clientes_frequentes', figsize=(10, 5))
+        self._configurar_barras_clientes(frequentes, "Top 8 Clientes Mais Frequentes", "Número de Compras")
+        overview_layout.addWidget(frequentes.canvas)
+        layout.addWidget(self._area_rolavel(overview_layout))
+
+    def _montar_clientes_detalhes(self, layout):
+        detalhes_layout = QVBoxLayout()
+        ticket = self._grafico('clientes_ticket', figsize=(10, 5))
+        self._configurar_barras_clientes(ticket, "Top 8 Clientes por Ticket Médio", "Ticket Médio (R$)")
+        detalhes_layout.addWidget(ticket.canvas)
+        por_cliente = self._grafico('clientes_receita', figsize=(10, 5))
+        self._configurar_barras_clientes(por_cliente, "Receita por Cliente (Top 10)", "Receita Total (R$)")
+        detalhes_layout.addWidget(por_cliente.canvas)
+        layout.addWidget(self._area_rolavel(detalhes_layout))
+
+    def _configurar_barras_clientes(self, grafico, titulo, xlabel):
+        ax = grafico.eixo()
+        ax.set_xlabel(xlabel, fontsize=10)
+        ax.set_title(titulo, fontsize=11)
+        ax.tick_params(axis='y', labelsize=9)
+        ax.tick_params(axis='x', labelsize=9)
+        ax.grid(True, alpha=0.3, axis='x')
+
+    def _atualizar_barras_clientes(self, grafico, clientes, valores, **estilo):
+        grafico.canvas.setVisible(len(clientes) > 0)
+        if len(clientes):
+            grafico.iniciar()
+            nomes = [nome[:20] + "..." if len(nome) > 20 else nome for nome in clientes['nome']]
+            grafico.barras('valores', nomes, valores, alpha=0.7, **estilo)
+            grafico.concluir()
+
+    def show_analises_clientes(self, dados):
+        stats = dados['estatisticas']
+        grafico_stats = self.graficos['clientes_estatisticas']
+        grafico_stats.canvas.setVisible(bool(stats))
         if stats:
-            fig_stats = Figure(figsize=(12, 2.5))
-            canvas_stats = FigureCanvas(fig_stats)
-            ax_stats = fig_stats.add_subplot(111)
-            ax_stats.axis('off')
-            ax_stats.text(0.5, 0.95, "Estatísticas de Clientes", ha='center', va='top', 
-                         fontsize=12, fontweight='bold', transform=ax_stats.transAxes)
-            y_pos = 0.65
+            grafico_stats.iniciar()
+            grafico_stats.texto('titulo', 0.5, 0.95, "Estatísticas de Clientes", ha='center', va='top',
+                                fontsize=12, fontweight='bold')
             estatisticas = [
                 ('Total de Clientes', f"{stats['total_clientes']}"),
                 ('Clientes com Compras', f"{stats['clientes_com_compras']}"),
@@ -714,77 +793,24 @@ class AnaliseWidget(QWidget):
                 ('Receita Total', f"R$ {stats['receita_total']:,.2f}"),
                 ('Ticket Médio Geral', f"R$ {stats['ticket_medio_geral']:,.2f}")
             ]
-            for nome, valor in estatisticas:
-                ax_stats.text(0.3, y_pos, nome + ':', ha='right', va='center', 
-                            fontsize=10, transform=ax_stats.transAxes)
-                ax_stats.text(0.35, y_pos, valor, ha='left', va='center', 
-                            fontsize=10, fontweight='bold', transform=ax_stats.transAxes)
-                y_pos -= 0.18
-            fig_stats.tight_layout(pad=2.0)
-            overview_layout.addWidget(canvas_stats)
-        
-        clientes_frequentes = self.db.get_clientes_mais_frequentes(8, data_inicio, data_fim)
-        if clientes_frequentes:
-            fig1 = Figure(figsize=(10, 5))
-            canvas1 = FigureCanvas(fig1)
-            ax1 = fig1.add_subplot(111)
-            nomes = [c[1][:20] + "..." if len(c[1]) > 20 else c[1] for c in clientes_frequentes]
-            compras = [c[2] for c in clientes_frequentes]
-            ax1.barh(nomes, compras, alpha=0.7)
-            ax1.set_xlabel("Número de Compras", fontsize=10)
-            ax1.set_title("Top 8 Clientes Mais Frequentes", fontsize=11)
-            ax1.tick_params(axis='y', labelsize=9)
-            ax1.tick_params(axis='x', labelsize=9)
-            ax1.grid(True, alpha=0.3, axis='x')
-            fig1.tight_layout(pad=2.5)
-            overview_layout.addWidget(canvas1)
-        
-        tabs_clientes.addTab(overview_scroll, "Visão Geral")
-        
-        detalhes_scroll = QScrollArea()
-        detalhes_scroll.setWidgetResizable(True)
-        detalhes_widget = QWidget()
-        detalhes_layout = QVBoxLayout()
-        detalhes_widget.setLayout(detalhes_layout)
-        detalhes_scroll.setWidget(detalhes_widget)
-        
-        clientes_ticket = self.db.get_clientes_maior_ticket_medio(8, data_inicio, data_fim)
-        if clientes_ticket:
-            fig3 = Figure(figsize=(10, 5))
-            canvas3 = FigureCanvas(fig3)
-            ax3 = fig3.add_subplot(111)
-            nomes = [c[1][:20] + "..." if len(c[1]) > 20 else c[1] for c in clientes_ticket]
-            tickets = [float(c[4]) for c in clientes_ticket]
-            ax3.barh(nomes, tickets, alpha=0.7, color='orange')
-            ax3.set_xlabel("Ticket Médio (R$)", fontsize=10)
-            ax3.set_title("Top 8 Clientes por Ticket Médio", fontsize=11)
-            ax3.tick_params(axis='y', labelsize=9)
-            ax3.tick_params(axis='x', labelsize=9)
-            ax3.grid(True, alpha=0.3, axis='x')
-            fig3.tight_layout(pad=2.5)
-            detalhes_layout.addWidget(canvas3)
-        
-        vendas_por_cliente = self.db.get_vendas_por_cliente(data_inicio, data_fim)
-        if vendas_por_cliente and len(vendas_por_cliente) > 0:
-            fig4 = Figure(figsize=(10, 5))
-            canvas4 = FigureCanvas(fig4)
-            ax4 = fig4.add_subplot(111)
-            nomes = [v[1][:20] + "..." if len(v[1]) > 20 else v[1] for v in vendas_por_cliente[:10]]
-            receitas = [float(v[3]) for v in vendas_por_cliente[:10]]
-            ax4.barh(nomes, receitas, alpha=0.7, color='steelblue')
-            ax4.set_xlabel("Receita Total (R$)", fontsize=10)
-            ax4.set_title("Receita por Cliente (Top 10)", fontsize=11)
-            ax4.tick_params(axis='y', labelsize=9)
-            ax4.tick_params(axis='x', labelsize=9)
-            ax4.grid(True, alpha=0.3, axis='x')
-            fig4.tight_layout(pad=2.5)
-            detalhes_layout.addWidget(canvas4)
-        
-        tabs_clientes.addTab(detalhes_scroll, "Detalhes")
-        
-        self.graph_layout.addWidget(tabs_clientes)
+            for i, (nome, valor) in enumerate(estatisticas):
+                y_pos = 0.65 - 0.18 * i
+                grafico_stats.texto(f'nome_{i}', 0.3, y_pos, nome + ':', ha='right', va='center', fontsize=10)
+                grafico_stats.texto(f'valor_{i}', 0.35, y_pos, valor, ha='left', va='center', fontsize=10, fontweight='bold')
+            grafico_stats.concluir()
+        
+        frequentes = dados['frequentes']
+        self._atualizar_barras_clientes(self.graficos['clientes_frequentes'], frequentes, frequentes['num_compras'])
+
+    def show_detalhes_clientes(self, dados):
+        ticket = dados['ticket']
+        self._atualizar_barras_clientes(self.graficos['clientes_ticket'], ticket, ticket['ticket_medio'], color='orange')
+        por_cliente = dados['por_cliente'][:10]
+        self._atualizar_barras_clientes(self.graficos['clientes_receita'], por_cliente, por_cliente['receita_total'],
+                                        color='steelblue')
 
     def refresh_data(self):
         self.load_categorias()
+        self.marcar_desatualizadas()
         self.on_filtro_changed()
 
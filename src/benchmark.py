@@ -0,0 +1,208 @@
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import date, datetime, timedelta
+import numpy as np
+from mock_data import gerar_dataset
+from pg_temporario import ClusterTemporario
+
+TAMANHOS = {
+    '10k': (10_000, None, 200),
+    '1m': (1_000_000, 500, 5_000),
+    '10m': (10_000_000, 2_000, 50_000)
+}
+
+ANOS_DATASET = 2
+DATA_FIM_DATASET = date(2025, 12, 31)
+CATEGORIA_FILTRO = "Cigarro"
+
+JANELAS = {
+    '7d': (7, None),
+    '30d': (30, None),
+    '365d': (365, None),
+    '365d-categoria': (365, CATEGORIA_FILTRO),
+    'tudo': (ANOS_DATASET * 365, None)
+}
+
+CONSULTAS_JANELA = {
+    'get_vendas_page': lambda db, i, f, c: db.get_vendas_page({'data_inicio': i, 'data_fim': f, 'categoria': c}),
+    'get_vendas_por_periodo': lambda db, i, f, c: db.get_vendas_por_periodo(i, f, c),
+    'get_produtos_mais_vendidos': lambda db, i, f, c: db.get_produtos_mais_vendidos(10, False, i, f, c),
+    'get_total_vendas_periodo': lambda db, i, f, c: db.get_total_vendas_periodo(i, f, c),
+    'get_numero_vendas_periodo': lambda db, i, f, c: db.get_numero_vendas_periodo(i, f, c),
+    'get_ticket_medio': lambda db, i, f, c: db.get_ticket_medio(i, f, c),
+    'get_dashboard_snapshot': lambda db, i, f, c: db.get_dashboard_snapshot(i, f, c),
+    'get_receita_por_periodo': lambda db, i, f, c: db.get_receita_por_periodo(i, f, 'dia', c),
+    'get_vendas_por_dia_semana': lambda db, i, f, c: db.get_vendas_por_dia_semana(i, f, c),
+    'get_comparacao_periodos': lambda db, i, f, c: db.get_comparacao_periodos(i, f, 'metades', c),
+    'get_tendencias_produtos': lambda db, i, f, c: db.get_tendencias_produtos(i, f, c),
+    'get_giro_estoque': lambda db, i, f, c: db.get_giro_estoque(i, f, c),
+    'get_anomalias_vendas': lambda db, i, f, c: db.get_anomalias_vendas(i, f, c),
+    'get_correlacoes': lambda db, i, f, c: db.get_correlacoes(i, f, c),
+    'get_analise_margem': lambda db, i, f, c: db.get_analise_margem(i, f, c),
+    'get_clientes_mais_frequentes': lambda db, i, f, c: db.get_clientes_mais_frequentes(10, i, f),
+    'get_clientes_maior_ticket_medio': lambda db, i, f, c: db.get_clientes_maior_ticket_medio(10, i, f),
+    'get_vendas_por_cliente': lambda db, i, f, c: db.get_vendas_por_cliente(i, f),
+    'get_estatisticas_clientes': lambda db, i, f, c: db.get_estatisticas_clientes(i, f)
+}
+
+CONSULTAS_GERAIS = {
+    'get_produtos': lambda db: db.get_produtos(),
+    'get_produtos_page': lambda db: db.get_produtos_page(),
+    'get_produto': lambda db: db.get_produto(1),
+    'get_clientes': lambda db: db.get_clientes(),
+    'get_clientes_page': lambda db: db.get_clientes_page(),
+    'get_cliente': lambda db: db.get_cliente(1),
+    'get_vendas': lambda db: db.get_vendas(),
+    'get_venda': lambda db: db.get_venda(1),
+    'get_categorias': lambda db: db.get_categorias(),
+    'get_estatisticas_descritivas': lambda db: db.get_estatisticas_descritivas(),
+    'get_estatisticas_descritivas[categoria]': lambda db: db.get_estatisticas_descritivas(CATEGORIA_FILTRO)
+}
+
+
+def contar_linhas(resultado):
+    if resultado is None:
+        return 0
+    if isinstance(resultado, dict):
+        listas = [valor for valor in resultado.values() if isinstance(valor, list)]
+        return sum(len(valor) for valor in listas) if listas else 1
+    if isinstance(resultado, (list, tuple)) and resultado and not isinstance(resultado[0], (list, tuple, dict)):
+        return 1
+    if isinstance(resultado, (list, tuple)):
+        return len(resultado)
+    return 1
+
+
+def medir(funcao, repeticoes, aquecimento):
+    for _ in range(aquecimento):
+        funcao()
+    tempos = []
+    linhas = 0
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        linhas = contar_linhas(resultado)
+    p50, p95, p99 = np.percentile(tempos, [50, 95, 99])
+    return {
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'linhas': linhas,
+        'repeticoes': repeticoes
+    }
+
+
+def casos():
+    fim = datetime.combine(DATA_FIM_DATASET, datetime.max.time())
+    for nome, consulta in CONSULTAS_JANELA.items():
+        for janela, (dias, categoria) in JANELAS.items():
+            inicio = datetime.combine(DATA_FIM_DATASET - timedelta(days=dias - 1), datetime.min.time())
+            yield f"{nome}[{janela}]", nome, (lambda db, consulta=consulta, inicio=inicio, categoria=categoria:
+                                              consulta(db, inicio, fim, categoria))
+    for nome, consulta in CONSULTAS_GERAIS.items():
+        yield nome, nome.split('[')[0], consulta
+
+
+def popular(cluster, tamanho, seed):
+    nome_banco = f"bench_{tamanho}"
+    novo = cluster.criar_banco(nome_banco)
+    db = cluster.database(nome_banco)
+    if not db.connect():
+        raise RuntimeError(f"Não foi possível conectar em {nome_banco}.")
+    if novo:
+        vendas, produtos, clientes = TAMANHOS[tamanho]
+        inicio = time.perf_counter()
+        resumo = gerar_dataset(
+            db, seed=seed, anos=ANOS_DATASET, num_produtos=produtos, num_clientes=clientes,
+            vendas_por_dia=vendas / (ANOS_DATASET * 365), data_fim=DATA_FIM_DATASET
+        )
+        cluster.vacuum(nome_banco)
+        print(f"[{tamanho}] {resumo['vendas']} vendas geradas em {time.perf_counter() - inicio:.1f}s", file=sys.stderr)
+    return db
+
+
+def executar(cluster, tamanhos, repeticoes, aquecimento, seed, filtro_metodos=None):
+    resultados = {}
+    for tamanho in tamanhos:
+        db = popular(cluster, tamanho, seed)
+        try:
+            resultados[tamanho] = {}
+            for caso, metodo, funcao in casos():
+                if filtro_metodos and metodo not in filtro_metodos:
+                    continue
+                resultados[tamanho][caso] = medir(lambda: funcao(db), repeticoes, aquecimento)
+                r = resultados[tamanho][caso]
+                print(f"[{tamanho}] {caso:<50} p50={r['p50_ms']:>10.2f}ms p95={r['p95_ms']:>10.2f}ms "
+                      f"p99={r['p99_ms']:>10.2f}ms linhas={r['linhas']}", file=sys.stderr)
+        finally:
+            db.disconnect()
+    return resultados
+
+
+def comparar(resultados, baseline, limite, folga_ms):
+    regressoes = []
+    for tamanho, casos_tamanho in resultados.items():
+        base_tamanho = baseline.get('resultados', {}).get(tamanho, {})
+        for caso, atual in casos_tamanho.items():
+            base = base_tamanho.get(caso)
+            if not base:
+                continue
+            for metrica in ('p50_ms', 'p95_ms'):
+                if atual[metrica] > base[metrica] * (1 + limite) and atual[metrica] - base[metrica] > folga_ms:
+                    regressoes.append((tamanho, caso, metrica, base[metrica], atual[metrica]))
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede a latência das consultas de Database em bases de vários tamanhos.")
+    parser.add_argument("--tamanhos", default="10k", help=f"Lista separada por vírgulas: {', '.join(TAMANHOS)}")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--aquecimento", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--metodos", default=None, help="Mede apenas os métodos listados (separados por vírgulas).")
+    parser.add_argument("--diretorio", default=None, help="Mantém o cluster neste diretório para reaproveitar os dados.")
+    parser.add_argument("--saida", default=None, help="Grava os resultados como baseline JSON.")
+    parser.add_argument("--baseline", default=None, help="Compara com uma baseline JSON gravada anteriormente.")
+    parser.add_argument("--limite", type=float, default=0.25, help="Regressão relativa tolerada (0.25 = 25%%).")
+    parser.add_argument("--folga-ms", type=float, default=2.0, help="Diferença absoluta mínima para contar regressão.")
+    args = parser.parse_args(argv)
+
+    tamanhos = [t.strip() for t in args.tamanhos.split(",") if t.strip()]
+    invalidos = [t for t in tamanhos if t not in TAMANHOS]
+    if invalidos:
+        parser.error(f"tamanhos desconhecidos: {', '.join(invalidos)}")
+    filtro_metodos = set(args.metodos.split(",")) if args.metodos else None
+
+    with ClusterTemporario(args.diretorio) as cluster:
+        resultados = executar(cluster, tamanhos, args.repeticoes, args.aquecimento, args.seed, filtro_metodos)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump({
+                'meta': {
+                    'data': datetime.now().isoformat(timespec='seconds'),
+                    'python': platform.python_version(),
+                    'maquina': platform.node(),
+                    'seed': args.seed,
+                    'repeticoes': args.repeticoes
+                },
+                'resultados': resultados
+            }, arquivo, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as arquivo:
+            baseline = json.load(arquivo)
+        regressoes = comparar(resultados, baseline, args.limite, args.folga_ms)
+        for tamanho, caso, metrica, antes, depois in regressoes:
+            print(f"REGRESSÃO [{tamanho}] {caso} {metrica}: {antes:.2f}ms -> {depois:.2f}ms", file=sys.stderr)
+        if regressoes:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import sys
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from functools import wraps
+import numpy as np
+
+METODOS_CACHEADOS = [
+    'get_categorias',
+    'get_vendas_por_periodo',
+    'get_produtos_mais_vendidos',
+    'get_total_vendas_periodo',
+    'get_numero_vendas_periodo',
+    'get_ticket_medio',
+    'get_dashboard_snapshot',
+    'get_receita_por_periodo',
+    'get_vendas_por_dia_semana',
+    'get_comparacao_periodos',
+    'get_tendencias_produtos',
+    'get_giro_estoque',
+    'get_estatisticas_descritivas',
+    'get_anomalias_vendas',
+    'get_correlacoes',
+    'get_analise_margem',
+    'get_clientes_mais_frequentes',
+    'get_clientes_maior_ticket_medio',
+    'get_vendas_por_cliente',
+    'get_estatisticas_clientes'
+]
+
+PREFIXOS_ESCRITA = ('add_', 'update_', 'delete_', 'copy_', 'clear_', 'rebuild_')
+
+
+def _objetos_array(valor):
+    if valor.dtype.names:
+        return sum(_objetos_array(valor[campo]) for campo in valor.dtype.names if valor.dtype[campo].hasobject)
+    return sum(tamanho_aproximado(item) for item in valor.flat)
+
+
+def tamanho_aproximado(valor):
+    if isinstance(valor, np.ndarray):
+        tamanho = valor.nbytes + sys.getsizeof(valor)
+        if valor.dtype.hasobject:
+            tamanho += _objetos_array(valor)
+        return tamanho
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho_aproximado(k) + tamanho_aproximado(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple, set)):
+        return sys.getsizeof(valor) + sum(tamanho_aproximado(item) for item in valor)
+    return sys.getsizeof(valor)
+
+
+def _normalizar(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, dict):
+        return tuple(sorted((k, _normalizar(v)) for k, v in valor.items()))
+    if isinstance(valor, (list, tuple)):
+        return tuple(_normalizar(item) for item in valor)
+    return valor
+
+
+class CacheResultados:
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.geracao = 0
+        self.hits = 0
+        self.misses = 0
+        self.descartes = 0
+        self.bytes_usados = 0
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def chave(self, metodo, args, kwargs):
+        return (metodo, _normalizar(args), _normalizar(kwargs))
+
+    def obter(self, chave):
+        with self._lock:
+            if chave in self._entradas:
+                self._entradas.move_to_end(chave)
+                self.hits += 1
+                return True, self._entradas[chave][0]
+            self.misses += 1
+            return False, None
+
+    def guardar(self, chave, valor, geracao):
+        tamanho = tamanho_aproximado(valor)
+        with self._lock:
+            if geracao != self.geracao or tamanho > self.max_bytes:
+                return
+            if chave in self._entradas:
+                self.bytes_usados -= self._entradas.pop(chave)[1]
+            self._entradas[chave] = (valor, tamanho)
+            self.bytes_usados += tamanho
+            while self.bytes_usados > self.max_bytes:
+                _, (_, removido) = self._entradas.popitem(last=False)
+                self.bytes_usados -= removido
+                self.descartes += 1
+
+    def invalidar(self):
+        with self._lock:
+            self.geracao += 1
+            self._entradas.clear()
+            self.bytes_usados = 0
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                'entradas': len(self._entradas),
+                'bytes': self.bytes_usados,
+                'max_bytes': self.max_bytes,
+                'geracao': self.geracao,
+                'hits': self.hits,
+                'misses': self.misses,
+                'taxa_acerto': round(self.hits / consultas, 3) if consultas else 0.0,
+                'descartes': self.descartes
+            }
+
+
+def _leitura_cacheada(cache, nome, metodo):
+    @wraps(metodo)
+    def cacheado(*args, **kwargs):
+        chave = cache.chave(nome, args, kwargs)
+        encontrado, valor = cache.obter(chave)
+        if encontrado:
+            return valor
+        geracao = cache.geracao
+        valor = metodo(*args, **kwargs)
+        cache.guardar(chave, valor, geracao)
+        return valor
+    return cacheado
+
+
+def _escrita_invalidante(cache, metodo):
+    @wraps(metodo)
+    def invalidante(*args, **kwargs):
+        cache.invalidar()
+        try:
+            return metodo(*args, **kwargs)
+        finally:
+            cache.invalidar()
+    return invalidante
+
+
+def ativar_cache(db, cache=None):
+    db.cache = cache or CacheResultados()
+    for nome in METODOS_CACHEADOS:
+        setattr(db, nome, _leitura_cacheada(db.cache, nome, getattr(db, nome)))
+    for nome in dir(type(db)):
+        if nome.startswith(PREFIXOS_ESCRITA):
+            setattr(db, nome, _escrita_invalidante(db.cache, getattr(db, nome)))
+    return db
@@ -0,0 +1,54 @@
+import inspect
+from functools import wraps
+from cache import METODOS_CACHEADOS, _normalizar
+
+AGRUPAMENTOS_NAO_DIARIOS = ('semana', 'mes')
+
+
+def _receita_por_periodo(db, argumentos):
+    if argumentos['agrupamento'] in AGRUPAMENTOS_NAO_DIARIOS:
+        return None
+    return lambda: db.get_vendas_por_periodo(argumentos['data_inicio'], argumentos['data_fim'], argumentos['categoria'])
+
+
+def _ticket_medio(db, argumentos):
+    def calcular():
+        total = db.get_total_vendas_periodo(**argumentos)
+        numero = db.get_numero_vendas_periodo(**argumentos)
+        return total / numero if numero and total else 0
+    return calcular
+
+
+EQUIVALENCIAS = {
+    'get_receita_por_periodo': _receita_por_periodo,
+    'get_ticket_medio': _ticket_medio
+}
+
+
+def _memoizado(db, nome, metodo):
+    assinatura = inspect.signature(getattr(type(db), nome))
+    equivalente = EQUIVALENCIAS.get(nome)
+
+    @wraps(metodo)
+    def memoizado(*args, **kwargs):
+        contexto = db.contexto_atual()
+        if contexto is None:
+            return metodo(*args, **kwargs)
+        vinculo = assinatura.bind(db, *args, **kwargs)
+        vinculo.apply_defaults()
+        argumentos = dict(list(vinculo.arguments.items())[1:])
+        chave = (nome, _normalizar(argumentos))
+        if chave in contexto.resultados:
+            contexto.reaproveitadas += 1
+            return contexto.resultados[chave]
+        calcular = equivalente(db, argumentos) if equivalente else None
+        resultado = calcular() if calcular else metodo(*args, **kwargs)
+        contexto.resultados[chave] = resultado
+        return resultado
+    return memoizado
+
+
+def ativar_deduplicacao(db):
+    for nome in METODOS_CACHEADOS:
+        setattr(db, nome, _memoizado(db, nome, getattr(db, nome)))
+    return db
@@ -1,142 +1,348 @@
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
 import os
+import threading
+import uuid
+from contextlib import contextmanager
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
+from pool import PoolConexoes
+from migracoes import aplicar_migracoes
 
 load_dotenv()
 
+NUMERIC_FLOAT = psycopg2.extensions.new_type(
+    psycopg2.extensions.DECIMAL.values, 'NUMERIC_FLOAT',
+    lambda valor, cursor: float(valor) if valor is not None else None
+)
+
+def _como_data(valor):
+    return valor.date() if isinstance(valor, datetime) else valor
+
+def _ano_anterior(valor):
+    try:
+        return valor.replace(year=valor.year - 1)
+    except ValueError:
+        return valor.replace(year=valor.year - 1, day=28)
+
+def intervalo_aberto(data_inicio, data_fim):
+    return _como_data(data_inicio), _como_data(data_fim) + timedelta(days=1)
+
+def filtro_intervalo(coluna, data_inicio, data_fim):
+    return f"{coluna} >= %s AND {coluna} < %s", list(intervalo_aberto(data_inicio, data_fim))
+
+def dividir_periodo(data_inicio, data_fim, modo='metades', partes=2):
+    inicio, fim = intervalo_aberto(data_inicio, data_fim)
+    if fim <= inicio:
+        raise ValueError(f"Período inválido: {data_inicio} a {data_fim}")
+    if modo == 'metades':
+        meio = inicio + timedelta(days=(fim - inicio).days // 2)
+        return [(inicio, meio), (meio, fim)]
+    if modo == 'partes':
+        dias = max(1, (fim - inicio).days)
+        partes = max(1, min(partes, dias))
+        limites = [inicio + timedelta(days=dias * k // partes) for k in range(partes + 1)]
+        return list(zip(limites[:-1], limites[1:]))
+    if modo == 'semanas':
+        periodos = []
+        atual = inicio
+        while atual < fim:
+            proximo = min(fim, atual + timedelta(days=7 - atual.weekday()))
+            periodos.append((atual, proximo))
+            atual = proximo
+        return periodos
+    if modo == 'meses':
+        periodos = []
+        atual = inicio
+        while atual < fim:
+            if atual.month == 12:
+                proximo = atual.replace(year=atual.year + 1, month=1, day=1)
+            else:
+                proximo = atual.replace(month=atual.month + 1, day=1)
+            proximo = min(fim, proximo)
+            periodos.append((atual, proximo))
+            atual = proximo
+        return periodos
+    if modo == 'periodo_anterior':
+        duracao = fim - inicio
+        return [(inicio - duracao, inicio), (inicio, fim)]
+    if modo == 'ano_anterior':
+        return [(_ano_anterior(inicio), _ano_anterior(fim)), (inicio, fim)]
+    raise ValueError(f"Modo de comparação desconhecido: {modo}")
+
+def _metricas_periodo(num_vendas, receita, clientes, unidades):
+    receita = float(receita)
+    return {
+        'num_vendas': num_vendas,
+        'receita': receita,
+        'ticket_medio': receita / num_vendas if num_vendas > 0 else 0,
+        'clientes': clientes,
+        'unidades': int(unidades)
+    }
+
+def variacao_percentual(anterior, atual):
+    if anterior > 0:
+        return ((atual - anterior) / anterior) * 100
+    return 100 if atual > 0 else 0
+
+class ConsultaCancelada(Exception):
+    pass
+
+class TokenCancelamento:
+    def __init__(self):
+        self.cancelado = False
+        self._conexoes = set()
+        self._lock = threading.Lock()
+
+    def registrar(self, conn):
+        with self._lock:
+            if self.cancelado:
+                raise ConsultaCancelada()
+            self._conexoes.add(conn)
+
+    def remover(self, conn):
+        with self._lock:
+            self._conexoes.discard(conn)
+
+    def cancelar(self):
+        with self._lock:
+            self.cancelado = True
+            for conn in self._conexoes:
+                try:
+                    conn.cancel()
+                except psycopg2.Error:
+                    pass
+
+class ContextoConsulta:
+    def __init__(self):
+        self.resultados = {}
+        self.reaproveitadas = 0
+
 class Database:
-    def __init__(self, dbname="TabacariaDB", user="postgres", password=None, host="localhost", port="5432"):
+    def __init__(self, dbname="TabacariaDB", user="postgres", password=None, host="localhost", port="5432",
+                 pool_min=1, pool_max=8, pool_timeout=10.0, itersize=2000):
         self.dbname = dbname
         self.user = user
         self.password = password or os.getenv("DB_PASSWORD", "")
         self.host = host
         self.port = port
-        self.conn = None
-        self.cursor = None
+        self.pool_min = pool_min
+        self.pool_max = pool_max
+        self.pool_timeout = pool_timeout
+        self.itersize = itersize
+        self.pool = None
+        self.versao_schema = 0
+        self.cursor_factory = None
+        self.cache = None
+        self.agregados = None
+        self.motor = None
+        self._local = threading.local()
 
     def connect(self):
         try:
-            self.conn = psycopg2.connect(
+            self.pool = PoolConexoes(
+                minconn=self.pool_min,
+                maxconn=self.pool_max,
+                timeout=self.pool_timeout,
                 dbname=self.dbname,
                 user=self.user,
                 password=self.password,
                 host=self.host,
                 port=self.port
             )
-            self.cursor = self.conn.cursor()
-            self.init_tables()
+            self.versao_schema = aplicar_migracoes(self)
             return True
         except Exception:
+            self.disconnect()
             return False
 
-    def init_tables(self):
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS produtos (
-                id SERIAL PRIMARY KEY,
-                nome VARCHAR(255) NOT NULL,
-                categoria VARCHAR(100),
-                preco DECIMAL(10,2) NOT NULL,
-                custo DECIMAL(10,2) DEFAULT 0,
-                quantidade INTEGER NOT NULL DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+    @contextmanager
+    def cancelavel(self, token):
+        anterior = getattr(self._local, 'token', None)
+        self._local.token = token
         try:
-            self.cursor.execute("ALTER TABLE produtos ADD COLUMN IF NOT EXISTS custo DECIMAL(10,2) DEFAULT 0")
-            self.conn.commit()
-        except Exception:
-            pass
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS clientes (
-                id SERIAL PRIMARY KEY,
-                nome VARCHAR(255) NOT NULL,
-                email VARCHAR(255),
-                telefone VARCHAR(20),
-                data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS vendas (
-                id SERIAL PRIMARY KEY,
-                produto_id INTEGER REFERENCES produtos(id),
-                cliente_id INTEGER REFERENCES clientes(id),
-                quantidade INTEGER NOT NULL,
-                preco_unitario DECIMAL(10,2) NOT NULL,
-                total DECIMAL(10,2) NOT NULL,
-                data_venda TIMESTAMP NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+            yield token
+        finally:
+            self._local.token = anterior
+
+    @contextmanager
+    def modo_analitico(self):
+        anterior = getattr(self._local, 'analitico', False)
+        self._local.analitico = True
         try:
-            self.cursor.execute("ALTER TABLE vendas ADD COLUMN IF NOT EXISTS cliente_id INTEGER REFERENCES clientes(id)")
-            self.conn.commit()
-        except Exception:
-            pass
-        self.conn.commit()
+            yield
+        finally:
+            self._local.analitico = anterior
+
+    @contextmanager
+    def contexto_consulta(self, contexto=None):
+        anterior = getattr(self._local, 'contexto', None)
+        self._local.contexto = anterior or contexto or ContextoConsulta()
+        try:
+            yield self._local.contexto
+        finally:
+            self._local.contexto = anterior
+
+    def contexto_atual(self):
+        return getattr(self._local, 'contexto', None)
+
+    @contextmanager
+    def cursor(self, nome=None):
+        token = getattr(self._local, 'token', None)
+        conn = self.pool.getconn()
+        try:
+            if token:
+                token.registrar(conn)
+            with conn.cursor(nome, cursor_factory=self.cursor_factory) as cursor:
+                if nome:
+                    cursor.itersize = self.itersize
+                if getattr(self._local, 'analitico', False):
+                    psycopg2.extensions.register_type(NUMERIC_FLOAT, cursor)
+                yield cursor
+            conn.commit()
+        except BaseException:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            if token:
+                token.remover(conn)
+            self.pool.putconn(conn)
+
+    def iterar_lotes(self, query, params=(), itersize=None):
+        tamanho = itersize or self.itersize
+        with self.cursor(nome=f"fluxo_{uuid.uuid4().hex}") as cursor:
+            cursor.itersize = tamanho
+            cursor.execute(query, params)
+            while True:
+                lote = cursor.fetchmany(tamanho)
+                if not lote:
+                    break
+                yield lote
 
     def disconnect(self):
-        if self.cursor:
-            self.cursor.close()
-        if self.conn:
-            self.conn.close()
+        if self.pool:
+            self.pool.closeall()
+        self.pool = None
 
     def get_produtos(self):
-        self.cursor.execute("SELECT id, nome, categoria, preco, COALESCE(custo, 0), quantidade FROM produtos ORDER BY id")
-        return self.cursor.fetchall()
+        with self.cursor() as cursor:
+            cursor.execute("SELECT id, nome, categoria, preco, COALESCE(custo, 0), quantidade FROM produtos ORDER BY id")
+            return cursor.fetchall()
+
+    def get_produtos_page(self, filtros=None, after_key=None, limit=200):
+        filtros = filtros or {}
+        query = "SELECT id, nome, categoria, preco, COALESCE(custo, 0), quantidade FROM produtos"
+        conditions = []
+        params = []
+        if filtros.get('categoria'):
+            conditions.append("categoria = %s")
+            params.append(filtros['categoria'])
+        if after_key:
+            conditions.append("id > %s")
+            params.append(after_key)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id LIMIT %s"
+        params.append(limit)
+        with self.cursor() as cursor:
+            cursor.execute(query, tuple(params))
+            return cursor.fetchall()
 
     def get_produto(self, produto_id):
-        self.cursor.execute("SELECT id, nome, categoria, preco, COALESCE(custo, 0), quantidade FROM produtos WHERE id=%s", (produto_id,))
-        return self.cursor.fetchone()
+        with self.cursor() as cursor:
+            cursor.execute("SELECT id, nome, categoria, preco, COALESCE(custo, 0), quantidade FROM produtos WHERE id=%s", (produto_id,))
+            return cursor.fetchone()
 
     def add_produto(self, nome, categoria, preco, quantidade, custo=0):
-        self.cursor.execute("""
-            INSERT INTO produtos (nome, categoria, preco, custo, quantidade)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (nome, categoria, preco, custo, quantidade))
-        self.conn.commit()
+        with self.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO produtos (nome, categoria, preco, custo, quantidade)
+                VALUES (%s, %s, %s, %s, %s)
+                RETURNING id
+            """, (nome, categoria, preco, custo, quantidade))
+            return cursor.fetchone()[0]
+
+    def add_produtos_bulk(self, produtos):
+        with self.cursor() as cursor:
+            rows = execute_values(cursor, """
+                INSERT INTO produtos (nome, categoria, preco, custo, quantidade)
+                VALUES %s
+                RETURNING id
+            """, produtos, fetch=True)
+            return [row[0] for row in rows]
 
     def update_produto(self, produto_id, nome, categoria, preco, quantidade, custo=0):
-        self.cursor.execute("""
-            UPDATE produtos SET nome=%s, categoria=%s, preco=%s, custo=%s, quantidade=%s
-            WHERE id=%s
-        """, (nome, categoria, preco, custo, quantidade, produto_id))
-        self.conn.commit()
+        with self.cursor() as cursor:
+            cursor.execute("""
+                UPDATE produtos SET nome=%s, categoria=%s, preco=%s, custo=%s, quantidade=%s
+                WHERE id=%s
+            """, (nome, categoria, preco, custo, quantidade, produto_id))
 
     def delete_produto(self, produto_id):
-        self.cursor.execute("DELETE FROM produtos WHERE id=%s", (produto_id,))
-        self.conn.commit()
+        with self.cursor() as cursor:
+            cursor.execute("DELETE FROM produtos WHERE id=%s", (produto_id,))
 
     def get_clientes(self):
-        self.cursor.execute("SELECT id, nome, email, telefone, data_cadastro FROM clientes ORDER BY nome")
-        return self.cursor.fetchall()
+        with self.cursor() as cursor:
+            cursor.execute("SELECT id, nome, email, telefone, data_cadastro FROM clientes ORDER BY nome")
+            return cursor.fetchall()
+
+    def get_clientes_page(self, after_key=None, limit=200):
+        with self.cursor() as cursor:
+            if after_key:
+                cursor.execute("""
+                    SELECT id, nome, email, telefone, data_cadastro FROM clientes
+                    WHERE (nome, id) > (%s, %s)
+                    ORDER BY nome, id
+                    LIMIT %s
+                """, (after_key[0], after_key[1], limit))
+            else:
+                cursor.execute("""
+                    SELECT id, nome, email, telefone, data_cadastro FROM clientes
+                    ORDER BY nome, id
+                    LIMIT %s
+                """, (limit,))
+            return cursor.fetchall()
 
     def get_cliente(self, cliente_id):
-        self.cursor.execute("SELECT id, nome, email, telefone, data_cadastro FROM clientes WHERE id=%s", (cliente_id,))
-        return self.cursor.fetchone()
+        with self.cursor() as cursor:
+            cursor.execute("SELECT id, nome, email, telefone, data_cadastro FROM clientes WHERE id=%s", (cliente_id,))
+            return cursor.fetchone()
 
     def add_cliente(self, nome, email=None, telefone=None):
-        self.cursor.execute("""
-            INSERT INTO clientes (nome, email, telefone)
-            VALUES (%s, %s, %s)
-        """, (nome, email, telefone))
-        self.conn.commit()
+        with self.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO clientes (nome, email, telefone)
+                VALUES (%s, %s, %s)
+                RETURNING id
+            """, (nome, email, telefone))
+            return cursor.fetchone()[0]
+
+    def add_clientes_bulk(self, clientes):
+        with self.cursor() as cursor:
+            rows = execute_values(cursor, """
+                INSERT INTO clientes (nome, email, telefone)
+                VALUES %s
+                RETURNING id
+            """, clientes, fetch=True)
+            return [row[0] for row in rows]
 
     def update_cliente(self, cliente_id, nome, email=None, telefone=None):
-        self.cursor.execute("""
-            UPDATE clientes SET nome=%s, email=%s, telefone=%s
-            WHERE id=%s
-        """, (nome, email, telefone, cliente_id))
-        self.conn.commit()
+        with self.cursor() as cursor:
+            cursor.execute("""
+                UPDATE clientes SET nome=%s, email=%s, telefone=%s
+                WHERE id=%s
+            """, (nome, email, telefone, cliente_id))
 
     def delete_cliente(self, cliente_id):
-        self.cursor.execute("UPDATE vendas SET cliente_id = NULL WHERE cliente_id = %s", (cliente_id,))
-        self.cursor.execute("DELETE FROM clientes WHERE id=%s", (cliente_id,))
-        self.conn.commit()
+        with self.cursor() as cursor:
+            cursor.execute("UPDATE vendas SET cliente_id = NULL WHERE cliente_id = %s", (cliente_id,))
+            cursor.execute("DELETE FROM clientes WHERE id=%s", (cliente_id,))
 
-    def get_vendas(self):
-        self.cursor.execute("""
+    def iter_vendas(self, itersize=None):
+        yield from self.iterar_lotes("""
             SELECT v.id, v.produto_id, p.nome, p.categoria, v.quantidade, 
                    v.preco_unitario, v.total, v.data_venda, v.cliente_id,
                    COALESCE(c.nome, 'Cliente não informado') as cliente_nome
@@ -144,73 +350,152 @@ class Database:
             LEFT JOIN produtos p ON v.produto_id = p.id
             LEFT JOIN clientes c ON v.cliente_id = c.id
             ORDER BY v.data_venda DESC
-        """)
-        return self.cursor.fetchall()
+        """, itersize=itersize)
 
-    def get_venda(self, venda_id):
-        self.cursor.execute("""
-            SELECT v.id, v.produto_id, p.nome, v.quantidade, 
-                   v.preco_unitario, v.total, v.data_venda, v.cliente_id
+    def get_vendas(self):
+        return [venda for lote in self.iter_vendas() for venda in lote]
+
+    def get_vendas_page(self, filtros=None, after_key=None, limit=200):
+        filtros = filtros or {}
+        query = """
+            SELECT v.id, v.produto_id, p.nome, p.categoria, v.quantidade,
+                   v.preco_unitario, v.total, v.data_venda, v.cliente_id,
+                   COALESCE(c.nome, 'Cliente não informado') as cliente_nome
             FROM vendas v
             LEFT JOIN produtos p ON v.produto_id = p.id
-            WHERE v.id=%s
-        """, (venda_id,))
-        return self.cursor.fetchone()
+            LEFT JOIN clientes c ON v.cliente_id = c.id
+        """
+        conditions = []
+        params = []
+        if filtros.get('data_inicio') and filtros.get('data_fim'):
+            condicao, intervalo = filtro_intervalo("v.data_venda", filtros['data_inicio'], filtros['data_fim'])
+            conditions.append(condicao)
+            params.extend(intervalo)
+        if filtros.get('categoria'):
+            conditions.append("p.categoria = %s")
+            params.append(filtros['categoria'])
+        if filtros.get('produto_id'):
+            conditions.append("v.produto_id = %s")
+            params.append(filtros['produto_id'])
+        if filtros.get('cliente_id'):
+            conditions.append("v.cliente_id = %s")
+            params.append(filtros['cliente_id'])
+        if after_key:
+            conditions.append("(v.data_venda, v.id) < (%s, %s)")
+            params.extend(after_key)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += """
+            ORDER BY v.data_venda DESC, v.id DESC
+            LIMIT %s
+        """
+        params.append(limit)
+        with self.cursor() as cursor:
+            cursor.execute(query, tuple(params))
+            return cursor.fetchall()
+
+    def get_venda(self, venda_id):
+        with self.cursor() as cursor:
+            cursor.execute("""
+                SELECT v.id, v.produto_id, p.nome, v.quantidade, 
+                       v.preco_unitario, v.total, v.data_venda, v.cliente_id
+                FROM vendas v
+                LEFT JOIN produtos p ON v.produto_id = p.id
+                WHERE v.id=%s
+            """, (venda_id,))
+            return cursor.fetchone()
 
     def add_venda(self, produto_id, quantidade, preco_unitario, total, data_venda, cliente_id=None):
-        self.cursor.execute("""
-            INSERT INTO vendas (produto_id, cliente_id, quantidade, preco_unitario, total, data_venda)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (produto_id, cliente_id, quantidade, preco_unitario, total, data_venda))
-        self.cursor.execute("""
-            UPDATE produtos SET quantidade = quantidade - %s WHERE id = %s
-        """, (quantidade, produto_id))
-        self.conn.commit()
+        with self.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO vendas (produto_id, cliente_id, quantidade, preco_unitario, total, data_venda)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, (produto_id, cliente_id, quantidade, preco_unitario, total, data_venda))
+            cursor.execute("""
+                UPDATE produtos SET quantidade = quantidade - %s WHERE id = %s
+            """, (quantidade, produto_id))
+
+    def add_vendas_bulk(self, vendas, tamanho_lote=1000):
+        inseridas = 0
+        lote = []
+        for venda in vendas:
+            venda = tuple(venda)
+            lote.append(venda if len(venda) == 6 else venda + (None,))
+            if len(lote) >= tamanho_lote:
+                inseridas += self._inserir_lote_vendas(lote)
+                lote = []
+        if lote:
+            inseridas += self._inserir_lote_vendas(lote)
+        return inseridas
+
+    def _inserir_lote_vendas(self, lote):
+        estoque = {}
+        for produto_id, quantidade, *_ in lote:
+            estoque[produto_id] = estoque.get(produto_id, 0) + quantidade
+        with self.cursor() as cursor:
+            execute_values(cursor, """
+                INSERT INTO vendas (produto_id, quantidade, preco_unitario, total, data_venda, cliente_id)
+                VALUES %s
+            """, lote, page_size=len(lote))
+            execute_values(cursor, """
+                UPDATE produtos p SET quantidade = p.quantidade - d.qtd
+                FROM (VALUES %s) AS d(produto_id, qtd)
+                WHERE p.id = d.produto_id
+            """, sorted(estoque.items()), page_size=len(estoque))
+        return len(lote)
+
+    def copy_vendas(self, arquivo):
+        with self.cursor() as cursor:
+            cursor.copy_expert("""
+                COPY vendas (produto_id, cliente_id, quantidade, preco_unitario, total, data_venda)
+                FROM STDIN WITH (FORMAT csv)
+            """, arquivo)
+            return cursor.rowcount
 
     def update_venda(self, venda_id, produto_id, quantidade, preco_unitario, total, data_venda, cliente_id=None):
-        self.cursor.execute("SELECT produto_id, quantidade FROM vendas WHERE id=%s", (venda_id,))
-        old = self.cursor.fetchone()
-        if old:
-            old_produto_id, old_quantidade = old
-            self.cursor.execute("UPDATE produtos SET quantidade = quantidade + %s WHERE id = %s", 
-                              (old_quantidade, old_produto_id))
-        self.cursor.execute("""
-            UPDATE vendas SET produto_id=%s, cliente_id=%s, quantidade=%s, preco_unitario=%s, total=%s, data_venda=%s
-            WHERE id=%s
-        """, (produto_id, cliente_id, quantidade, preco_unitario, total, data_venda, venda_id))
-        self.cursor.execute("UPDATE produtos SET quantidade = quantidade - %s WHERE id = %s", 
-                          (quantidade, produto_id))
-        self.conn.commit()
+        with self.cursor() as cursor:
+            cursor.execute("SELECT produto_id, quantidade FROM vendas WHERE id=%s", (venda_id,))
+            old = cursor.fetchone()
+            if old:
+                old_produto_id, old_quantidade = old
+                cursor.execute("UPDATE produtos SET quantidade = quantidade + %s WHERE id = %s", 
+                                  (old_quantidade, old_produto_id))
+            cursor.execute("""
+                UPDATE vendas SET produto_id=%s, cliente_id=%s, quantidade=%s, preco_unitario=%s, total=%s, data_venda=%s
+                WHERE id=%s
+            """, (produto_id, cliente_id, quantidade, preco_unitario, total, data_venda, venda_id))
+            cursor.execute("UPDATE produtos SET quantidade = quantidade - %s WHERE id = %s", 
+                              (quantidade, produto_id))
 
     def delete_venda(self, venda_id):
-        self.cursor.execute("SELECT produto_id, quantidade FROM vendas WHERE id=%s", (venda_id,))
-        old = self.cursor.fetchone()
-        if old:
-            produto_id, quantidade = old
-            self.cursor.execute("UPDATE produtos SET quantidade = quantidade + %s WHERE id = %s", 
-                              (quantidade, produto_id))
-        self.cursor.execute("DELETE FROM vendas WHERE id=%s", (venda_id,))
-        self.conn.commit()
+        with self.cursor() as cursor:
+            cursor.execute("SELECT produto_id, quantidade FROM vendas WHERE id=%s", (venda_id,))
+            old = cursor.fetchone()
+            if old:
+                produto_id, quantidade = old
+                cursor.execute("UPDATE produtos SET quantidade = quantidade + %s WHERE id = %s", 
+                                  (quantidade, produto_id))
+            cursor.execute("DELETE FROM vendas WHERE id=%s", (venda_id,))
+
+    def _filtro_diario(self, data_inicio, data_fim, categoria=None):
+        condicao, params = filtro_intervalo("dia", data_inicio, data_fim)
+        conditions = [condicao]
+        if categoria:
+            conditions.append("categoria = %s")
+            params.append(categoria)
+        return " WHERE " + " AND ".join(conditions), params
 
     def get_vendas_por_periodo(self, data_inicio, data_fim, categoria=None):
-        if categoria:
-            self.cursor.execute("""
-                SELECT DATE(v.data_venda), SUM(v.total)
-                FROM vendas v
-                JOIN produtos p ON v.produto_id = p.id
-                WHERE v.data_venda BETWEEN %s AND %s AND p.categoria = %s
-                GROUP BY DATE(v.data_venda)
-                ORDER BY DATE(v.data_venda)
-            """, (data_inicio, data_fim, categoria))
-        else:
-            self.cursor.execute("""
-                SELECT DATE(data_venda), SUM(total)
-                FROM vendas
-                WHERE data_venda BETWEEN %s AND %s
-                GROUP BY DATE(data_venda)
-                ORDER BY DATE(data_venda)
-            """, (data_inicio, data_fim))
-        return self.cursor.fetchall()
+        where, params = self._filtro_diario(data_inicio, data_fim, categoria)
+        with self.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT dia, SUM(receita)
+                FROM vendas_diarias
+                {where}
+                GROUP BY dia
+                ORDER BY dia
+            """, tuple(params))
+            return cursor.fetchall()
 
     def get_produtos_mais_vendidos(self, limite=10, por_receita=False, data_inicio=None, data_fim=None, categoria=None):
         query = f"""
@@ -221,8 +506,9 @@ class Database:
         conditions = []
         params = []
         if data_inicio and data_fim:
-            conditions.append("v.data_venda BETWEEN %s AND %s")
-            params.extend([data_inicio, data_fim])
+            condicao, intervalo = filtro_intervalo("v.data_venda", data_inicio, data_fim)
+            conditions.append(condicao)
+            params.extend(intervalo)
         if categoria:
             conditions.append("p.categoria = %s")
             params.append(categoria)
@@ -234,236 +520,222 @@ class Database:
             LIMIT %s
         """
         params.append(limite)
-        self.cursor.execute(query, tuple(params))
-        return self.cursor.fetchall()
+        with self.cursor() as cursor:
+            cursor.execute(query, tuple(params))
+            return cursor.fetchall()
 
     def get_total_vendas_periodo(self, data_inicio, data_fim, categoria=None):
-        if categoria:
-            self.cursor.execute("""
-                SELECT SUM(v.total) FROM vendas v
-                JOIN produtos p ON v.produto_id = p.id
-                WHERE v.data_venda BETWEEN %s AND %s AND p.categoria = %s
-            """, (data_inicio, data_fim, categoria))
-        else:
-            self.cursor.execute("""
-                SELECT SUM(total) FROM vendas
-                WHERE data_venda BETWEEN %s AND %s
-            """, (data_inicio, data_fim))
-        result = self.cursor.fetchone()
-        return result[0] if result and result[0] else 0
+        where, params = self._filtro_diario(data_inicio, data_fim, categoria)
+        with self.cursor() as cursor:
+            cursor.execute(f"SELECT SUM(receita) FROM vendas_diarias {where}", tuple(params))
+            result = cursor.fetchone()
+            return result[0] if result and result[0] else 0
 
     def get_numero_vendas_periodo(self, data_inicio, data_fim, categoria=None):
-        if categoria:
-            self.cursor.execute("""
-                SELECT COUNT(*) FROM vendas v
-                JOIN produtos p ON v.produto_id = p.id
-                WHERE v.data_venda BETWEEN %s AND %s AND p.categoria = %s
-            """, (data_inicio, data_fim, categoria))
-        else:
-            self.cursor.execute("""
-                SELECT COUNT(*) FROM vendas
-                WHERE data_venda BETWEEN %s AND %s
-            """, (data_inicio, data_fim))
-        result = self.cursor.fetchone()
-        return result[0] if result else 0
+        where, params = self._filtro_diario(data_inicio, data_fim, categoria)
+        with self.cursor() as cursor:
+            cursor.execute(f"SELECT COALESCE(SUM(num_vendas), 0)::bigint FROM vendas_diarias {where}", tuple(params))
+            result = cursor.fetchone()
+            return result[0] if result else 0
 
     def get_ticket_medio(self, data_inicio, data_fim, categoria=None):
-        total = self.get_total_vendas_periodo(data_inicio, data_fim, categoria)
-        num_vendas = self.get_numero_vendas_periodo(data_inicio, data_fim, categoria)
-        return total / num_vendas if num_vendas > 0 else 0
+        where, params = self._filtro_diario(data_inicio, data_fim, categoria)
+        with self.cursor() as cursor:
+            cursor.execute(f"SELECT SUM(receita) / NULLIF(SUM(num_vendas), 0) FROM vendas_diarias {where}", tuple(params))
+            result = cursor.fetchone()
+            return result[0] if result and result[0] else 0
+
+    def get_dashboard_snapshot(self, data_inicio, data_fim, categoria=None):
+        (anterior_inicio, inicio), (_, fim) = dividir_periodo(data_inicio, data_fim, 'periodo_anterior')
+        join = "JOIN produtos p ON v.produto_id = p.id" if categoria else ""
+        conditions = ["v.data_venda >= %s AND v.data_venda < %s"]
+        params = [inicio, anterior_inicio, fim]
+        if categoria:
+            conditions.append("p.categoria = %s")
+            params.append(categoria)
+        with self.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT
+                    COUNT(*) FILTER (WHERE atual),
+                    COALESCE(SUM(total) FILTER (WHERE atual), 0),
+                    COUNT(DISTINCT cliente_id) FILTER (WHERE atual),
+                    COALESCE(SUM(quantidade) FILTER (WHERE atual), 0),
+                    COUNT(*) FILTER (WHERE NOT atual),
+                    COALESCE(SUM(total) FILTER (WHERE NOT atual), 0),
+                    COUNT(DISTINCT cliente_id) FILTER (WHERE NOT atual),
+                    COALESCE(SUM(quantidade) FILTER (WHERE NOT atual), 0)
+                FROM (
+                    SELECT v.total, v.quantidade, v.cliente_id, v.data_venda >= %s AS atual
+                    FROM vendas v
+                    {join}
+                    WHERE {' AND '.join(conditions)}
+                ) s
+            """, tuple(params))
+            result = cursor.fetchone()
+
+        snapshot = _metricas_periodo(*result[:4])
+        snapshot['anterior'] = _metricas_periodo(*result[4:])
+        return snapshot
 
     def get_receita_por_periodo(self, data_inicio, data_fim, agrupamento='dia', categoria=None):
         group_map = {
-            'dia': "DATE(data_venda)",
-            'semana': "DATE_TRUNC('week', data_venda)",
-            'mes': "DATE_TRUNC('month', data_venda)"
+            'dia': "dia",
+            'semana': "DATE_TRUNC('week', dia::timestamp)",
+            'mes': "DATE_TRUNC('month', dia::timestamp)"
         }
-        group_by = group_map.get(agrupamento, "DATE(data_venda)")
-        if categoria:
-            self.cursor.execute(f"""
-                SELECT {group_by}, SUM(v.total)
-                FROM vendas v
-                JOIN produtos p ON v.produto_id = p.id
-                WHERE v.data_venda BETWEEN %s AND %s AND p.categoria = %s
-                GROUP BY {group_by}
-                ORDER BY {group_by}
-            """, (data_inicio, data_fim, categoria))
-        else:
-            self.cursor.execute(f"""
-                SELECT {group_by}, SUM(total)
-                FROM vendas
-                WHERE data_venda BETWEEN %s AND %s
+        group_by = group_map.get(agrupamento, "dia")
+        where, params = self._filtro_diario(data_inicio, data_fim, categoria)
+        with self.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT {group_by}, SUM(receita)
+                FROM vendas_diarias
+                {where}
                 GROUP BY {group_by}
                 ORDER BY {group_by}
-            """, (data_inicio, data_fim))
-        return self.cursor.fetchall()
+            """, tuple(params))
+            return cursor.fetchall()
 
     def get_vendas_por_dia_semana(self, data_inicio, data_fim, categoria=None):
-        if categoria:
-            self.cursor.execute("""
-                SELECT EXTRACT(DOW FROM v.data_venda) as dia_semana, SUM(v.total)
-                FROM vendas v
-                JOIN produtos p ON v.produto_id = p.id
-                WHERE v.data_venda BETWEEN %s AND %s AND p.categoria = %s
-                GROUP BY EXTRACT(DOW FROM v.data_venda)
-                ORDER BY dia_semana
-            """, (data_inicio, data_fim, categoria))
-        else:
-            self.cursor.execute("""
-                SELECT EXTRACT(DOW FROM data_venda) as dia_semana, SUM(total)
-                FROM vendas
-                WHERE data_venda BETWEEN %s AND %s
-                GROUP BY EXTRACT(DOW FROM data_venda)
+        where, params = self._filtro_diario(data_inicio, data_fim, categoria)
+        with self.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT EXTRACT(DOW FROM dia) as dia_semana, SUM(receita)
+                FROM vendas_diarias
+                {where}
+                GROUP BY EXTRACT(DOW FROM dia)
                 ORDER BY dia_semana
-            """, (data_inicio, data_fim))
-        return self.cursor.fetchall()
-
-    def get_tendencias_produtos(self, data_inicio, data_fim, categoria=None):
-        periodo_meio = data_inicio + (data_fim - data_inicio) / 2
+            """, tuple(params))
+            return cursor.fetchall()
+
+    def get_comparacao_periodos(self, data_inicio, data_fim, modo='metades', categoria=None, partes=2):
+        periodos = dividir_periodo(data_inicio, data_fim, modo, partes)
+        if not periodos:
+            return {'periodos': [], 'produtos': []}
+        colunas = []
+        params = []
+        for inicio, fim in periodos:
+            colunas.append("COALESCE(SUM(d.qtd) FILTER (WHERE d.dia >= %s AND d.dia < %s), 0)::bigint")
+            params.extend([inicio, fim])
+        conditions = ["d.dia >= %s AND d.dia < %s"]
+        params.extend([periodos[0][0], periodos[-1][1]])
         if categoria:
-            self.cursor.execute("""
-                SELECT p.id, p.nome, SUM(v.quantidade) as total
-                FROM vendas v
-                JOIN produtos p ON v.produto_id = p.id
-                WHERE v.data_venda BETWEEN %s AND %s AND p.categoria = %s
-                GROUP BY p.id, p.nome
-            """, (data_inicio, periodo_meio, categoria))
-            primeira_metade = {row[0]: row[2] for row in self.cursor.fetchall()}
-            self.cursor.execute("""
-                SELECT p.id, p.nome, SUM(v.quantidade) as total
-                FROM vendas v
-                JOIN produtos p ON v.produto_id = p.id
-                WHERE v.data_venda BETWEEN %s AND %s AND p.categoria = %s
+            conditions.append("d.categoria = %s")
+            params.append(categoria)
+        with self.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT p.id, p.nome, {', '.join(colunas)}
+                FROM vendas_diarias d
+                JOIN produtos p ON p.id = d.produto_id
+                WHERE {' AND '.join(conditions)}
                 GROUP BY p.id, p.nome
-            """, (periodo_meio, data_fim, categoria))
-            segunda_metade = {row[0]: row[2] for row in self.cursor.fetchall()}
-        else:
-            self.cursor.execute("""
-                SELECT produto_id, SUM(quantidade) as total
-                FROM vendas
-                WHERE data_venda BETWEEN %s AND %s
-                GROUP BY produto_id
-            """, (data_inicio, periodo_meio))
-            primeira_metade = {row[0]: row[1] for row in self.cursor.fetchall()}
-            self.cursor.execute("""
-                SELECT produto_id, SUM(quantidade) as total
-                FROM vendas
-                WHERE data_venda BETWEEN %s AND %s
-                GROUP BY produto_id
-            """, (periodo_meio, data_fim))
-            segunda_metade = {row[0]: row[1] for row in self.cursor.fetchall()}
+            """, tuple(params))
+            rows = cursor.fetchall()
+        return {
+            'periodos': periodos,
+            'produtos': [{'id': row[0], 'nome': row[1], 'quantidades': list(row[2:])} for row in rows]
+        }
+
+    def get_tendencias_produtos(self, data_inicio, data_fim, categoria=None):
+        comparacao = self.get_comparacao_periodos(data_inicio, data_fim, 'metades', categoria)
         tendencias = []
-        todos_ids = set(primeira_metade.keys()) | set(segunda_metade.keys())
-        for produto_id in todos_ids:
-            primeira = primeira_metade.get(produto_id, 0)
-            segunda = segunda_metade.get(produto_id, 0)
-            variacao = ((segunda - primeira) / primeira) * 100 if primeira > 0 else (100 if segunda > 0 else 0)
-            self.cursor.execute("SELECT nome FROM produtos WHERE id=%s", (produto_id,))
-            nome = self.cursor.fetchone()
-            nome = nome[0] if nome else f"Produto {produto_id}"
+        for produto in comparacao['produtos']:
+            primeira, segunda = produto['quantidades']
             tendencias.append({
-                'id': produto_id,
-                'nome': nome,
+                'id': produto['id'],
+                'nome': produto['nome'],
                 'primeira_metade': primeira,
                 'segunda_metade': segunda,
-                'variacao': variacao
+                'variacao': variacao_percentual(primeira, segunda)
             })
         return sorted(tendencias, key=lambda x: x['variacao'], reverse=True)
 
     def get_categorias(self):
-        self.cursor.execute("SELECT DISTINCT categoria FROM produtos WHERE categoria IS NOT NULL ORDER BY categoria")
-        return [row[0] for row in self.cursor.fetchall()]
+        with self.cursor() as cursor:
+            cursor.execute("SELECT DISTINCT categoria FROM produtos WHERE categoria IS NOT NULL ORDER BY categoria")
+            return [row[0] for row in cursor.fetchall()]
 
-    def get_giro_estoque(self, data_inicio, data_fim, categoria=None):
+    def iter_giro_estoque(self, data_inicio, data_fim, categoria=None, itersize=None):
+        query = """
+            SELECT 
+                p.id,
+                p.nome,
+                p.quantidade as estoque_atual,
+                COALESCE(SUM(v.quantidade), 0) as quantidade_vendida,
+                p.preco
+            FROM produtos p
+            LEFT JOIN vendas v ON p.id = v.produto_id 
+                AND v.data_venda >= %s AND v.data_venda < %s
+        """
+        params = list(intervalo_aberto(data_inicio, data_fim))
         if categoria:
-            self.cursor.execute("""
-                SELECT 
-                    p.id,
-                    p.nome,
-                    p.quantidade as estoque_atual,
-                    COALESCE(SUM(v.quantidade), 0) as quantidade_vendida,
-                    p.preco
-                FROM produtos p
-                LEFT JOIN vendas v ON p.id = v.produto_id 
-                    AND v.data_venda BETWEEN %s AND %s
-                WHERE p.categoria = %s
-                GROUP BY p.id, p.nome, p.quantidade, p.preco
-            """, (data_inicio, data_fim, categoria))
-        else:
-            self.cursor.execute("""
-                SELECT 
-                    p.id,
-                    p.nome,
-                    p.quantidade as estoque_atual,
-                    COALESCE(SUM(v.quantidade), 0) as quantidade_vendida,
-                    p.preco
-                FROM produtos p
-                LEFT JOIN vendas v ON p.id = v.produto_id 
-                    AND v.data_venda BETWEEN %s AND %s
-                GROUP BY p.id, p.nome, p.quantidade, p.preco
-            """, (data_inicio, data_fim))
-        
-        produtos = self.cursor.fetchall()
-        resultado = []
-        
+            query += " WHERE p.categoria = %s"
+            params.append(categoria)
+        query += " GROUP BY p.id, p.nome, p.quantidade, p.preco"
+
         dias_periodo = (data_fim - data_inicio).days
         if dias_periodo == 0:
             dias_periodo = 1
-        
-        for produto_id, nome, estoque_atual, quantidade_vendida, preco in produtos:
-            estoque_medio = float(estoque_atual) if estoque_atual else 0
-            quantidade_vendida = float(quantidade_vendida) if quantidade_vendida else 0
-            
-            if estoque_medio > 0:
-                giro = quantidade_vendida / estoque_medio
-            else:
-                giro = 0
-            
-            media_diaria = quantidade_vendida / dias_periodo if dias_periodo > 0 else 0
-            
-            if media_diaria > 0:
-                dias_estoque = estoque_medio / media_diaria
-            else:
-                dias_estoque = 999 if estoque_medio > 0 else 0
-            
-            resultado.append({
-                'id': produto_id,
-                'nome': nome,
-                'estoque_atual': estoque_medio,
-                'quantidade_vendida': quantidade_vendida,
-                'giro': giro,
-                'dias_estoque': dias_estoque,
-                'preco': float(preco) if preco else 0
-            })
-        
-        return resultado
+
+        for produtos in self.iterar_lotes(query, tuple(params), itersize):
+            resultado = []
+            for produto_id, nome, estoque_atual, quantidade_vendida, preco in produtos:
+                estoque_medio = float(estoque_atual) if estoque_atual else 0
+                quantidade_vendida = float(quantidade_vendida) if quantidade_vendida else 0
+
+                if estoque_medio > 0:
+                    giro = quantidade_vendida / estoque_medio
+                else:
+                    giro = 0
+
+                media_diaria = quantidade_vendida / dias_periodo if dias_periodo > 0 else 0
+
+                if media_diaria > 0:
+                    dias_estoque = estoque_medio / media_diaria
+                else:
+                    dias_estoque = 999 if estoque_medio > 0 else 0
+
+                resultado.append({
+                    'id': produto_id,
+                    'nome': nome,
+                    'estoque_atual': estoque_medio,
+                    'quantidade_vendida': quantidade_vendida,
+                    'giro': giro,
+                    'dias_estoque': dias_estoque,
+                    'preco': float(preco) if preco else 0
+                })
+            yield resultado
+
+    def get_giro_estoque(self, data_inicio, data_fim, categoria=None):
+        return [produto for lote in self.iter_giro_estoque(data_inicio, data_fim, categoria) for produto in lote]
 
     def get_estatisticas_descritivas(self, categoria=None):
-        if categoria:
-            self.cursor.execute("""
-                SELECT 
-                    COUNT(*) as total,
-                    AVG(preco) as media,
-                    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY preco) as mediana,
-                    MIN(preco) as minimo,
-                    MAX(preco) as maximo,
-                    STDDEV(preco) as desvio_padrao
-                FROM produtos
-                WHERE categoria = %s
-            """, (categoria,))
-        else:
-            self.cursor.execute("""
-                SELECT 
-                    COUNT(*) as total,
-                    AVG(preco) as media,
-                    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY preco) as mediana,
-                    MIN(preco) as minimo,
-                    MAX(preco) as maximo,
-                    STDDEV(preco) as desvio_padrao
-                FROM produtos
-            """)
-        
-        result = self.cursor.fetchone()
+        with self.cursor() as cursor:
+            if categoria:
+                cursor.execute("""
+                    SELECT 
+                        COUNT(*) as total,
+                        AVG(preco) as media,
+                        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY preco) as mediana,
+                        MIN(preco) as minimo,
+                        MAX(preco) as maximo,
+                        STDDEV(preco) as desvio_padrao
+                    FROM produtos
+                    WHERE categoria = %s
+                """, (categoria,))
+            else:
+                cursor.execute("""
+                    SELECT 
+                        COUNT(*) as total,
+                        AVG(preco) as media,
+                        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY preco) as mediana,
+                        MIN(preco) as minimo,
+                        MAX(preco) as maximo,
+                        STDDEV(preco) as desvio_padrao
+                    FROM produtos
+                """)
+
+            result = cursor.fetchone()
+
         if result and result[0]:
             return {
                 'total': result[0],
@@ -478,7 +750,7 @@ class Database:
     def get_anomalias_vendas(self, data_inicio, data_fim, categoria=None):
         dados = self.get_vendas_por_periodo(data_inicio, data_fim, categoria)
         
-        if not dados or len(dados) < 3:
+        if len(dados) < 3:
             return []
         
         valores = [float(d[1]) for d in dados]
@@ -504,72 +776,60 @@ class Database:
         return anomalias
 
     def get_correlacoes(self, data_inicio, data_fim, categoria=None):
-        if categoria:
-            self.cursor.execute("""
-                SELECT 
-                    p.preco,
-                    SUM(v.quantidade) as quantidade_total
-                FROM vendas v
-                JOIN produtos p ON v.produto_id = p.id
-                WHERE v.data_venda BETWEEN %s AND %s AND p.categoria = %s
-                GROUP BY p.id, p.preco
-            """, (data_inicio, data_fim, categoria))
-        else:
-            self.cursor.execute("""
-                SELECT 
-                    p.preco,
-                    SUM(v.quantidade) as quantidade_total
-                FROM vendas v
-                JOIN produtos p ON v.produto_id = p.id
-                WHERE v.data_venda BETWEEN %s AND %s
-                GROUP BY p.id, p.preco
-            """, (data_inicio, data_fim))
+        with self.cursor() as cursor:
+            if categoria:
+                cursor.execute("""
+                    SELECT 
+                        p.preco,
+                        SUM(v.quantidade) as quantidade_total
+                    FROM vendas v
+                    JOIN produtos p ON v.produto_id = p.id
+                    WHERE v.data_venda >= %s AND v.data_venda < %s AND p.categoria = %s
+                    GROUP BY p.id, p.preco
+                """, (*intervalo_aberto(data_inicio, data_fim), categoria))
+            else:
+                cursor.execute("""
+                    SELECT 
+                        p.preco,
+                        SUM(v.quantidade) as quantidade_total
+                    FROM vendas v
+                    JOIN produtos p ON v.produto_id = p.id
+                    WHERE v.data_venda >= %s AND v.data_venda < %s
+                    GROUP BY p.id, p.preco
+                """, intervalo_aberto(data_inicio, data_fim))
         
-        return self.cursor.fetchall()
+            return cursor.fetchall()
 
-    def get_analise_margem(self, data_inicio, data_fim, categoria=None):
+    def iter_analise_margem(self, data_inicio, data_fim, categoria=None, itersize=None):
+        query = """
+            SELECT 
+                p.id,
+                p.nome,
+                p.categoria,
+                p.preco,
+                COALESCE(p.custo, 0) as custo,
+                (p.preco - COALESCE(p.custo, 0)) as margem_unit,
+                ((p.preco - COALESCE(p.custo, 0)) / NULLIF(p.preco, 0) * 100) as margem_percent,
+                COALESCE(SUM(v.quantidade), 0) as quantidade_vendida,
+                COALESCE(SUM(v.total), 0) as receita_total,
+                (COALESCE(SUM(v.quantidade), 0) * COALESCE(p.custo, 0)) as custo_total,
+                (COALESCE(SUM(v.total), 0) - (COALESCE(SUM(v.quantidade), 0) * COALESCE(p.custo, 0))) as lucro_total
+            FROM produtos p
+            LEFT JOIN vendas v ON p.id = v.produto_id 
+                AND v.data_venda >= %s AND v.data_venda < %s
+        """
+        params = list(intervalo_aberto(data_inicio, data_fim))
         if categoria:
-            self.cursor.execute("""
-                SELECT 
-                    p.id,
-                    p.nome,
-                    p.categoria,
-                    p.preco,
-                    COALESCE(p.custo, 0) as custo,
-                    (p.preco - COALESCE(p.custo, 0)) as margem_unit,
-                    ((p.preco - COALESCE(p.custo, 0)) / NULLIF(p.preco, 0) * 100) as margem_percent,
-                    COALESCE(SUM(v.quantidade), 0) as quantidade_vendida,
-                    COALESCE(SUM(v.total), 0) as receita_total,
-                    (COALESCE(SUM(v.quantidade), 0) * COALESCE(p.custo, 0)) as custo_total,
-                    (COALESCE(SUM(v.total), 0) - (COALESCE(SUM(v.quantidade), 0) * COALESCE(p.custo, 0))) as lucro_total
-                FROM produtos p
-                LEFT JOIN vendas v ON p.id = v.produto_id 
-                    AND v.data_venda BETWEEN %s AND %s
-                WHERE p.categoria = %s
-                GROUP BY p.id, p.nome, p.categoria, p.preco, p.custo
-                ORDER BY lucro_total DESC
-            """, (data_inicio, data_fim, categoria))
-        else:
-            self.cursor.execute("""
-                SELECT 
-                    p.id,
-                    p.nome,
-                    p.categoria,
-                    p.preco,
-                    COALESCE(p.custo, 0) as custo,
-                    (p.preco - COALESCE(p.custo, 0)) as margem_unit,
-                    ((p.preco - COALESCE(p.custo, 0)) / NULLIF(p.preco, 0) * 100) as margem_percent,
-                    COALESCE(SUM(v.quantidade), 0) as quantidade_vendida,
-                    COALESCE(SUM(v.total), 0) as receita_total,
-                    (COALESCE(SUM(v.quantidade), 0) * COALESCE(p.custo, 0)) as custo_total,
-                    (COALESCE(SUM(v.total), 0) - (COALESCE(SUM(v.quantidade), 0) * COALESCE(p.custo, 0))) as lucro_total
-                FROM produtos p
-                LEFT JOIN vendas v ON p.id = v.produto_id 
-                    AND v.data_venda BETWEEN %s AND %s
-                GROUP BY p.id, p.nome, p.categoria, p.preco, p.custo
-                ORDER BY lucro_total DESC
-            """, (data_inicio, data_fim))
-        return self.cursor.fetchall()
+            query += " WHERE p.categoria = %s"
+            params.append(categoria)
+        query += """
+            GROUP BY p.id, p.nome, p.categoria, p.preco, p.custo
+            ORDER BY lucro_total DESC
+        """
+        yield from self.iterar_lotes(query, tuple(params), itersize)
+
+    def get_analise_margem(self, data_inicio, data_fim, categoria=None):
+        return [produto for lote in self.iter_analise_margem(data_inicio, data_fim, categoria) for produto in lote]
 
     def get_clientes_mais_frequentes(self, limite=10, data_inicio=None, data_fim=None):
         query = """
@@ -580,8 +840,9 @@ class Database:
         conditions = []
         params = []
         if data_inicio and data_fim:
-            conditions.append("v.data_venda BETWEEN %s AND %s")
-            params.extend([data_inicio, data_fim])
+            condicao, intervalo = filtro_intervalo("v.data_venda", data_inicio, data_fim)
+            conditions.append(condicao)
+            params.extend(intervalo)
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
         query += """
@@ -591,8 +852,9 @@ class Database:
             LIMIT %s
         """
         params.append(limite)
-        self.cursor.execute(query, tuple(params))
-        return self.cursor.fetchall()
+        with self.cursor() as cursor:
+            cursor.execute(query, tuple(params))
+            return cursor.fetchall()
 
     def get_clientes_maior_ticket_medio(self, limite=10, data_inicio=None, data_fim=None):
         query = """
@@ -604,8 +866,9 @@ class Database:
         conditions = []
         params = []
         if data_inicio and data_fim:
-            conditions.append("v.data_venda BETWEEN %s AND %s")
-            params.extend([data_inicio, data_fim])
+            condicao, intervalo = filtro_intervalo("v.data_venda", data_inicio, data_fim)
+            conditions.append(condicao)
+            params.extend(intervalo)
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
         query += """
@@ -615,11 +878,12 @@ class Database:
             LIMIT %s
         """
         params.append(limite)
-        self.cursor.execute(query, tuple(params))
-        return self.cursor.fetchall()
+        with self.cursor() as cursor:
+            cursor.execute(query, tuple(params))
+            return cursor.fetchall()
 
-    def get_vendas_por_cliente(self, data_inicio, data_fim):
-        self.cursor.execute("""
+    def iter_vendas_por_cliente(self, data_inicio, data_fim, itersize=None):
+        yield from self.iterar_lotes("""
             SELECT 
                 c.id,
                 c.nome,
@@ -630,12 +894,14 @@ class Database:
                 MAX(v.data_venda) as ultima_compra
             FROM clientes c
             LEFT JOIN vendas v ON c.id = v.cliente_id 
-                AND v.data_venda BETWEEN %s AND %s
+                AND v.data_venda >= %s AND v.data_venda < %s
             GROUP BY c.id, c.nome
             HAVING COUNT(v.id) > 0
             ORDER BY receita_total DESC
-        """, (data_inicio, data_fim))
-        return self.cursor.fetchall()
+        """, intervalo_aberto(data_inicio, data_fim), itersize)
+
+    def get_vendas_por_cliente(self, data_inicio, data_fim):
+        return [cliente for lote in self.iter_vendas_por_cliente(data_inicio, data_fim) for cliente in lote]
 
     def get_estatisticas_clientes(self, data_inicio=None, data_fim=None):
         query = """
@@ -650,23 +916,49 @@ class Database:
         """
         params = []
         if data_inicio and data_fim:
-            query += " WHERE v.data_venda BETWEEN %s AND %s"
-            params.extend([data_inicio, data_fim])
-        self.cursor.execute(query, tuple(params))
-        result = self.cursor.fetchone()
-        if result:
-            return {
-                'total_clientes': result[0] or 0,
-                'clientes_com_compras': result[1] or 0,
-                'total_vendas': result[2] or 0,
-                'receita_total': float(result[3]) if result[3] else 0,
-                'ticket_medio_geral': float(result[4]) if result[4] else 0
-            }
-        return None
-
-    def clear_all_data(self):
-        self.cursor.execute("DELETE FROM vendas")
-        self.cursor.execute("DELETE FROM produtos")
-        self.cursor.execute("DELETE FROM clientes")
-        self.conn.commit()
+            condicao, params = filtro_intervalo("v.data_venda", data_inicio, data_fim)
+            query += " WHERE " + condicao
+        with self.cursor() as cursor:
+            cursor.execute(query, tuple(params))
+            result = cursor.fetchone()
+            if result:
+                return {
+                    'total_clientes': result[0] or 0,
+                    'clientes_com_compras': result[1] or 0,
+                    'total_vendas': result[2] or 0,
+                    'receita_total': float(result[3]) if result[3] else 0,
+                    'ticket_medio_geral': float(result[4]) if result[4] else 0
+                }
+            return None
+
+    def rebuild_vendas_diarias(self):
+        with self.cursor() as cursor:
+            cursor.execute("LOCK TABLE vendas IN SHARE MODE")
+            cursor.execute("DELETE FROM vendas_diarias")
+            cursor.execute("""
+                INSERT INTO vendas_diarias (dia, produto_id, categoria, qtd, receita, num_vendas)
+                SELECT DATE(v.data_venda), v.produto_id, p.categoria, SUM(v.quantidade), SUM(v.total), COUNT(*)
+                FROM vendas v
+                LEFT JOIN produtos p ON p.id = v.produto_id
+                WHERE v.produto_id IS NOT NULL
+                GROUP BY DATE(v.data_venda), v.produto_id, p.categoria
+            """)
+            linhas = cursor.rowcount
+            cursor.execute("""
+                INSERT INTO vendas_dias_alterados (dia, versao, xid)
+                VALUES ('-infinity', nextval('vendas_dias_alterados_versao'), txid_current())
+                ON CONFLICT (dia) DO UPDATE SET versao = EXCLUDED.versao, xid = EXCLUDED.xid
+            """)
+        with self.cursor() as cursor:
+            cursor.execute("ANALYZE vendas_diarias")
+        return linhas
+
+    def clear_all_data(self, reiniciar_ids=False):
+        with self.cursor() as cursor:
+            if reiniciar_ids:
+                cursor.execute("TRUNCATE vendas, vendas_diarias, produtos, clientes RESTART IDENTITY")
+                return
+            cursor.execute("DELETE FROM vendas")
+            cursor.execute("DELETE FROM produtos")
+            cursor.execute("DELETE FROM clientes")
 
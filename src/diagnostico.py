@@ -0,0 +1,114 @@
+import time
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget, QTableWidgetItem,
+    QTabWidget, QLabel, QFileDialog, QHeaderView
+)
+from PyQt6.QtCore import QTimer
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
+from metricas import METRICAS
+
+CATEGORIAS = [
+    ('db', "Banco (ms)"),
+    ('python', "Python (ms)"),
+    ('render', "Renderização (ms)"),
+    ('desenho', "Desenho (ms)"),
+    ('linhas', "Linhas")
+]
+
+
+class FigureCanvasMedido(FigureCanvasQTAgg):
+    def draw(self):
+        inicio = time.perf_counter()
+        super().draw()
+        titulo = self.figure.axes[0].get_title() if self.figure.axes else ""
+        METRICAS.registrar('desenho', titulo or "sem título", (time.perf_counter() - inicio) * 1000)
+
+
+class DiagnosticoDialog(QDialog):
+    def __init__(self, metricas=METRICAS, parent=None):
+        super().__init__(parent)
+        self.metricas = metricas
+        self.setWindowTitle("Diagnóstico de Desempenho")
+        self.resize(900, 500)
+
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        self.tabs = QTabWidget()
+        self.tabelas = {}
+        for categoria, titulo in CATEGORIAS:
+            tabela = self._criar_tabela(["Nome", "Total", "Média", "p50", "p95", "p99", "Máx"])
+            self.tabelas[categoria] = tabela
+            self.tabs.addTab(tabela, titulo)
+        self.tabela_lentas = self._criar_tabela(["Quando", "Método", "Total (ms)", "Banco (ms)", "Linhas", "Argumentos"])
+        self.tabs.addTab(self.tabela_lentas, "Consultas Lentas")
+        layout.addWidget(self.tabs)
+
+        self.status = QLabel()
+        layout.addWidget(self.status)
+
+        botoes = QHBoxLayout()
+        zerar_btn = QPushButton("Zerar")
+        zerar_btn.clicked.connect(self.zerar)
+        salvar_btn = QPushButton("Salvar JSON")
+        salvar_btn.clicked.connect(self.salvar)
+        fechar_btn = QPushButton("Fechar")
+        fechar_btn.clicked.connect(self.close)
+        botoes.addWidget(zerar_btn)
+        botoes.addWidget(salvar_btn)
+        botoes.addStretch()
+        botoes.addWidget(fechar_btn)
+        layout.addLayout(botoes)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.atualizar)
+
+    def showEvent(self, evento):
+        super().showEvent(evento)
+        self.atualizar()
+        self.timer.start(1000)
+
+    def hideEvent(self, evento):
+        self.timer.stop()
+        super().hideEvent(evento)
+
+    def _criar_tabela(self, colunas):
+        tabela = QTableWidget()
+        tabela.setColumnCount(len(colunas))
+        tabela.setHorizontalHeaderLabels(colunas)
+        tabela.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        tabela.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        return tabela
+
+    def atualizar(self):
+        resumo = self.metricas.resumo()
+        for categoria, tabela in self.tabelas.items():
+            histogramas = resumo['histogramas'].get(categoria, {})
+            tabela.setRowCount(len(histogramas))
+            for row, (nome, h) in enumerate(sorted(histogramas.items(), key=lambda item: -item[1].get('p95', 0))):
+                valores = [nome, h['total'], h.get('media'), h.get('p50'), h.get('p95'), h.get('p99'), h.get('max')]
+                for col, valor in enumerate(valores):
+                    tabela.setItem(row, col, QTableWidgetItem("" if valor is None else str(valor)))
+
+        lentas = list(reversed(resumo['consultas_lentas']))
+        self.tabela_lentas.setRowCount(len(lentas))
+        for row, consulta in enumerate(lentas):
+            valores = [consulta['quando'], consulta['metodo'], consulta['total_ms'], consulta['db_ms'],
+                       consulta['linhas'], consulta['args']]
+            for col, valor in enumerate(valores):
+                self.tabela_lentas.setItem(row, col, QTableWidgetItem(str(valor)))
+        texto = f"Atualizado em {resumo['gerado_em']} - limite de consulta lenta: {resumo['limite_lento_ms']:.0f} ms"
+        cache = resumo['fontes'].get('cache')
+        if cache:
+            texto += (f" - cache: {cache['hits']} hits, {cache['misses']} misses "
+                      f"({cache['taxa_acerto']:.0%}), {cache['entradas']} entradas, {cache['bytes'] / 1024:.0f} KiB")
+        self.status.setText(texto)
+
+    def zerar(self):
+        self.metricas.zerar()
+        self.atualizar()
+
+    def salvar(self):
+        caminho, _ = QFileDialog.getSaveFileName(self, "Salvar Métricas", "metricas.json", "JSON (*.json)")
+        if caminho:
+            self.metricas.salvar(caminho)
@@ -1,13 +1,16 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
-    QTableWidget, QTableWidgetItem, QLineEdit, QLabel,
+    QTableView, QAbstractItemView, QLineEdit, QLabel,
     QComboBox, QDateEdit, QMessageBox, QTabWidget, QGroupBox, QStackedWidget
 )
 from PyQt6.QtCore import Qt, QDate, QPoint
 from PyQt6.QtGui import QFont
 from database import Database
+from modelos_tabela import ModeloTabelaPaginada, formatar_data, formatar_data_hora
 from datetime import datetime
 
+TAMANHO_PAGINA = 200
+
 class ComboBoxLimitado(QComboBox):
     def __init__(self, max_items=10, parent=None):
         super().__init__(parent)
@@ -62,10 +65,16 @@ class GestaoWidget(QWidget):
         produtos_filters.setLayout(produtos_filters_layout)
         produtos_layout.addWidget(produtos_filters)
         
-        self.table_produtos = QTableWidget()
+        self.modelo_produtos = ModeloTabelaPaginada(
+            ["ID", "Nome", "Categoria", "Preço", "Custo", "Quantidade"],
+            lambda produto: produto[0],
+            tamanho_pagina=TAMANHO_PAGINA
+        )
+        self.table_produtos = QTableView()
+        self.table_produtos.setModel(self.modelo_produtos)
         self.table_produtos.setAlternatingRowColors(True)
-        self.table_produtos.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.table_produtos.itemSelectionChanged.connect(self.on_produto_selected)
+        self.table_produtos.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table_produtos.selectionModel().selectionChanged.connect(self.on_produto_selected)
         produtos_layout.addWidget(self.table_produtos, 1)
         
         self.tabs_principais.addTab(produtos_widget, "Produtos")
@@ -85,6 +94,12 @@ class GestaoWidget(QWidget):
         self.venda_filtro_data_fim = QDateEdit()
         self.venda_filtro_data_fim.setDate(QDate.currentDate())
         self.venda_filtro_data_fim.setCalendarPopup(True)
+        self.venda_filtro_produto = ComboBoxLimitado(max_items=10)
+        self.venda_filtro_produto.addItem("Todos", None)
+        self.venda_filtro_produto.currentIndexChanged.connect(self.apply_venda_filters)
+        self.venda_filtro_cliente = ComboBoxLimitado(max_items=10)
+        self.venda_filtro_cliente.addItem("Todos", None)
+        self.venda_filtro_cliente.currentIndexChanged.connect(self.apply_venda_filters)
         self.btn_atualizar_vendas = QPushButton("Atualizar")
         self.btn_atualizar_vendas.clicked.connect(self.apply_venda_filters)
         vendas_filters_layout.addWidget(QLabel("Categoria:"))
@@ -93,15 +108,26 @@ class GestaoWidget(QWidget):
         vendas_filters_layout.addWidget(self.venda_filtro_data_inicio)
         vendas_filters_layout.addWidget(QLabel("Data Fim:"))
         vendas_filters_layout.addWidget(self.venda_filtro_data_fim)
+        vendas_filters_layout.addWidget(QLabel("Produto:"))
+        vendas_filters_layout.addWidget(self.venda_filtro_produto)
+        vendas_filters_layout.addWidget(QLabel("Cliente:"))
+        vendas_filters_layout.addWidget(self.venda_filtro_cliente)
         vendas_filters_layout.addWidget(self.btn_atualizar_vendas)
         vendas_filters_layout.addStretch()
         vendas_filters.setLayout(vendas_filters_layout)
         vendas_layout.addWidget(vendas_filters)
         
-        self.table_vendas = QTableWidget()
+        self.modelo_vendas = ModeloTabelaPaginada(
+            ["ID", "Produto ID", "Produto", "Categoria", "Quantidade", "Preço Unit.", "Total", "Data", "Cliente ID", "Cliente"],
+            lambda venda: (venda[7], venda[0]),
+            formatadores={7: formatar_data_hora},
+            tamanho_pagina=TAMANHO_PAGINA
+        )
+        self.table_vendas = QTableView()
+        self.table_vendas.setModel(self.modelo_vendas)
         self.table_vendas.setAlternatingRowColors(True)
-        self.table_vendas.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.table_vendas.itemSelectionChanged.connect(self.on_venda_selected)
+        self.table_vendas.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table_vendas.selectionModel().selectionChanged.connect(self.on_venda_selected)
         vendas_layout.addWidget(self.table_vendas, 1)
         
         self.tabs_principais.addTab(vendas_widget, "Vendas")
@@ -116,10 +142,17 @@ class GestaoWidget(QWidget):
         clientes_filters.setLayout(clientes_filters_layout)
         clientes_layout.addWidget(clientes_filters)
         
-        self.table_clientes = QTableWidget()
+        self.modelo_clientes = ModeloTabelaPaginada(
+            ["ID", "Nome", "Email", "Telefone", "Data Cadastro"],
+            lambda cliente: (cliente[1], cliente[0]),
+            formatadores={4: formatar_data},
+            tamanho_pagina=TAMANHO_PAGINA
+        )
+        self.table_clientes = QTableView()
+        self.table_clientes.setModel(self.modelo_clientes)
         self.table_clientes.setAlternatingRowColors(True)
-        self.table_clientes.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.table_clientes.itemSelectionChanged.connect(self.on_cliente_selected)
+        self.table_clientes.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table_clientes.selectionModel().selectionChanged.connect(self.on_cliente_selected)
         clientes_layout.addWidget(self.table_clientes, 1)
         
         self.tabs_principais.addTab(clientes_widget, "Clientes")
@@ -286,138 +319,80 @@ class GestaoWidget(QWidget):
             self.load_clientes_table()
 
     def load_produtos_table(self):
-        if not self.db.conn:
+        if not self.db.pool:
             return
         self.apply_produto_filters()
     
     def on_produto_selected(self):
-        selected = self.table_produtos.selectedItems()
+        selected = self.table_produtos.selectionModel().selectedRows()
         if not selected:
             return
-        row = selected[0].row()
-        produto_id = int(self.table_produtos.item(row, 0).text())
+        produto_id = self.modelo_produtos.linha(selected[0].row())[0]
         self.load_produto_details(produto_id)
         if hasattr(self, 'stacked_sidebar'):
             self.stacked_sidebar.setCurrentIndex(0)
     
     def apply_produto_filters(self):
-        if not self.db.conn:
+        if not self.db.pool:
             return
         
-        todos_produtos = self.db.get_produtos()
+        filtros = {}
         categoria_filtro = self.produto_filtro_categoria.currentText()
-        
         if categoria_filtro != "Todas":
-            produtos_filtrados = [p for p in todos_produtos if len(p) > 2 and p[2] == categoria_filtro]
-        else:
-            produtos_filtrados = todos_produtos
-        
-        produtos_validos = [p for p in produtos_filtrados if len(p) >= 5]
-        
-        self.table_produtos.clear()
-        self.table_produtos.setRowCount(0)
-        self.table_produtos.setColumnCount(5)
-        self.table_produtos.setHorizontalHeaderLabels(["ID", "Nome", "Categoria", "Preço", "Quantidade"])
-        
-        for col in range(5):
-            self.table_produtos.showColumn(col)
-        
-        if produtos_validos:
-            self.table_produtos.setRowCount(len(produtos_validos))
-            for i, produto in enumerate(produtos_validos):
-                for j, value in enumerate(produto):
-                    self.table_produtos.setItem(i, j, QTableWidgetItem(str(value) if value is not None else ""))
+            filtros['categoria'] = categoria_filtro
         
+        self.modelo_produtos.recarregar(
+            lambda after_key, limit: self.db.get_produtos_page(filtros, after_key, limit)
+        )
         self.table_produtos.hideColumn(0)
         self.table_produtos.resizeColumnsToContents()
 
     def load_vendas_table(self):
-        if not self.db.conn:
+        if not self.db.pool:
             return
         self.apply_venda_filters()
     
     def on_venda_selected(self):
-        selected = self.table_vendas.selectedItems()
+        selected = self.table_vendas.selectionModel().selectedRows()
         if not selected:
             return
-        row = selected[0].row()
-        venda_id = int(self.table_vendas.item(row, 0).text())
+        venda_id = self.modelo_vendas.linha(selected[0].row())[0]
         self.load_venda_details(venda_id)
         if hasattr(self, 'stacked_sidebar'):
             self.stacked_sidebar.setCurrentIndex(1)
     
+    def _filtros_venda(self):
+        filtros = {
+            'data_inicio': datetime.combine(self.venda_filtro_data_inicio.date().toPyDate(), datetime.min.time()),
+            'data_fim': datetime.combine(self.venda_filtro_data_fim.date().toPyDate(), datetime.max.time())
+        }
+        categoria_filtro = self.venda_filtro_categoria.currentText()
+        if categoria_filtro != "Todas":
+            filtros['categoria'] = categoria_filtro
+        if self.venda_filtro_produto.currentData():
+            filtros['produto_id'] = self.venda_filtro_produto.currentData()
+        if self.venda_filtro_cliente.currentData():
+            filtros['cliente_id'] = self.venda_filtro_cliente.currentData()
+        return filtros
+
     def apply_venda_filters(self):
-        if not self.db.conn:
+        if not self.db.pool:
             return
         
-        todas_vendas = self.db.get_vendas()
-        
-        categoria_filtro = self.venda_filtro_categoria.currentText()
-        data_inicio_date = self.venda_filtro_data_inicio.date().toPyDate()
-        data_fim_date = self.venda_filtro_data_fim.date().toPyDate()
-        data_inicio = datetime.combine(data_inicio_date, datetime.min.time())
-        data_fim = datetime.combine(data_fim_date, datetime.max.time())
-        
-        vendas_filtradas = []
-        
-        for venda in todas_vendas:
-            if len(venda) < 10:
-                continue
-                
-            venda_id, produto_id, nome, categoria, quantidade, preco_unit, total, data_venda, cliente_id, cliente_nome = venda
-            
-            filtro_categoria_ok = True
-            if categoria_filtro != "Todas":
-                filtro_categoria_ok = (categoria == categoria_filtro)
-            
-            filtro_data_ok = True
-            if data_venda:
-                try:
-                    if isinstance(data_venda, datetime):
-                        data_venda_dt = data_venda
-                    else:
-                        data_venda_str = str(data_venda)
-                        if '.' in data_venda_str:
-                            data_venda_str = data_venda_str.split('.')[0]
-                        if ' ' in data_venda_str:
-                            data_venda_dt = datetime.strptime(data_venda_str, "%Y-%m-%d %H:%M:%S")
-                        else:
-                            data_venda_dt = datetime.combine(datetime.strptime(data_venda_str, "%Y-%m-%d").date(), datetime.min.time())
-                    
-                    filtro_data_ok = (data_inicio <= data_venda_dt <= data_fim)
-                except Exception:
-                    filtro_data_ok = True
-            
-            if filtro_categoria_ok and filtro_data_ok:
-                vendas_filtradas.append(venda)
-        
-        self.table_vendas.setColumnCount(10)
-        self.table_vendas.setRowCount(len(vendas_filtradas))
-        self.table_vendas.setHorizontalHeaderLabels(
-            ["ID", "Produto ID", "Produto", "Categoria", "Quantidade", "Preço Unit.", "Total", "Data", "Cliente ID", "Cliente"]
+        filtros = self._filtros_venda()
+        self.modelo_vendas.recarregar(
+            lambda after_key, limit: self.db.get_vendas_page(filtros, after_key, limit)
         )
-        
-        for i, venda in enumerate(vendas_filtradas):
-            for j, value in enumerate(venda):
-                if j == 7:
-                    if isinstance(value, datetime):
-                        self.table_vendas.setItem(i, j, QTableWidgetItem(value.strftime("%d/%m/%Y %H:%M")))
-                    else:
-                        self.table_vendas.setItem(i, j, QTableWidgetItem(str(value)))
-                else:
-                    self.table_vendas.setItem(i, j, QTableWidgetItem(str(value) if value is not None else ""))
-        
         self.table_vendas.hideColumn(0)
         self.table_vendas.hideColumn(1)
         self.table_vendas.hideColumn(8)
         self.table_vendas.resizeColumnsToContents()
 
     def on_cliente_selected(self):
-        selected = self.table_clientes.selectedItems()
+        selected = self.table_clientes.selectionModel().selectedRows()
         if not selected:
             return
-        row = selected[0].row()
-        cliente_id = int(self.table_clientes.item(row, 0).text())
+        cliente_id = self.modelo_clientes.linha(selected[0].row())[0]
         self.load_cliente_details(cliente_id)
         if hasattr(self, 'stacked_sidebar'):
             self.stacked_sidebar.setCurrentIndex(2)
@@ -461,7 +436,7 @@ class GestaoWidget(QWidget):
             self.calculate_venda_total()
 
     def add_produto(self):
-        if not self.db.conn:
+        if not self.db.pool:
             QMessageBox.warning(self, "Erro", "Não conectado ao banco de dados.")
             return
         try:
@@ -480,7 +455,7 @@ class GestaoWidget(QWidget):
             QMessageBox.warning(self, "Erro", "Erro ao adicionar produto.")
 
     def save_produto(self):
-        if not self.db.conn or not self.selected_produto_id:
+        if not self.db.pool or not self.selected_produto_id:
             QMessageBox.warning(self, "Erro", "Selecione um produto para atualizar.")
             return
         try:
@@ -500,7 +475,7 @@ class GestaoWidget(QWidget):
             QMessageBox.warning(self, "Erro", "Erro ao atualizar produto.")
 
     def delete_produto(self):
-        if not self.db.conn or not self.selected_produto_id:
+        if not self.db.pool or not self.selected_produto_id:
             QMessageBox.warning(self, "Erro", "Selecione um produto para excluir.")
             return
         reply = QMessageBox.question(self, "Confirmar", "Deseja realmente excluir este produto?")
@@ -520,7 +495,7 @@ class GestaoWidget(QWidget):
         self.selected_produto_id = None
 
     def load_produtos_combo(self):
-        if not self.db.conn:
+        if not self.db.pool:
             return
         
         produtos = self.db.get_produtos()
@@ -529,6 +504,16 @@ class GestaoWidget(QWidget):
         for produto in produtos:
             self.venda_produto.addItem(f"{produto[1]} (R$ {produto[3]:.2f})", produto[0])
         
+        produto_filtro = self.venda_filtro_produto.currentData()
+        self.venda_filtro_produto.blockSignals(True)
+        self.venda_filtro_produto.clear()
+        self.venda_filtro_produto.addItem("Todos", None)
+        for produto in produtos:
+            self.venda_filtro_produto.addItem(produto[1], produto[0])
+        index = self.venda_filtro_produto.findData(produto_filtro)
+        self.venda_filtro_produto.setCurrentIndex(index if index >= 0 else 0)
+        self.venda_filtro_produto.blockSignals(False)
+        
         self.load_clientes_combo()
 
     def on_produto_selected_for_venda(self):
@@ -546,7 +531,7 @@ class GestaoWidget(QWidget):
             self.venda_total.setText("0.00")
 
     def add_venda(self):
-        if not self.db.conn:
+        if not self.db.pool:
             QMessageBox.warning(self, "Erro", "Não conectado ao banco de dados.")
             return
         produto_id = self.venda_produto.currentData()
@@ -571,7 +556,7 @@ class GestaoWidget(QWidget):
             QMessageBox.warning(self, "Erro", "Erro ao adicionar venda.")
 
     def save_venda(self):
-        if not self.db.conn or not self.selected_venda_id:
+        if not self.db.pool or not self.selected_venda_id:
             QMessageBox.warning(self, "Erro", "Selecione uma venda para atualizar.")
             return
         try:
@@ -593,7 +578,7 @@ class GestaoWidget(QWidget):
             QMessageBox.warning(self, "Erro", "Erro ao atualizar venda.")
 
     def delete_venda(self):
-        if not self.db.conn or not self.selected_venda_id:
+        if not self.db.pool or not self.selected_venda_id:
             QMessageBox.warning(self, "Erro", "Selecione uma venda para excluir.")
             return
         reply = QMessageBox.question(self, "Confirmar", "Deseja realmente excluir esta venda?")
@@ -613,7 +598,7 @@ class GestaoWidget(QWidget):
         self.selected_venda_id = None
 
     def load_categorias_filtros(self):
-        if not self.db.conn:
+        if not self.db.pool:
             return
         
         categorias = self.db.get_categorias()
@@ -651,7 +636,7 @@ class GestaoWidget(QWidget):
         self.venda_filtro_categoria.blockSignals(False)
     
     def load_clientes_combo(self):
-        if not self.db.conn:
+        if not self.db.pool:
             return
         
         clientes = self.db.get_clientes()
@@ -660,24 +645,22 @@ class GestaoWidget(QWidget):
         
         for cliente in clientes:
             self.venda_cliente.addItem(cliente[1], cliente[0])
+        
+        cliente_filtro = self.venda_filtro_cliente.currentData()
+        self.venda_filtro_cliente.blockSignals(True)
+        self.venda_filtro_cliente.clear()
+        self.venda_filtro_cliente.addItem("Todos", None)
+        for cliente in clientes:
+            self.venda_filtro_cliente.addItem(cliente[1], cliente[0])
+        index = self.venda_filtro_cliente.findData(cliente_filtro)
+        self.venda_filtro_cliente.setCurrentIndex(index if index >= 0 else 0)
+        self.venda_filtro_cliente.blockSignals(False)
 
     def load_clientes_table(self):
-        if not self.db.conn:
+        if not self.db.pool:
             return
         
-        clientes = self.db.get_clientes()
-        
-        self.table_clientes.setColumnCount(5)
-        self.table_clientes.setRowCount(len(clientes))
-        self.table_clientes.setHorizontalHeaderLabels(["ID", "Nome", "Email", "Telefone", "Data Cadastro"])
-        
-        for i, cliente in enumerate(clientes):
-            for j, value in enumerate(cliente):
-                if j == 4 and isinstance(value, datetime):
-                    self.table_clientes.setItem(i, j, QTableWidgetItem(value.strftime("%d/%m/%Y")))
-                else:
-                    self.table_clientes.setItem(i, j, QTableWidgetItem(str(value) if value is not None else ""))
-        
+        self.modelo_clientes.recarregar(self.db.get_clientes_page)
         self.table_clientes.hideColumn(0)
         self.table_clientes.resizeColumnsToContents()
 
@@ -690,7 +673,7 @@ class GestaoWidget(QWidget):
             self.cliente_telefone.setText(cliente[3] if cliente[3] else "")
 
     def add_cliente(self):
-        if not self.db.conn:
+        if not self.db.pool:
             QMessageBox.warning(self, "Erro", "Não conectado ao banco de dados.")
             return
         try:
@@ -707,7 +690,7 @@ class GestaoWidget(QWidget):
             QMessageBox.warning(self, "Erro", "Erro ao adicionar cliente.")
 
     def save_cliente(self):
-        if not self.db.conn or not self.selected_cliente_id:
+        if not self.db.pool or not self.selected_cliente_id:
             QMessageBox.warning(self, "Erro", "Selecione um cliente para atualizar.")
             return
         try:
@@ -725,7 +708,7 @@ class GestaoWidget(QWidget):
             QMessageBox.warning(self, "Erro", "Erro ao atualizar cliente.")
 
     def delete_cliente(self):
-        if not self.db.conn or not self.selected_cliente_id:
+        if not self.db.pool or not self.selected_cliente_id:
             QMessageBox.warning(self, "Erro", "Selecione um cliente para excluir.")
             return
         reply = QMessageBox.question(self, "Confirmar", "Deseja realmente excluir este cliente?")
@@ -0,0 +1,184 @@
+import hashlib
+import numpy as np
+from matplotlib.figure import Figure
+from diagnostico import FigureCanvasMedido as FigureCanvas
+from renderizacao import CanvasRemoto
+
+
+class Grafico:
+    def __init__(self, figsize=(8, 4), subplots=(111,), renderizador=None):
+        self.figure = Figure(figsize=figsize, layout='constrained')
+        if renderizador:
+            self.canvas = CanvasRemoto(self.figure, renderizador)
+        else:
+            self.canvas = FigureCanvas(self.figure)
+        self.eixos = [self.figure.add_subplot(subplot) for subplot in subplots]
+        self.artistas = {}
+        self.eixo_artista = {}
+        self._eixos_rotulados = set()
+        self.desenhos = 0
+        self._avisos = {}
+        self._assinatura = None
+        self._hash = hashlib.sha1()
+
+    def eixo(self, indice=0):
+        return self.eixos[indice]
+
+    def configurar(self, eixo=0, titulo=None, xlabel=None, ylabel=None, grade=None, datas=False, desligado=False):
+        ax = self.eixos[eixo]
+        if titulo:
+            ax.set_title(titulo)
+        if xlabel:
+            ax.set_xlabel(xlabel)
+        if ylabel:
+            ax.set_ylabel(ylabel)
+        if grade:
+            ax.grid(True, alpha=0.3, axis=grade)
+        if datas:
+            ax.tick_params(axis='x', labelrotation=30)
+        if desligado:
+            ax.axis('off')
+
+    def _registrar(self, *valores):
+        for valor in valores:
+            if isinstance(valor, np.ndarray) and valor.dtype != object:
+                self._hash.update(str(valor.dtype).encode())
+                self._hash.update(np.ascontiguousarray(valor).tobytes())
+            else:
+                self._hash.update(repr(list(valor) if isinstance(valor, np.ndarray) else valor).encode())
+
+    def iniciar(self):
+        self._hash = hashlib.sha1()
+        for aviso in self._avisos.values():
+            aviso.set_visible(False)
+
+    def largura_pixels(self):
+        return int(self.figure.get_figwidth() * self.figure.dpi)
+
+    def titulo(self, texto, eixo=0):
+        self._registrar('titulo', eixo, texto)
+        self.eixos[eixo].set_title(texto)
+
+    def linha(self, chave, x, y, eixo=0, **estilo):
+        self._registrar(chave, x, y)
+        artista = self.artistas.get(chave)
+        if artista is None:
+            artista, = self.eixos[eixo].plot(x, y, **estilo)
+            self.artistas[chave] = artista
+            self.eixo_artista[chave] = eixo
+        else:
+            artista.set_data(x, y)
+            if 'marker' in estilo:
+                artista.set_marker(estilo['marker'])
+            if 'label' in estilo:
+                artista.set_label(estilo['label'])
+        artista.set_visible(True)
+        return artista
+
+    def pontos(self, chave, x, y, eixo=0, **estilo):
+        estilo.setdefault('linestyle', 'none')
+        estilo.setdefault('marker', 'o')
+        return self.linha(chave, x, y, eixo, **estilo)
+
+    def linha_horizontal(self, chave, y, eixo=0, **estilo):
+        self._registrar(chave, y)
+        artista = self.artistas.get(chave)
+        if artista is None:
+            artista = self.eixos[eixo].axhline(y=y, **estilo)
+            self.artistas[chave] = artista
+            self.eixo_artista[chave] = eixo
+        else:
+            artista.set_ydata([y, y])
+        artista.set_visible(True)
+        return artista
+
+    def barras(self, chave, rotulos, valores, eixo=0, horizontal=True, cores=None, passo=1, rotacao=0, **estilo):
+        valores = np.asarray(valores, dtype=float)
+        self._registrar(chave, rotulos, valores, cores)
+        ax = self.eixos[eixo]
+        container = self.artistas.get(chave)
+        if container is None or len(container.patches) != len(valores):
+            if container is not None:
+                container.remove()
+            desenhar = ax.barh if horizontal else ax.bar
+            if cores is not None:
+                estilo['color'] = cores
+            container = desenhar(np.arange(len(valores)), valores, **estilo)
+            self.artistas[chave] = container
+            self.eixo_artista[chave] = eixo
+        else:
+            for indice, (retangulo, valor) in enumerate(zip(container.patches, valores)):
+                if horizontal:
+                    retangulo.set_width(valor)
+                else:
+                    retangulo.set_height(valor)
+                if cores is not None:
+                    retangulo.set_facecolor(cores[indice])
+        for retangulo in container.patches:
+            retangulo.set_visible(True)
+        if rotulos is not None:
+            self._eixos_rotulados.add((eixo, horizontal))
+            posicoes = np.arange(0, len(valores), passo)
+            rotulos = list(rotulos)[::passo]
+            if horizontal:
+                ax.set_yticks(posicoes, rotulos)
+            else:
+                ax.set_xticks(posicoes, rotulos, rotation=rotacao, ha='right' if rotacao else 'center')
+        return container
+
+    def texto(self, chave, x, y, texto, eixo=0, **estilo):
+        self._registrar(chave, texto)
+        artista = self.artistas.get(chave)
+        if artista is None:
+            ax = self.eixos[eixo]
+            artista = ax.text(x, y, texto, transform=ax.transAxes, **estilo)
+            self.artistas[chave] = artista
+            self.eixo_artista[chave] = eixo
+        else:
+            artista.set_text(texto)
+        artista.set_visible(True)
+        return artista
+
+    def ocultar(self, *chaves):
+        for chave in chaves:
+            artista = self.artistas.get(chave)
+            if artista is None:
+                continue
+            for parte in getattr(artista, 'patches', [artista]):
+                parte.set_visible(False)
+
+    def vazio(self, mensagem="Sem dados", eixo=0):
+        self._registrar('vazio', eixo, mensagem)
+        self.ocultar(*[chave for chave, indice in self.eixo_artista.items() if indice == eixo])
+        ax = self.eixos[eixo]
+        aviso = self._avisos.get(eixo)
+        if aviso is None:
+            aviso = ax.text(0.5, 0.5, mensagem, ha='center', va='center', transform=ax.transAxes)
+            self._avisos[eixo] = aviso
+        aviso.set_text(mensagem)
+        aviso.set_visible(True)
+        for indice, horizontal in self._eixos_rotulados:
+            if indice == eixo:
+                (ax.set_yticks if horizontal else ax.set_xticks)([])
+        if ax.get_legend():
+            ax.get_legend().set_visible(False)
+
+    def legenda(self, eixo=0):
+        ax = self.eixos[eixo]
+        visiveis = [linha for linha in ax.lines if linha.get_visible() and not linha.get_label().startswith('_')]
+        if visiveis:
+            ax.legend(handles=visiveis)
+        elif ax.get_legend():
+            ax.get_legend().set_visible(False)
+
+    def concluir(self):
+        assinatura = self._hash.digest()
+        if assinatura == self._assinatura:
+            return False
+        self._assinatura = assinatura
+        for ax in self.eixos:
+            ax.relim(visible_only=True)
+            ax.autoscale_view()
+        self.canvas.draw_idle()
+        self.desenhos += 1
+        return True
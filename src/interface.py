@@ -6,7 +6,15 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtGui import QFont, QPalette, QColor
 from database import Database
 from gestao import GestaoWidget
-from analise import AnaliseWidget
+from analise import AnaliseWidget, ORCAMENTO_PREFETCH
+from diagnostico import DiagnosticoDialog
+from metricas import METRICAS, instrumentar_database, instrumentar_renderizacao
+from cache import ativar_cache
+from agregados_locais import ativar_agregados_locais
+from motor_analitico import ativar_motor_analitico
+from resultados import ativar_resultados_tipados
+from contexto_consulta import ativar_deduplicacao
+from renderizacao import RenderizadorProcessos
 
 def aplicar_tema_claro(app):
     app.setStyle("Fusion")
@@ -82,14 +90,23 @@ class ConnectionDialog(QDialog):
         self.setLayout(layout)
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, orcamento_prefetch=ORCAMENTO_PREFETCH, processos_render=0):
         super().__init__()
-        self.db = Database()
+        self.orcamento_prefetch = orcamento_prefetch
+        self.renderizador = RenderizadorProcessos(processos_render) if processos_render else None
+        self.db = self._preparar_database(Database())
+        self.diagnostico_dialog = None
         self.current_section = "gestao"
         self.tema_claro = True
         self.init_ui()
         self.try_connect()
 
+    def _preparar_database(self, db):
+        db = ativar_deduplicacao(ativar_cache(instrumentar_database(
+            ativar_resultados_tipados(ativar_motor_analitico(ativar_agregados_locais(db))))))
+        METRICAS.registrar_fonte('cache', db.cache.estatisticas)
+        return db
+
     def init_ui(self):
         self.setWindowTitle("Tabacaria - Sistema de Análise de Dados")
         self.setGeometry(100, 100, 1600, 900)
@@ -106,8 +123,11 @@ class MainWindow(QMainWindow):
         connect_btn.clicked.connect(self.show_connection_dialog)
         self.tema_btn = QPushButton("Modo Escuro")
         self.tema_btn.clicked.connect(self.alternar_tema)
+        diagnostico_btn = QPushButton("Diagnóstico")
+        diagnostico_btn.clicked.connect(self.show_diagnostico)
         top_bar.addWidget(connect_btn)
         top_bar.addWidget(self.tema_btn)
+        top_bar.addWidget(diagnostico_btn)
         top_bar.addStretch()
         main_layout.addLayout(top_bar)
         
@@ -131,7 +151,7 @@ class MainWindow(QMainWindow):
         main_layout.addWidget(self.stacked_widget)
         
         self.gestao_widget = GestaoWidget(self.db)
-        self.analise_widget = AnaliseWidget(self.db)
+        self.analise_widget = instrumentar_renderizacao(AnaliseWidget(self.db, self.orcamento_prefetch, self.renderizador))
         
         self.stacked_widget.addWidget(self.gestao_widget)
         self.stacked_widget.addWidget(self.analise_widget)
@@ -161,14 +181,14 @@ class MainWindow(QMainWindow):
     def show_connection_dialog(self):
         dialog = ConnectionDialog(self)
         if dialog.exec():
-            self.db.disconnect()
-            self.db = Database(
+            self._encerrar_database()
+            self.db = self._preparar_database(Database(
                 dbname=dialog.dbname_input.text(),
                 user=dialog.user_input.text(),
                 password=dialog.password_input.text(),
                 host=dialog.host_input.text(),
                 port=dialog.port_input.text()
-            )
+            ))
             if self.db.connect():
                 QMessageBox.information(self, "Sucesso", "Conectado ao banco de dados!")
                 self.gestao_widget.db = self.db
@@ -177,12 +197,32 @@ class MainWindow(QMainWindow):
             else:
                 QMessageBox.warning(self, "Erro", "Não foi possível conectar ao banco de dados.")
 
+    def show_diagnostico(self):
+        if self.diagnostico_dialog is None:
+            self.diagnostico_dialog = DiagnosticoDialog(parent=self)
+        self.diagnostico_dialog.show()
+        self.diagnostico_dialog.raise_()
+
     def load_data(self):
         if self.current_section == "gestao":
             self.gestao_widget.refresh_data()
         elif self.current_section == "analise":
             self.analise_widget.refresh_data()
 
+    def _encerrar_database(self):
+        self.analise_widget.cancelar_carregamento()
+        self.analise_widget.marcar_desatualizadas()
+        self.analise_widget.pool_tarefas.waitForDone()
+        self.db.disconnect()
+        if self.db.agregados:
+            self.db.agregados.fechar()
+
+    def closeEvent(self, event):
+        self._encerrar_database()
+        if self.renderizador:
+            self.renderizador.encerrar()
+        super().closeEvent(event)
+
     def alternar_tema(self):
         app = QApplication.instance()
         self.tema_claro = not self.tema_claro
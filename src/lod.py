@@ -0,0 +1,48 @@
+import numpy as np
+
+PIXELS_POR_PONTO = 2
+PIXELS_POR_MARCADOR = 8
+PIXELS_POR_BARRA = 8
+DIAS_AGRUPAMENTO = (('dia', 1), ('semana', 7), ('mes', 31))
+
+
+def agrupamento_adaptativo(data_inicio, data_fim, limite):
+    dias = (data_fim - data_inicio).days + 1
+    for agrupamento, tamanho in DIAS_AGRUPAMENTO:
+        if dias <= limite * tamanho:
+            return agrupamento
+    return DIAS_AGRUPAMENTO[-1][0]
+
+
+def lttb(x, y, limite):
+    n = len(y)
+    if limite >= n or limite < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    bordas = np.linspace(1, n - 1, limite - 1).astype(np.int64)
+    indices = np.empty(limite, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    anterior = 0
+    for i in range(limite - 2):
+        inicio, fim = bordas[i], bordas[i + 1]
+        proximo_fim = bordas[i + 2] if i + 2 < len(bordas) else n
+        media_x = x[fim:proximo_fim].mean()
+        media_y = y[fim:proximo_fim].mean()
+        areas = np.abs((x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+                       - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior]))
+        anterior = inicio + int(np.argmax(areas))
+        indices[i + 1] = anterior
+    return indices
+
+
+def indices_reduzidos(dados, limite, preservar=None):
+    if len(dados) <= limite:
+        return np.arange(len(dados))
+    x = dados['periodo'].astype('datetime64[D]').astype(np.int64)
+    y = dados['receita']
+    indices = lttb(x, y, limite)
+    extremos = [int(np.argmax(y)), int(np.argmin(y))]
+    if preservar is not None:
+        extremos.extend(np.flatnonzero(preservar))
+    return np.union1d(indices, extremos)
@@ -1,11 +1,20 @@
+import argparse
 import sys
 from PyQt6.QtWidgets import QApplication
 from interface import MainWindow, aplicar_tema_claro
+from metricas import METRICAS
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--metrics-file", default=None, help="Grava as métricas de desempenho neste arquivo JSON ao sair.")
+    parser.add_argument("--prefetch-mb", type=float, default=32, help="Memória máxima, em MB, para dados antecipados das abas de análise (0 desativa).")
+    parser.add_argument("--render-processos", type=int, default=0, help="Rasteriza os gráficos de análise em N processos auxiliares (0 desenha na thread da interface).")
+    args, qt_args = parser.parse_known_args()
+    app = QApplication(sys.argv[:1] + qt_args)
     aplicar_tema_claro(app)
-    window = MainWindow()
+    window = MainWindow(orcamento_prefetch=int(args.prefetch_mb * 1024 * 1024), processos_render=args.render_processos)
     window.show()
-    sys.exit(app.exec())
-
+    codigo = app.exec()
+    if args.metrics_file:
+        METRICAS.salvar(args.metrics_file)
+    sys.exit(codigo)
@@ -0,0 +1,32 @@
+import argparse
+import sys
+from database import Database
+
+
+def recalcular_vendas_diarias(db, args):
+    linhas = db.rebuild_vendas_diarias()
+    print(f"vendas_diarias recalculada: {linhas} linhas.")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tarefas de manutenção do banco da tabacaria.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    recalcular = subparsers.add_parser("recalcular-vendas-diarias", help="Reconstrói o resumo diário a partir de vendas.")
+    recalcular.set_defaults(funcao=recalcular_vendas_diarias)
+
+    args = parser.parse_args(argv)
+
+    db = Database()
+    if not db.connect():
+        print("Não foi possível conectar ao banco de dados.", file=sys.stderr)
+        return 1
+    try:
+        return args.funcao(db, args)
+    finally:
+        db.disconnect()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
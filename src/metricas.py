@@ -0,0 +1,213 @@
+import inspect
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+import numpy as np
+from psycopg2 import extensions
+
+LIMITES_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+LIMITES_LINHAS = [0, 1, 10, 100, 1000, 10000, 100000, 1000000]
+
+METODOS_NAO_MEDIDOS = {'connect', 'disconnect', 'cursor', 'cancelavel', 'modo_analitico', 'contexto_consulta', 'contexto_atual'}
+
+
+class Histograma:
+    def __init__(self, limites, amostras=1000):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)
+        self.amostras = deque(maxlen=amostras)
+        self.total = 0
+        self.soma = 0.0
+        self.maximo = 0.0
+
+    def registrar(self, valor):
+        indice = next((i for i, limite in enumerate(self.limites) if valor <= limite), len(self.limites))
+        self.contagens[indice] += 1
+        self.amostras.append(valor)
+        self.total += 1
+        self.soma += valor
+        self.maximo = max(self.maximo, valor)
+
+    def resumo(self):
+        if not self.total:
+            return {'total': 0}
+        p50, p95, p99 = np.percentile(list(self.amostras), [50, 95, 99])
+        return {
+            'total': self.total,
+            'media': round(self.soma / self.total, 3),
+            'p50': round(float(p50), 3),
+            'p95': round(float(p95), 3),
+            'p99': round(float(p99), 3),
+            'max': round(self.maximo, 3),
+            'limites': self.limites,
+            'contagens': list(self.contagens)
+        }
+
+
+class Metricas:
+    def __init__(self, limite_lento_ms=500.0, max_lentas=200):
+        self.limite_lento_ms = limite_lento_ms
+        self.consultas_lentas = deque(maxlen=max_lentas)
+        self._histogramas = {}
+        self._fontes = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def registrar(self, categoria, nome, valor):
+        limites = LIMITES_LINHAS if categoria == 'linhas' else LIMITES_MS
+        with self._lock:
+            chave = (categoria, nome)
+            if chave not in self._histogramas:
+                self._histogramas[chave] = Histograma(limites)
+            self._histogramas[chave].registrar(valor)
+
+    def registrar_fonte(self, nome, funcao):
+        with self._lock:
+            self._fontes[nome] = funcao
+
+    def registrar_consulta(self, metodo, total_ms, db_ms, linhas, args):
+        self.registrar('db', metodo, db_ms)
+        self.registrar('python', metodo, max(total_ms - db_ms, 0.0))
+        self.registrar('linhas', metodo, linhas)
+        if total_ms >= self.limite_lento_ms:
+            with self._lock:
+                self.consultas_lentas.append({
+                    'quando': datetime.now().isoformat(timespec='seconds'),
+                    'metodo': metodo,
+                    'total_ms': round(total_ms, 3),
+                    'db_ms': round(db_ms, 3),
+                    'linhas': linhas,
+                    'args': repr(args)[:200]
+                })
+
+    @contextmanager
+    def medir(self, categoria, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(categoria, nome, (time.perf_counter() - inicio) * 1000)
+
+    def _quadros(self):
+        if not hasattr(self._local, 'quadros'):
+            self._local.quadros = []
+        return self._local.quadros
+
+    def acumular_banco(self, ms, linhas=0):
+        quadros = self._quadros()
+        if quadros:
+            quadros[-1]['db_ms'] += ms
+            quadros[-1]['linhas'] += linhas
+
+    def resumo(self):
+        with self._lock:
+            histogramas = {}
+            for (categoria, nome), histograma in sorted(self._histogramas.items()):
+                histogramas.setdefault(categoria, {})[nome] = histograma.resumo()
+            fontes = dict(self._fontes)
+            resumo = {
+                'gerado_em': datetime.now().isoformat(timespec='seconds'),
+                'limite_lento_ms': self.limite_lento_ms,
+                'histogramas': histogramas,
+                'consultas_lentas': list(self.consultas_lentas)
+            }
+        resumo['fontes'] = {nome: funcao() for nome, funcao in fontes.items()}
+        return resumo
+
+    def zerar(self):
+        with self._lock:
+            self._histogramas.clear()
+            self.consultas_lentas.clear()
+
+    def salvar(self, caminho):
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            json.dump(self.resumo(), arquivo, indent=2, ensure_ascii=False)
+
+
+METRICAS = Metricas()
+
+
+def _cursor_medido(metricas):
+    class CursorMedido(extensions.cursor):
+        def _medir(self, funcao, *args):
+            inicio = time.perf_counter()
+            resultado = funcao(*args)
+            metricas.acumular_banco((time.perf_counter() - inicio) * 1000)
+            return resultado
+
+        def execute(self, query, vars=None):
+            return self._medir(super().execute, query, vars)
+
+        def executemany(self, query, vars_list):
+            return self._medir(super().executemany, query, vars_list)
+
+        def copy_expert(self, sql, file, size=8192):
+            return self._medir(super().copy_expert, sql, file, size)
+
+        def fetchone(self):
+            linha = self._medir(super().fetchone)
+            metricas.acumular_banco(0, 1 if linha is not None else 0)
+            return linha
+
+        def fetchmany(self, size=None):
+            linhas = self._medir(super().fetchmany, size or self.arraysize)
+            metricas.acumular_banco(0, len(linhas))
+            return linhas
+
+        def fetchall(self):
+            linhas = self._medir(super().fetchall)
+            metricas.acumular_banco(0, len(linhas))
+            return linhas
+    return CursorMedido
+
+
+def _metodo_medido(metricas, nome, metodo):
+    @wraps(metodo)
+    def medido(*args, **kwargs):
+        quadros = metricas._quadros()
+        quadro = {'db_ms': 0.0, 'linhas': 0}
+        quadros.append(quadro)
+        inicio = time.perf_counter()
+        try:
+            return metodo(*args, **kwargs)
+        finally:
+            total_ms = (time.perf_counter() - inicio) * 1000
+            quadros.pop()
+            if quadros:
+                quadros[-1]['db_ms'] += quadro['db_ms']
+                quadros[-1]['linhas'] += quadro['linhas']
+            metricas.registrar_consulta(nome, total_ms, quadro['db_ms'], quadro['linhas'], args)
+    return medido
+
+
+def _render_medido(metricas, nome, metodo):
+    @wraps(metodo)
+    def medido(*args, **kwargs):
+        with metricas.medir('render', nome):
+            return metodo(*args, **kwargs)
+    return medido
+
+
+def instrumentar_database(db, metricas=METRICAS):
+    db.cursor_factory = _cursor_medido(metricas)
+    for nome in dir(type(db)):
+        if nome.startswith('_') or nome in METODOS_NAO_MEDIDOS:
+            continue
+        metodo = getattr(db, nome)
+        if callable(metodo) and not inspect.isgeneratorfunction(getattr(type(db), nome)):
+            setattr(db, nome, _metodo_medido(metricas, nome, metodo))
+    return db
+
+
+def instrumentar_renderizacao(objeto, prefixos=('mostrar_', 'show_'), metricas=METRICAS):
+    for nome in dir(type(objeto)):
+        if not nome.startswith(prefixos):
+            continue
+        metodo = getattr(objeto, nome)
+        if callable(metodo):
+            setattr(objeto, nome, _render_medido(metricas, nome, metodo))
+    return objeto
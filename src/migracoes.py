@@ -0,0 +1,349 @@
+LOCK_MIGRACOES = 7301
+
+MIGRACOES = [
+    (1, "Tabelas base", [
+        """
+        CREATE TABLE IF NOT EXISTS produtos (
+            id SERIAL PRIMARY KEY,
+            nome VARCHAR(255) NOT NULL,
+            categoria VARCHAR(100),
+            preco DECIMAL(10,2) NOT NULL,
+            custo DECIMAL(10,2) DEFAULT 0,
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "ALTER TABLE produtos ADD COLUMN IF NOT EXISTS custo DECIMAL(10,2) DEFAULT 0",
+        """
+        CREATE TABLE IF NOT EXISTS clientes (
+            id SERIAL PRIMARY KEY,
+            nome VARCHAR(255) NOT NULL,
+            email VARCHAR(255),
+            telefone VARCHAR(20),
+            data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS vendas (
+            id SERIAL PRIMARY KEY,
+            produto_id INTEGER REFERENCES produtos(id),
+            cliente_id INTEGER REFERENCES clientes(id),
+            quantidade INTEGER NOT NULL,
+            preco_unitario DECIMAL(10,2) NOT NULL,
+            total DECIMAL(10,2) NOT NULL,
+            data_venda TIMESTAMP NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "ALTER TABLE vendas ADD COLUMN IF NOT EXISTS cliente_id INTEGER REFERENCES clientes(id)",
+    ]),
+    (2, "Índices de vendas por data", [
+        "CREATE INDEX IF NOT EXISTS idx_vendas_data_venda_id ON vendas (data_venda, id)",
+        "CREATE INDEX IF NOT EXISTS idx_vendas_data_venda_brin ON vendas USING BRIN (data_venda)",
+    ]),
+    (3, "Índices de junção e filtros", [
+        "CREATE INDEX IF NOT EXISTS idx_vendas_produto_data ON vendas (produto_id, data_venda)",
+        "CREATE INDEX IF NOT EXISTS idx_vendas_cliente ON vendas (cliente_id)",
+        "CREATE INDEX IF NOT EXISTS idx_produtos_categoria ON produtos (categoria)",
+        "CREATE INDEX IF NOT EXISTS idx_clientes_nome_id ON clientes (nome, id)",
+        "ANALYZE vendas",
+        "ANALYZE produtos",
+        "ANALYZE clientes",
+    ]),
+    (4, "Resumo diário de vendas", [
+        """
+        CREATE TABLE IF NOT EXISTS vendas_diarias (
+            dia DATE NOT NULL,
+            produto_id INTEGER NOT NULL,
+            categoria VARCHAR(100),
+            qtd BIGINT NOT NULL DEFAULT 0,
+            receita DECIMAL(14,2) NOT NULL DEFAULT 0,
+            num_vendas INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dia, produto_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_vendas_diarias_categoria_dia ON vendas_diarias (categoria, dia)",
+        "CREATE INDEX IF NOT EXISTS idx_vendas_diarias_produto ON vendas_diarias (produto_id)",
+        """
+        CREATE OR REPLACE FUNCTION vendas_diarias_inserir() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO vendas_diarias AS d (dia, produto_id, categoria, qtd, receita, num_vendas)
+            SELECT DATE(n.data_venda), n.produto_id, p.categoria, SUM(n.quantidade), SUM(n.total), COUNT(*)
+            FROM novas n
+            LEFT JOIN produtos p ON p.id = n.produto_id
+            WHERE n.produto_id IS NOT NULL
+            GROUP BY DATE(n.data_venda), n.produto_id, p.categoria
+            ON CONFLICT (dia, produto_id) DO UPDATE SET
+                qtd = d.qtd + EXCLUDED.qtd,
+                receita = d.receita + EXCLUDED.receita,
+                num_vendas = d.num_vendas + EXCLUDED.num_vendas;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION vendas_diarias_excluir() RETURNS trigger AS $$
+        BEGIN
+            UPDATE vendas_diarias d SET
+                qtd = d.qtd - x.qtd,
+                receita = d.receita - x.receita,
+                num_vendas = d.num_vendas - x.num_vendas
+            FROM (
+                SELECT DATE(data_venda) AS dia, produto_id,
+                       SUM(quantidade) AS qtd, SUM(total) AS receita, COUNT(*) AS num_vendas
+                FROM antigas
+                WHERE produto_id IS NOT NULL
+                GROUP BY DATE(data_venda), produto_id
+            ) x
+            WHERE d.dia = x.dia AND d.produto_id = x.produto_id;
+            DELETE FROM vendas_diarias d
+            USING (SELECT DISTINCT DATE(data_venda) AS dia, produto_id FROM antigas) x
+            WHERE d.dia = x.dia AND d.produto_id = x.produto_id AND d.num_vendas <= 0;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION vendas_diarias_atualizar() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO vendas_diarias AS d (dia, produto_id, categoria, qtd, receita, num_vendas)
+            SELECT x.dia, x.produto_id, p.categoria, SUM(x.qtd), SUM(x.receita), SUM(x.num_vendas)
+            FROM (
+                SELECT DATE(data_venda) AS dia, produto_id, quantidade AS qtd, total AS receita, 1 AS num_vendas
+                FROM novas
+                UNION ALL
+                SELECT DATE(data_venda), produto_id, -quantidade, -total, -1
+                FROM antigas
+            ) x
+            LEFT JOIN produtos p ON p.id = x.produto_id
+            WHERE x.produto_id IS NOT NULL
+            GROUP BY x.dia, x.produto_id, p.categoria
+            HAVING SUM(x.qtd) <> 0 OR SUM(x.receita) <> 0 OR SUM(x.num_vendas) <> 0
+            ON CONFLICT (dia, produto_id) DO UPDATE SET
+                qtd = d.qtd + EXCLUDED.qtd,
+                receita = d.receita + EXCLUDED.receita,
+                num_vendas = d.num_vendas + EXCLUDED.num_vendas;
+            DELETE FROM vendas_diarias d
+            USING (SELECT DISTINCT DATE(data_venda) AS dia, produto_id FROM antigas) x
+            WHERE d.dia = x.dia AND d.produto_id = x.produto_id AND d.num_vendas <= 0;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION vendas_diarias_categoria() RETURNS trigger AS $$
+        BEGIN
+            UPDATE vendas_diarias SET categoria = NEW.categoria WHERE produto_id = NEW.id;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS trg_vendas_diarias_inserir ON vendas",
+        """
+        CREATE TRIGGER trg_vendas_diarias_inserir AFTER INSERT ON vendas
+        REFERENCING NEW TABLE AS novas
+        FOR EACH STATEMENT EXECUTE PROCEDURE vendas_diarias_inserir()
+        """,
+        "DROP TRIGGER IF EXISTS trg_vendas_diarias_excluir ON vendas",
+        """
+        CREATE TRIGGER trg_vendas_diarias_excluir AFTER DELETE ON vendas
+        REFERENCING OLD TABLE AS antigas
+        FOR EACH STATEMENT EXECUTE PROCEDURE vendas_diarias_excluir()
+        """,
+        "DROP TRIGGER IF EXISTS trg_vendas_diarias_atualizar ON vendas",
+        """
+        CREATE TRIGGER trg_vendas_diarias_atualizar AFTER UPDATE ON vendas
+        REFERENCING OLD TABLE AS antigas NEW TABLE AS novas
+        FOR EACH STATEMENT EXECUTE PROCEDURE vendas_diarias_atualizar()
+        """,
+        "DROP TRIGGER IF EXISTS trg_vendas_diarias_categoria ON produtos",
+        """
+        CREATE TRIGGER trg_vendas_diarias_categoria AFTER UPDATE OF categoria ON produtos
+        FOR EACH ROW WHEN (OLD.categoria IS DISTINCT FROM NEW.categoria)
+        EXECUTE PROCEDURE vendas_diarias_categoria()
+        """,
+        "DELETE FROM vendas_diarias",
+        """
+        INSERT INTO vendas_diarias (dia, produto_id, categoria, qtd, receita, num_vendas)
+        SELECT DATE(v.data_venda), v.produto_id, p.categoria, SUM(v.quantidade), SUM(v.total), COUNT(*)
+        FROM vendas v
+        LEFT JOIN produtos p ON p.id = v.produto_id
+        WHERE v.produto_id IS NOT NULL
+        GROUP BY DATE(v.data_venda), v.produto_id, p.categoria
+        """,
+        "ANALYZE vendas_diarias",
+    ]),
+    (5, "Versão por dia de vendas alteradas", [
+        """
+        CREATE TABLE IF NOT EXISTS vendas_dias_alterados (
+            dia DATE PRIMARY KEY,
+            versao BIGINT NOT NULL
+        )
+        """,
+        "CREATE SEQUENCE IF NOT EXISTS vendas_dias_alterados_versao",
+        "CREATE INDEX IF NOT EXISTS idx_vendas_dias_alterados_versao ON vendas_dias_alterados (versao)",
+        """
+        CREATE OR REPLACE FUNCTION vendas_marcar_dias_novas() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO vendas_dias_alterados (dia, versao)
+            SELECT dia, nextval('vendas_dias_alterados_versao')
+            FROM (SELECT DISTINCT DATE(data_venda) AS dia FROM novas WHERE data_venda < CURRENT_DATE) x
+            ORDER BY dia
+            ON CONFLICT (dia) DO UPDATE SET versao = EXCLUDED.versao;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION vendas_marcar_dias_antigas() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO vendas_dias_alterados (dia, versao)
+            SELECT dia, nextval('vendas_dias_alterados_versao')
+            FROM (SELECT DISTINCT DATE(data_venda) AS dia FROM antigas WHERE data_venda < CURRENT_DATE) x
+            ORDER BY dia
+            ON CONFLICT (dia) DO UPDATE SET versao = EXCLUDED.versao;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION vendas_diarias_categoria() RETURNS trigger AS $$
+        BEGIN
+            UPDATE vendas_diarias SET categoria = NEW.categoria WHERE produto_id = NEW.id;
+            INSERT INTO vendas_dias_alterados (dia, versao)
+            SELECT dia, nextval('vendas_dias_alterados_versao')
+            FROM vendas_diarias
+            WHERE produto_id = NEW.id AND dia < CURRENT_DATE
+            ORDER BY dia
+            ON CONFLICT (dia) DO UPDATE SET versao = EXCLUDED.versao;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION vendas_marcar_truncate() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO vendas_dias_alterados (dia, versao)
+            VALUES ('-infinity', nextval('vendas_dias_alterados_versao'))
+            ON CONFLICT (dia) DO UPDATE SET versao = EXCLUDED.versao;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS trg_vendas_dias_inserir ON vendas",
+        """
+        CREATE TRIGGER trg_vendas_dias_inserir AFTER INSERT ON vendas
+        REFERENCING NEW TABLE AS novas
+        FOR EACH STATEMENT EXECUTE PROCEDURE vendas_marcar_dias_novas()
+        """,
+        "DROP TRIGGER IF EXISTS trg_vendas_dias_atualizar_novas ON vendas",
+        """
+        CREATE TRIGGER trg_vendas_dias_atualizar_novas AFTER UPDATE ON vendas
+        REFERENCING NEW TABLE AS novas
+        FOR EACH STATEMENT EXECUTE PROCEDURE vendas_marcar_dias_novas()
+        """,
+        "DROP TRIGGER IF EXISTS trg_vendas_dias_atualizar_antigas ON vendas",
+        """
+        CREATE TRIGGER trg_vendas_dias_atualizar_antigas AFTER UPDATE ON vendas
+        REFERENCING OLD TABLE AS antigas
+        FOR EACH STATEMENT EXECUTE PROCEDURE vendas_marcar_dias_antigas()
+        """,
+        "DROP TRIGGER IF EXISTS trg_vendas_dias_excluir ON vendas",
+        """
+        CREATE TRIGGER trg_vendas_dias_excluir AFTER DELETE ON vendas
+        REFERENCING OLD TABLE AS antigas
+        FOR EACH STATEMENT EXECUTE PROCEDURE vendas_marcar_dias_antigas()
+        """,
+        "DROP TRIGGER IF EXISTS trg_vendas_dias_truncate ON vendas",
+        """
+        CREATE TRIGGER trg_vendas_dias_truncate AFTER TRUNCATE ON vendas
+        FOR EACH STATEMENT EXECUTE PROCEDURE vendas_marcar_truncate()
+        """,
+    ]),
+    (6, "Transação por dia de vendas alteradas", [
+        "ALTER TABLE vendas_dias_alterados ADD COLUMN IF NOT EXISTS xid BIGINT NOT NULL DEFAULT txid_current()",
+        "CREATE INDEX IF NOT EXISTS idx_vendas_dias_alterados_xid ON vendas_dias_alterados (xid)",
+        """
+        CREATE OR REPLACE FUNCTION vendas_marcar_dias_novas() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO vendas_dias_alterados (dia, versao, xid)
+            SELECT dia, nextval('vendas_dias_alterados_versao'), txid_current()
+            FROM (SELECT DISTINCT DATE(data_venda) AS dia FROM novas WHERE data_venda < CURRENT_DATE) x
+            ORDER BY dia
+            ON CONFLICT (dia) DO UPDATE SET versao = EXCLUDED.versao, xid = EXCLUDED.xid;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION vendas_marcar_dias_antigas() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO vendas_dias_alterados (dia, versao, xid)
+            SELECT dia, nextval('vendas_dias_alterados_versao'), txid_current()
+            FROM (SELECT DISTINCT DATE(data_venda) AS dia FROM antigas WHERE data_venda < CURRENT_DATE) x
+            ORDER BY dia
+            ON CONFLICT (dia) DO UPDATE SET versao = EXCLUDED.versao, xid = EXCLUDED.xid;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION vendas_diarias_categoria() RETURNS trigger AS $$
+        BEGIN
+            UPDATE vendas_diarias SET categoria = NEW.categoria WHERE produto_id = NEW.id;
+            INSERT INTO vendas_dias_alterados (dia, versao, xid)
+            SELECT dia, nextval('vendas_dias_alterados_versao'), txid_current()
+            FROM vendas_diarias
+            WHERE produto_id = NEW.id AND dia < CURRENT_DATE
+            ORDER BY dia
+            ON CONFLICT (dia) DO UPDATE SET versao = EXCLUDED.versao, xid = EXCLUDED.xid;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION vendas_marcar_truncate() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO vendas_dias_alterados (dia, versao, xid)
+            VALUES ('-infinity', nextval('vendas_dias_alterados_versao'), txid_current())
+            ON CONFLICT (dia) DO UPDATE SET versao = EXCLUDED.versao, xid = EXCLUDED.xid;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+    ]),
+]
+
+VERSAO_ATUAL = max(versao for versao, _, _ in MIGRACOES)
+
+
+def versao_schema(cursor):
+    cursor.execute("SELECT to_regclass('schema_versao') IS NOT NULL")
+    if not cursor.fetchone()[0]:
+        return 0
+    cursor.execute("SELECT COALESCE(MAX(versao), 0) FROM schema_versao")
+    return cursor.fetchone()[0]
+
+
+def aplicar_migracoes(db):
+    with db.cursor() as cursor:
+        if versao_schema(cursor) >= VERSAO_ATUAL:
+            return VERSAO_ATUAL
+    with db.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (LOCK_MIGRACOES,))
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_versao (
+                versao INTEGER PRIMARY KEY,
+                descricao VARCHAR(255) NOT NULL,
+                aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        atual = versao_schema(cursor)
+        for versao, descricao, comandos in MIGRACOES:
+            if versao <= atual:
+                continue
+            for comando in comandos:
+                cursor.execute(comando)
+            cursor.execute("INSERT INTO schema_versao (versao, descricao) VALUES (%s, %s)", (versao, descricao))
+            atual = versao
+    return atual
@@ -1,5 +1,8 @@
+import argparse
+import io
 import random
 from datetime import datetime, timedelta
+import numpy as np
 from database import Database
 
 PRODUTOS_MOCK = {
@@ -127,8 +130,37 @@ NOMES_CLIENTES = [
     "Aline Rocha", "Paulo Santos", "Cristina Lima", "Renato Souza", "Fernanda Pereira"
 ]
 
+PESOS_HORA = [1, 1, 1, 1, 1, 2, 3, 4, 5, 6, 7, 8, 9, 8, 7, 6, 7, 8, 9, 7, 5, 4, 3, 2]
+
+VENDAS_DIA_SEMANA = {
+    'fim_de_semana': (15, 35),
+    'util': (5, 20)
+}
+
+FATOR_MES = {1: 0.7, 2: 0.7, 11: 1.3, 12: 1.3}
+
+ESTOQUE_CATEGORIA = {
+    "Cigarro": (80, 150),
+    "Charuto": (20, 60),
+    "Tabaco": (30, 80),
+    "Filtro": (100, 200),
+    "Seda": (150, 300)
+}
+ESTOQUE_PADRAO = (15, 50)
+
+QUANTIDADES_CATEGORIA = {
+    "Cigarro": ([1, 2, 3], [50, 40, 10]),
+    "Charuto": ([1, 2], [90, 10]),
+    "Tabaco": ([1, 2], [80, 20]),
+    "Filtro": ([1, 2, 3, 5], [40, 35, 20, 5]),
+    "Seda": ([1, 2, 3, 5], [35, 40, 20, 5])
+}
+QUANTIDADES_PADRAO = ([1, 2, 3], [70, 25, 5])
+
+DIAS_POR_LOTE = 30
+
 def gerar_dados_mock(db: Database, meses_historico=12, limpar_existente=True):
-    if not db.conn:
+    if not db.pool:
         return False
     try:
         if limpar_existente:
@@ -141,9 +173,7 @@ def gerar_dados_mock(db: Database, meses_historico=12, limpar_existente=True):
         for nome_cliente in clientes_selecionados:
             email = f"{nome_cliente.lower().replace(' ', '.')}@email.com" if random.random() > 0.2 else None
             telefone = f"({random.randint(11, 99)}) {random.randint(90000, 99999)}-{random.randint(1000, 9999)}" if random.random() > 0.3 else None
-            db.add_cliente(nome_cliente, email, telefone)
-            db.cursor.execute("SELECT id FROM clientes WHERE nome=%s ORDER BY id DESC LIMIT 1", (nome_cliente,))
-            cliente_id = db.cursor.fetchone()[0]
+            cliente_id = db.add_cliente(nome_cliente, email, telefone)
             clientes_criados.append(cliente_id)
         
         produtos_criados = {}
@@ -152,22 +182,8 @@ def gerar_dados_mock(db: Database, meses_historico=12, limpar_existente=True):
                 preco = preco_base
                 margem_custo = random.uniform(0.65, 0.75)
                 custo = round(preco * margem_custo, 2)
-                if categoria == "Cigarro":
-                    quantidade = random.randint(80, 150)
-                elif categoria == "Charuto":
-                    quantidade = random.randint(20, 60)
-                elif categoria == "Tabaco":
-                    quantidade = random.randint(30, 80)
-                elif categoria == "Filtro":
-                    quantidade = random.randint(100, 200)
-                elif categoria == "Seda":
-                    quantidade = random.randint(150, 300)
-                else:
-                    quantidade = random.randint(15, 50)
-                db.add_produto(nome, categoria, preco, quantidade, custo)
-                db.cursor.execute("SELECT id FROM produtos WHERE nome=%s AND categoria=%s ORDER BY id DESC LIMIT 1", 
-                                (nome, categoria))
-                produto_id = db.cursor.fetchone()[0]
+                quantidade = random.randint(*ESTOQUE_CATEGORIA.get(categoria, ESTOQUE_PADRAO))
+                produto_id = db.add_produto(nome, categoria, preco, quantidade, custo)
                 produtos_criados[produto_id] = {
                     'nome': nome,
                     'categoria': categoria,
@@ -180,50 +196,201 @@ def gerar_dados_mock(db: Database, meses_historico=12, limpar_existente=True):
         data_atual = data_inicio
         produtos_ids = list(produtos_criados.keys())
         produtos_populares = random.sample(produtos_ids, len(produtos_ids) // 3)
+        vendas = []
         while data_atual <= data_fim:
             dia_semana = data_atual.weekday()
-            num_vendas_dia = random.randint(15, 35) if dia_semana in [4, 5, 6] else random.randint(5, 20)
-            mes = data_atual.month
-            if mes in [1, 2]:
-                num_vendas_dia = int(num_vendas_dia * 0.7)
-            elif mes in [11, 12]:
-                num_vendas_dia = int(num_vendas_dia * 1.3)
+            if dia_semana in [4, 5, 6]:
+                num_vendas_dia = random.randint(*VENDAS_DIA_SEMANA['fim_de_semana'])
+            else:
+                num_vendas_dia = random.randint(*VENDAS_DIA_SEMANA['util'])
+            num_vendas_dia = int(num_vendas_dia * FATOR_MES.get(data_atual.month, 1.0))
             for _ in range(num_vendas_dia):
                 produto_id = random.choice(produtos_populares) if random.random() < 0.6 and produtos_populares else random.choice(produtos_ids)
                 produto_info = produtos_criados[produto_id]
-                if produto_info['categoria'] == "Cigarro":
-                    quantidade = random.choices([1, 2, 3], weights=[50, 40, 10])[0]
-                elif produto_info['categoria'] == "Charuto":
-                    quantidade = random.choices([1, 2], weights=[90, 10])[0]
-                elif produto_info['categoria'] == "Tabaco":
-                    quantidade = random.choices([1, 2], weights=[80, 20])[0]
-                elif produto_info['categoria'] == "Filtro":
-                    quantidade = random.choices([1, 2, 3, 5], weights=[40, 35, 20, 5])[0]
-                elif produto_info['categoria'] == "Seda":
-                    quantidade = random.choices([1, 2, 3, 5], weights=[35, 40, 20, 5])[0]
-                else:
-                    quantidade = random.choices([1, 2, 3], weights=[70, 25, 5])[0]
+                valores, pesos = QUANTIDADES_CATEGORIA.get(produto_info['categoria'], QUANTIDADES_PADRAO)
+                quantidade = random.choices(valores, weights=pesos)[0]
                 if random.random() < 0.05:
                     preco_unitario = round(produto_info['preco_atual'] * 0.95, 2)
                 else:
                     preco_unitario = produto_info['preco_atual']
                 total = round(preco_unitario * quantidade, 2)
-                hora = random.choices(range(24), weights=[1, 1, 1, 1, 1, 2, 3, 4, 5, 6, 7, 8, 9, 8, 7, 6, 7, 8, 9, 7, 5, 4, 3, 2])[0]
+                hora = random.choices(range(24), weights=PESOS_HORA)[0]
                 data_venda = data_atual.replace(hour=hora, minute=random.randint(0, 59), second=random.randint(0, 59))
                 cliente_id = random.choice(clientes_criados) if clientes_criados and random.random() > 0.25 else None
-                db.add_venda(produto_id, quantidade, preco_unitario, total, data_venda, cliente_id)
+                vendas.append((produto_id, quantidade, preco_unitario, total, data_venda, cliente_id))
                 total_vendas += 1
             data_atual += timedelta(days=1)
+        db.add_vendas_bulk(vendas)
         return True
     except Exception:
         return False
 
-def main():
+def _catalogo_produtos(rng, num_produtos):
+    base = [(nome, categoria, preco) for categoria, produtos in PRODUTOS_MOCK.items() for nome, preco in produtos]
+    catalogo = []
+    for i in range(num_produtos):
+        nome, categoria, preco = base[i % len(base)]
+        variante = i // len(base)
+        if variante:
+            nome = f"{nome} #{variante + 1}"
+            preco = round(preco * rng.uniform(0.9, 1.1), 2)
+        custo = round(preco * rng.uniform(0.65, 0.75), 2)
+        estoque = int(rng.integers(*ESTOQUE_CATEGORIA.get(categoria, ESTOQUE_PADRAO), endpoint=True))
+        catalogo.append((nome, categoria, preco, custo, estoque))
+    return catalogo
+
+def _cadastro_clientes(rng, num_clientes):
+    primeiros = sorted({nome.split()[0] for nome in NOMES_CLIENTES})
+    sobrenomes = sorted({nome.split()[-1] for nome in NOMES_CLIENTES})
+    clientes = []
+    for i in range(num_clientes):
+        nome = f"{primeiros[rng.integers(len(primeiros))]} {sobrenomes[rng.integers(len(sobrenomes))]}"
+        if i >= len(NOMES_CLIENTES):
+            nome = f"{nome} {i}"
+        email = f"{nome.lower().replace(' ', '.')}@email.com" if rng.random() > 0.2 else None
+        telefone = f"({rng.integers(11, 100)}) {rng.integers(90000, 100000)}-{rng.integers(1000, 10000)}" if rng.random() > 0.3 else None
+        clientes.append((nome, email, telefone))
+    return clientes
+
+def _dinheiro_csv(centavos):
+    return np.char.add(np.char.add((centavos // 100).astype(str), '.'), np.char.zfill((centavos % 100).astype(str), 2))
+
+def _vendas_csv(produto_ids, cliente_ids, quantidades, precos, totais, datas):
+    colunas = [
+        produto_ids.astype(str),
+        np.where(cliente_ids > 0, cliente_ids.astype(str), ''),
+        quantidades.astype(str),
+        _dinheiro_csv(precos),
+        _dinheiro_csv(totais),
+        datas.astype(str)
+    ]
+    linhas = colunas[0]
+    for coluna in colunas[1:]:
+        linhas = np.char.add(np.char.add(linhas, ','), coluna)
+    return io.StringIO('\n'.join(linhas.tolist()) + '\n')
+
+def _gerar_lote_vendas(rng, dias, perfil):
+    dia_semana = (dias.astype('int64') + 3) % 7
+    meses = dias.astype('datetime64[M]').astype('int64') % 12
+    contagens = rng.poisson(perfil['media_dia'] * perfil['fator_dia_semana'][dia_semana] * perfil['fator_mes'][meses])
+    n = int(contagens.sum())
+    if n == 0:
+        return None
+    
+    datas = np.repeat(dias, contagens).astype('datetime64[s]')
+    horas = rng.choice(24, size=n, p=perfil['pesos_hora'])
+    segundos = horas * 3600 + rng.integers(0, 60, n) * 60 + rng.integers(0, 60, n)
+    datas = datas + segundos.astype('timedelta64[s]')
+    
+    populares = perfil['populares']
+    produto_idx = np.where(
+        rng.random(n) < 0.6,
+        populares[rng.integers(0, len(populares), n)],
+        rng.integers(0, len(perfil['produto_ids']), n)
+    )
+    categorias = perfil['categorias'][produto_idx]
+    quantidades = np.empty(n, dtype=np.int64)
+    for codigo, (valores, pesos) in enumerate(perfil['quantidades']):
+        selecao = categorias == codigo
+        quantidades[selecao] = rng.choice(valores, size=int(selecao.sum()), p=pesos)
+    
+    precos = perfil['precos'][produto_idx]
+    precos = np.where(rng.random(n) < 0.05, np.rint(precos * 0.95).astype(np.int64), precos)
+    totais = precos * quantidades
+    
+    if len(perfil['cliente_ids']):
+        clientes = perfil['cliente_ids'][rng.integers(0, len(perfil['cliente_ids']), n)]
+        clientes = np.where(rng.random(n) > 0.25, clientes, 0)
+    else:
+        clientes = np.zeros(n, dtype=np.int64)
+    
+    ordem = np.argsort(datas, kind='stable')
+    return _vendas_csv(
+        perfil['produto_ids'][produto_idx][ordem], clientes[ordem], quantidades[ordem],
+        precos[ordem], totais[ordem], datas[ordem]
+    ), n
+
+def gerar_dataset(db: Database, seed=42, anos=1, num_produtos=None, num_clientes=50, vendas_por_dia=20,
+                  lojas=1, data_fim=None, limpar_existente=True):
+    if not db.pool:
+        return None
+    rng = np.random.default_rng(seed)
+    if limpar_existente:
+        db.clear_all_data(reiniciar_ids=True)
+    
+    num_produtos = num_produtos or sum(len(produtos) for produtos in PRODUTOS_MOCK.values())
+    catalogo = _catalogo_produtos(rng, num_produtos)
+    produto_ids = np.array(db.add_produtos_bulk(catalogo), dtype=np.int64)
+    cliente_ids = np.array(db.add_clientes_bulk(_cadastro_clientes(rng, num_clientes)), dtype=np.int64)
+    
+    nomes_categorias = list(QUANTIDADES_CATEGORIA.keys())
+    perfis_quantidade = [QUANTIDADES_CATEGORIA[categoria] for categoria in nomes_categorias] + [QUANTIDADES_PADRAO]
+    codigo_categoria = {categoria: i for i, categoria in enumerate(nomes_categorias)}
+    
+    fator_dia_semana = np.array([
+        sum(VENDAS_DIA_SEMANA['fim_de_semana' if dia in [4, 5, 6] else 'util']) / 2 for dia in range(7)
+    ])
+    fator_mes = np.array([FATOR_MES.get(mes, 1.0) for mes in range(1, 13)])
+    fator_dia_semana = fator_dia_semana / fator_dia_semana.mean()
+    fator_mes = fator_mes / fator_mes.mean()
+    
+    perfil = {
+        'media_dia': vendas_por_dia * lojas,
+        'fator_dia_semana': fator_dia_semana,
+        'fator_mes': fator_mes,
+        'pesos_hora': np.array(PESOS_HORA) / sum(PESOS_HORA),
+        'produto_ids': produto_ids,
+        'precos': np.array([round(produto[2] * 100) for produto in catalogo], dtype=np.int64),
+        'categorias': np.array([codigo_categoria.get(produto[1], len(nomes_categorias)) for produto in catalogo]),
+        'quantidades': [(np.array(valores), np.array(pesos) / sum(pesos)) for valores, pesos in perfis_quantidade],
+        'populares': rng.permutation(num_produtos)[:max(1, num_produtos // 3)],
+        'cliente_ids': cliente_ids
+    }
+    
+    data_fim = np.datetime64(data_fim or datetime.now().date(), 'D')
+    data_inicio = data_fim - np.timedelta64(int(anos * 365), 'D')
+    total_vendas = 0
+    num_dias = (data_fim - data_inicio).astype(np.int64) + 1
+    for inicio in range(0, num_dias, DIAS_POR_LOTE):
+        dias = data_inicio + np.arange(inicio, min(inicio + DIAS_POR_LOTE, num_dias))
+        lote = _gerar_lote_vendas(rng, dias, perfil)
+        if lote:
+            arquivo, n = lote
+            db.copy_vendas(arquivo)
+            total_vendas += n
+    
+    with db.cursor() as cursor:
+        cursor.execute("ANALYZE vendas")
+        cursor.execute("ANALYZE vendas_diarias")
+    
+    return {
+        'produtos': len(produto_ids),
+        'clientes': len(cliente_ids),
+        'vendas': total_vendas,
+        'data_inicio': str(data_inicio),
+        'data_fim': str(data_fim)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera dados de exemplo para a tabacaria.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--anos", type=float, default=1)
+    parser.add_argument("--produtos", type=int, default=None)
+    parser.add_argument("--clientes", type=int, default=50)
+    parser.add_argument("--vendas-dia", type=float, default=20)
+    parser.add_argument("--lojas", type=int, default=1)
+    parser.add_argument("--data-fim", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(), default=None,
+                        help="Último dia do histórico (AAAA-MM-DD). O padrão é hoje; informe-o para que a mesma --seed gere sempre os mesmos dados.")
+    args = parser.parse_args(argv)
+    
     db = Database()
     if db.connect():
-        gerar_dados_mock(db, meses_historico=12, limpar_existente=True)
+        resultado = gerar_dataset(
+            db, seed=args.seed, anos=args.anos, num_produtos=args.produtos, num_clientes=args.clientes,
+            vendas_por_dia=args.vendas_dia, lojas=args.lojas, data_fim=args.data_fim
+        )
+        print(resultado)
         db.disconnect()
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,88 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from datetime import datetime
+
+
+def formatar_valor(value):
+    if value is None:
+        return ""
+    return str(value)
+
+
+def formatar_data_hora(value):
+    if isinstance(value, datetime):
+        return value.strftime("%d/%m/%Y %H:%M")
+    return formatar_valor(value)
+
+
+def formatar_data(value):
+    if isinstance(value, datetime):
+        return value.strftime("%d/%m/%Y")
+    return formatar_valor(value)
+
+
+class ModeloTabelaPaginada(QAbstractTableModel):
+    def __init__(self, colunas, chave_linha, formatadores=None, tamanho_pagina=200, parent=None):
+        super().__init__(parent)
+        self.colunas = colunas
+        self.chave_linha = chave_linha
+        self.formatadores = formatadores or {}
+        self.tamanho_pagina = tamanho_pagina
+        self.buscar_pagina = None
+        self._linhas = []
+        self._ultima_chave = None
+        self._tem_mais = False
+
+    def recarregar(self, buscar_pagina):
+        self.beginResetModel()
+        self.buscar_pagina = buscar_pagina
+        self._linhas = []
+        self._ultima_chave = None
+        self._tem_mais = buscar_pagina is not None
+        self.endResetModel()
+        if self._tem_mais:
+            self.fetchMore(QModelIndex())
+
+    def linha(self, row):
+        return self._linhas[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._linhas)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.colunas)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        value = self._linhas[index.row()][index.column()]
+        formatador = self.formatadores.get(index.column(), formatar_valor)
+        return formatador(value)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.colunas[section]
+        return str(section + 1)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._tem_mais
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self._tem_mais:
+            return
+        linhas = self.buscar_pagina(self._ultima_chave, self.tamanho_pagina)
+        self._tem_mais = len(linhas) == self.tamanho_pagina
+        if not linhas:
+            return
+        inicio = len(self._linhas)
+        self.beginInsertRows(QModelIndex(), inicio, inicio + len(linhas) - 1)
+        self._linhas.extend(tuple(linha) for linha in linhas)
+        self.endInsertRows()
+        self._ultima_chave = self.chave_linha(self._linhas[-1])
@@ -0,0 +1,399 @@
+import inspect
+import threading
+from datetime import datetime, timedelta
+from functools import wraps
+import numpy as np
+from database import _como_data, _metricas_periodo, dividir_periodo
+from cache import PREFIXOS_ESCRITA
+
+EPOCA = datetime(1970, 1, 1)
+SEGUNDOS_DIA = 86400
+MAX_DIAS_JANELA = 3 * 366
+MAX_LINHAS_QUADRO = 2_000_000
+
+
+class JanelaExcedida(Exception):
+    pass
+
+
+def _dia_numero(valor):
+    return (_como_data(valor) - EPOCA.date()).days
+
+
+def _colunas_em_lotes(lotes, colunas, limite=None):
+    partes = []
+    linhas = 0
+    try:
+        for lote in lotes:
+            linhas += len(lote)
+            if limite is not None and linhas > limite:
+                raise JanelaExcedida(f"Janela com mais de {limite} vendas")
+            partes.append(np.array(lote, dtype=np.int64).reshape(-1, colunas))
+    finally:
+        if hasattr(lotes, 'close'):
+            lotes.close()
+    if not partes:
+        return np.zeros((0, colunas), dtype=np.int64)
+    return np.concatenate(partes)
+
+
+class QuadroFatos:
+    def __init__(self, dia_inicio, dia_fim, produtos, clientes, fatos, revisao=None):
+        self.dia_inicio = dia_inicio
+        self.dia_fim = dia_fim
+        self.revisao = revisao
+
+        ids_produtos, nomes, categorias, precos, custos, estoques = zip(*produtos) if produtos else ((),) * 6
+        self.produto_ids = np.array(ids_produtos, dtype=np.int64)
+        self.produto_nomes = list(nomes)
+        self.categorias = sorted({c for c in categorias if c is not None})
+        codigos = {categoria: i for i, categoria in enumerate(self.categorias)}
+        self.produto_categoria = np.array([codigos.get(c, -1) for c in categorias], dtype=np.int32)
+        self.produto_preco = np.array([float(p or 0) for p in precos], dtype=np.float64)
+        self.produto_custo = np.array([float(c or 0) for c in custos], dtype=np.float64)
+        self.produto_estoque = np.array([float(e or 0) for e in estoques], dtype=np.float64)
+
+        ids_clientes, nomes_clientes = zip(*clientes) if clientes else ((), ())
+        self.cliente_ids = np.array(ids_clientes, dtype=np.int64)
+        self.cliente_nomes = list(nomes_clientes)
+
+        self.segundo = fatos[:, 0]
+        self.dia = (self.segundo // SEGUNDOS_DIA).astype(np.int32)
+        self.produto = self._codigos(self.produto_ids, fatos[:, 1])
+        self.cliente = self._codigos(self.cliente_ids, fatos[:, 2])
+        self.quantidade = fatos[:, 3]
+        self.centavos = fatos[:, 4]
+
+    @staticmethod
+    def _codigos(ids, valores):
+        if not len(ids):
+            return np.full(len(valores), -1, dtype=np.int32)
+        posicoes = np.clip(np.searchsorted(ids, valores), 0, len(ids) - 1)
+        return np.where(ids[posicoes] == valores, posicoes, -1).astype(np.int32)
+
+    def cobre(self, dia_inicio, dia_fim):
+        return self.dia_inicio <= dia_inicio and dia_fim <= self.dia_fim
+
+    def mascara(self, dia_inicio, dia_fim, categoria=None):
+        mascara = (self.dia >= dia_inicio) & (self.dia <= dia_fim)
+        if categoria:
+            if categoria not in self.categorias:
+                return np.zeros(len(self.dia), dtype=bool)
+            codigo = self.categorias.index(categoria)
+            mascara &= (self.produto >= 0) & (self.produto_categoria[np.maximum(self.produto, 0)] == codigo)
+        return mascara
+
+    def produtos_da_categoria(self, categoria=None):
+        if not categoria:
+            return np.arange(len(self.produto_ids))
+        if categoria not in self.categorias:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(self.produto_categoria == self.categorias.index(categoria))
+
+    def por_produto(self, mascara):
+        com_produto = mascara & (self.produto >= 0)
+        n = len(self.produto_ids)
+        produto = self.produto[com_produto]
+        quantidade = np.bincount(produto, weights=self.quantidade[com_produto], minlength=n)
+        centavos = np.bincount(produto, weights=self.centavos[com_produto], minlength=n)
+        vendas = np.bincount(produto, minlength=n)
+        return quantidade, centavos, vendas
+
+    def por_cliente(self, mascara):
+        com_cliente = mascara & (self.cliente >= 0)
+        cliente = self.cliente[com_cliente]
+        segundo = self.segundo[com_cliente]
+        centavos = self.centavos[com_cliente]
+        ordem = np.argsort(cliente, kind='stable')
+        cliente, segundo, centavos = cliente[ordem], segundo[ordem], centavos[ordem]
+        codigos, inicios = np.unique(cliente, return_index=True)
+        if not len(codigos):
+            vazio = np.zeros(0, dtype=np.int64)
+            return vazio, vazio, vazio, vazio, vazio
+        vendas = np.diff(np.append(inicios, len(cliente)))
+        return (
+            codigos,
+            vendas,
+            np.add.reduceat(centavos, inicios),
+            np.minimum.reduceat(segundo, inicios),
+            np.maximum.reduceat(segundo, inicios)
+        )
+
+    def diario(self, mascara):
+        dias = self.dia[mascara] - self.dia_inicio
+        n = self.dia_fim - self.dia_inicio + 1
+        return (
+            np.bincount(dias, weights=self.centavos[mascara], minlength=n),
+            np.bincount(dias, minlength=n)
+        )
+
+
+def _data(dia):
+    return (EPOCA + timedelta(days=int(dia))).date()
+
+
+def _data_hora(segundo):
+    return EPOCA + timedelta(seconds=int(segundo))
+
+
+def _reais(centavos):
+    return float(centavos) / 100
+
+
+class MotorAnalitico:
+    def __init__(self, db, max_linhas=MAX_LINHAS_QUADRO):
+        self.db = db
+        self.max_linhas = max_linhas
+        self.quadro = None
+        self.cargas = 0
+        self._geracao = 0
+        self._excedidas = set()
+        self._lock = threading.Lock()
+
+    def invalidar(self):
+        with self._lock:
+            self.quadro = None
+            self._geracao += 1
+            self._excedidas.clear()
+
+    def _revisao(self):
+        agregados = self.db.agregados
+        if agregados is None:
+            return None
+        agregados.sincronizar(self.db)
+        return agregados.revisao
+
+    def _valido(self, quadro, revisao):
+        return quadro is not None and quadro.revisao == revisao
+
+    def aquecido(self, data_inicio, data_fim):
+        quadro = self.quadro
+        return quadro is not None and quadro.cobre(_dia_numero(data_inicio), _dia_numero(data_fim))
+
+    def obter(self, data_inicio, data_fim):
+        dia_inicio, dia_fim = _dia_numero(data_inicio), _dia_numero(data_fim)
+        revisao = self._revisao()
+        with self._lock:
+            quadro = self.quadro
+            if not self._valido(quadro, revisao):
+                quadro = self.quadro = None
+                self._excedidas.clear()
+            if quadro is not None and quadro.cobre(dia_inicio, dia_fim):
+                return quadro
+            if any(inicio <= dia_inicio and dia_fim <= fim for inicio, fim in self._excedidas):
+                raise JanelaExcedida(f"Janela com mais de {self.max_linhas} vendas")
+            if quadro is not None and dia_inicio <= quadro.dia_fim + 1 and dia_fim >= quadro.dia_inicio - 1:
+                uniao = (min(dia_inicio, quadro.dia_inicio), max(dia_fim, quadro.dia_fim))
+                if uniao[1] - uniao[0] <= MAX_DIAS_JANELA:
+                    dia_inicio, dia_fim = uniao
+            geracao = self._geracao
+        try:
+            novo = self._carregar(dia_inicio, dia_fim, revisao)
+        except JanelaExcedida:
+            with self._lock:
+                if geracao == self._geracao:
+                    self._excedidas.add((dia_inicio, dia_fim))
+            raise
+        with self._lock:
+            self.cargas += 1
+            if geracao == self._geracao:
+                self.quadro = novo
+        return novo
+
+    def _carregar(self, dia_inicio, dia_fim, revisao=None):
+        inicio = EPOCA + timedelta(days=dia_inicio)
+        fim = EPOCA + timedelta(days=dia_fim + 1)
+        with self.db.cursor() as cursor:
+            cursor.execute("SELECT id, nome, categoria, preco, custo, quantidade FROM produtos ORDER BY id")
+            produtos = cursor.fetchall()
+            cursor.execute("SELECT id, nome FROM clientes ORDER BY id")
+            clientes = cursor.fetchall()
+        fatos = _colunas_em_lotes(self.db.iterar_lotes("""
+            SELECT EXTRACT(EPOCH FROM data_venda)::bigint, COALESCE(produto_id, 0), COALESCE(cliente_id, 0),
+                   quantidade, ROUND(total * 100)::bigint
+            FROM vendas
+            WHERE data_venda >= %s AND data_venda < %s
+        """, (inicio, fim)), 5, self.max_linhas)
+        return QuadroFatos(dia_inicio, dia_fim, produtos, clientes, fatos, revisao)
+
+    def vendas_por_periodo(self, data_inicio, data_fim, categoria=None):
+        quadro = self.obter(data_inicio, data_fim)
+        centavos, vendas = quadro.diario(quadro.mascara(_dia_numero(data_inicio), _dia_numero(data_fim), categoria))
+        return [(_data(quadro.dia_inicio + i), _reais(centavos[i])) for i in np.flatnonzero(vendas)]
+
+    def vendas_por_dia_semana(self, data_inicio, data_fim, categoria=None):
+        quadro = self.obter(data_inicio, data_fim)
+        mascara = quadro.mascara(_dia_numero(data_inicio), _dia_numero(data_fim), categoria)
+        dia_semana = (quadro.dia[mascara] + 4) % 7
+        centavos = np.bincount(dia_semana, weights=quadro.centavos[mascara], minlength=7)
+        vendas = np.bincount(dia_semana, minlength=7)
+        return [(int(d), _reais(centavos[d])) for d in np.flatnonzero(vendas)]
+
+    def dashboard_snapshot(self, data_inicio, data_fim, categoria=None):
+        (anterior_inicio, inicio), (_, fim) = dividir_periodo(data_inicio, data_fim, 'periodo_anterior')
+        quadro = self.obter(anterior_inicio, fim - timedelta(days=1))
+        metricas = []
+        for a, b in ((inicio, fim), (anterior_inicio, inicio)):
+            mascara = quadro.mascara(_dia_numero(a), _dia_numero(b) - 1, categoria)
+            clientes = quadro.cliente[mascara]
+            metricas.append(_metricas_periodo(
+                int(mascara.sum()),
+                _reais(quadro.centavos[mascara].sum()),
+                len(np.unique(clientes[clientes >= 0])),
+                int(quadro.quantidade[mascara].sum())
+            ))
+        snapshot, anterior = metricas
+        snapshot['anterior'] = anterior
+        return snapshot
+
+    def produtos_mais_vendidos(self, limite=10, por_receita=False, data_inicio=None, data_fim=None, categoria=None):
+        quadro = self.obter(data_inicio, data_fim)
+        quantidade, centavos, vendas = quadro.por_produto(quadro.mascara(_dia_numero(data_inicio), _dia_numero(data_fim), categoria))
+        valores = centavos / 100 if por_receita else quantidade
+        candidatos = np.flatnonzero(vendas)
+        ordem = candidatos[np.argsort(-valores[candidatos], kind='stable')][:limite]
+        return [(quadro.produto_nomes[i], float(valores[i]) if por_receita else int(valores[i])) for i in ordem]
+
+    def giro_estoque(self, data_inicio, data_fim, categoria=None):
+        quadro = self.obter(data_inicio, data_fim)
+        quantidade, _, _ = quadro.por_produto(quadro.mascara(_dia_numero(data_inicio), _dia_numero(data_fim)))
+        dias_periodo = (data_fim - data_inicio).days or 1
+        produtos = quadro.produtos_da_categoria(categoria)
+        estoque = quadro.produto_estoque[produtos]
+        vendida = quantidade[produtos]
+        giro = np.divide(vendida, estoque, out=np.zeros_like(vendida), where=estoque > 0)
+        media_diaria = vendida / dias_periodo
+        dias_estoque = np.where(
+            media_diaria > 0,
+            np.divide(estoque, media_diaria, out=np.zeros_like(estoque), where=media_diaria > 0),
+            np.where(estoque > 0, 999, 0)
+        )
+        return [{
+            'id': int(quadro.produto_ids[p]),
+            'nome': quadro.produto_nomes[p],
+            'estoque_atual': float(estoque[i]),
+            'quantidade_vendida': float(vendida[i]),
+            'giro': float(giro[i]),
+            'dias_estoque': float(dias_estoque[i]),
+            'preco': float(quadro.produto_preco[p])
+        } for i, p in enumerate(produtos)]
+
+    def correlacoes(self, data_inicio, data_fim, categoria=None):
+        quadro = self.obter(data_inicio, data_fim)
+        quantidade, _, vendas = quadro.por_produto(quadro.mascara(_dia_numero(data_inicio), _dia_numero(data_fim), categoria))
+        return [(float(quadro.produto_preco[i]), int(quantidade[i])) for i in np.flatnonzero(vendas)]
+
+    def analise_margem(self, data_inicio, data_fim, categoria=None):
+        quadro = self.obter(data_inicio, data_fim)
+        quantidade, centavos, _ = quadro.por_produto(quadro.mascara(_dia_numero(data_inicio), _dia_numero(data_fim)))
+        produtos = quadro.produtos_da_categoria(categoria)
+        preco = quadro.produto_preco[produtos]
+        custo = quadro.produto_custo[produtos]
+        vendida = quantidade[produtos]
+        receita = centavos[produtos] / 100
+        margem_unit = preco - custo
+        margem_percent = np.divide(margem_unit * 100, preco, out=np.zeros_like(preco), where=preco != 0)
+        custo_total = vendida * custo
+        lucro_total = receita - custo_total
+        ordem = np.argsort(-lucro_total, kind='stable')
+        return [(
+            int(quadro.produto_ids[produtos[i]]),
+            quadro.produto_nomes[produtos[i]],
+            quadro.categorias[quadro.produto_categoria[produtos[i]]] if quadro.produto_categoria[produtos[i]] >= 0 else None,
+            float(preco[i]),
+            float(custo[i]),
+            float(margem_unit[i]),
+            float(margem_percent[i]),
+            int(vendida[i]),
+            float(receita[i]),
+            float(custo_total[i]),
+            float(lucro_total[i])
+        ) for i in ordem]
+
+    def _clientes(self, data_inicio, data_fim):
+        quadro = self.obter(data_inicio, data_fim)
+        return quadro, quadro.por_cliente(quadro.mascara(_dia_numero(data_inicio), _dia_numero(data_fim)))
+
+    def clientes_mais_frequentes(self, limite=10, data_inicio=None, data_fim=None):
+        quadro, (codigos, vendas, centavos, _, _) = self._clientes(data_inicio, data_fim)
+        ordem = np.lexsort((-centavos, -vendas))[:limite]
+        return [(int(quadro.cliente_ids[codigos[i]]), quadro.cliente_nomes[codigos[i]], int(vendas[i]), _reais(centavos[i]))
+                for i in ordem]
+
+    def clientes_maior_ticket_medio(self, limite=10, data_inicio=None, data_fim=None):
+        quadro, (codigos, vendas, centavos, _, _) = self._clientes(data_inicio, data_fim)
+        ticket = centavos / np.maximum(vendas, 1) / 100
+        ordem = np.argsort(-ticket, kind='stable')[:limite]
+        return [(int(quadro.cliente_ids[codigos[i]]), quadro.cliente_nomes[codigos[i]], int(vendas[i]),
+                 _reais(centavos[i]), float(ticket[i])) for i in ordem]
+
+    def vendas_por_cliente(self, data_inicio, data_fim):
+        quadro, (codigos, vendas, centavos, primeira, ultima) = self._clientes(data_inicio, data_fim)
+        ordem = np.argsort(-centavos, kind='stable')
+        return [(int(quadro.cliente_ids[codigos[i]]), quadro.cliente_nomes[codigos[i]], int(vendas[i]),
+                 _reais(centavos[i]), _reais(centavos[i]) / int(vendas[i]), _data_hora(primeira[i]), _data_hora(ultima[i]))
+                for i in ordem]
+
+    def estatisticas_clientes(self, data_inicio=None, data_fim=None):
+        _, (codigos, vendas, centavos, _, _) = self._clientes(data_inicio, data_fim)
+        total_vendas = int(vendas.sum())
+        receita = _reais(centavos.sum())
+        return {
+            'total_clientes': len(codigos),
+            'clientes_com_compras': len(codigos),
+            'total_vendas': total_vendas,
+            'receita_total': receita,
+            'ticket_medio_geral': receita / total_vendas if total_vendas else 0
+        }
+
+
+def _com_janela(motor, metodo, original, aquecido=False):
+    assinatura = inspect.signature(metodo)
+
+    @wraps(original)
+    def servido(*args, **kwargs):
+        vinculo = assinatura.bind(*args, **kwargs)
+        vinculo.apply_defaults()
+        data_inicio, data_fim = vinculo.arguments['data_inicio'], vinculo.arguments['data_fim']
+        if not (data_inicio and data_fim) or (aquecido and not motor.aquecido(data_inicio, data_fim)):
+            return original(*args, **kwargs)
+        try:
+            return metodo(*args, **kwargs)
+        except JanelaExcedida:
+            return original(*args, **kwargs)
+    return servido
+
+
+def ativar_motor_analitico(db):
+    motor = MotorAnalitico(db)
+    db.motor = motor
+    servidos = [
+        ('get_dashboard_snapshot', motor.dashboard_snapshot, False),
+        ('get_produtos_mais_vendidos', motor.produtos_mais_vendidos, False),
+        ('get_giro_estoque', motor.giro_estoque, False),
+        ('get_correlacoes', motor.correlacoes, False),
+        ('get_analise_margem', motor.analise_margem, False),
+        ('get_clientes_mais_frequentes', motor.clientes_mais_frequentes, False),
+        ('get_clientes_maior_ticket_medio', motor.clientes_maior_ticket_medio, False),
+        ('get_vendas_por_cliente', motor.vendas_por_cliente, False),
+        ('get_estatisticas_clientes', motor.estatisticas_clientes, False),
+        ('get_vendas_por_periodo', motor.vendas_por_periodo, True),
+        ('get_vendas_por_dia_semana', motor.vendas_por_dia_semana, True)
+    ]
+    for nome, metodo, aquecido in servidos:
+        setattr(db, nome, _com_janela(motor, metodo, getattr(db, nome), aquecido))
+
+    for nome in dir(type(db)):
+        if nome.startswith(PREFIXOS_ESCRITA):
+            setattr(db, nome, _escrita_invalidante(motor, getattr(db, nome)))
+    return db
+
+
+def _escrita_invalidante(motor, metodo):
+    @wraps(metodo)
+    def invalidante(*args, **kwargs):
+        try:
+            return metodo(*args, **kwargs)
+        finally:
+            motor.invalidar()
+    return invalidante
@@ -0,0 +1,96 @@
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import psycopg2
+from psycopg2 import sql
+from database import Database
+
+
+def _diretorio_binarios():
+    if os.getenv("PG_BIN"):
+        return os.getenv("PG_BIN")
+    pg_ctl = shutil.which("pg_ctl")
+    if pg_ctl:
+        return os.path.dirname(pg_ctl)
+    try:
+        return subprocess.run(["pg_config", "--bindir"], check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        raise RuntimeError("Binários do PostgreSQL não encontrados; defina PG_BIN.")
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ClusterTemporario:
+    def __init__(self, diretorio=None, porta=None):
+        self.bin_dir = _diretorio_binarios()
+        self.temporario = diretorio is None
+        self.diretorio = diretorio or tempfile.mkdtemp(prefix="tabacaria_pg_")
+        self.dados = os.path.join(self.diretorio, "dados")
+        self.socket_dir = os.path.join(self.diretorio, "socket")
+        self.log = os.path.join(self.diretorio, "postgres.log")
+        self.porta = porta or _porta_livre()
+
+    def __enter__(self):
+        try:
+            self.iniciar()
+        except BaseException:
+            try:
+                self.parar()
+            except (OSError, subprocess.CalledProcessError):
+                pass
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    def _executar(self, programa, *args):
+        subprocess.run([os.path.join(self.bin_dir, programa), *args], check=True, capture_output=True)
+
+    def iniciar(self):
+        os.makedirs(self.socket_dir, exist_ok=True)
+        if not os.path.exists(os.path.join(self.dados, "PG_VERSION")):
+            self._executar("initdb", "-D", self.dados, "-U", "postgres", "-A", "trust", "-E", "UTF8", "--no-sync")
+        opcoes = f"-p {self.porta} -k {self.socket_dir} -c listen_addresses='' -c fsync=off -c synchronous_commit=off"
+        self._executar("pg_ctl", "-D", self.dados, "-l", self.log, "-o", opcoes, "-w", "start")
+
+    def parar(self):
+        try:
+            self._executar("pg_ctl", "-D", self.dados, "-m", "fast", "-w", "stop")
+        finally:
+            if self.temporario:
+                shutil.rmtree(self.diretorio, ignore_errors=True)
+
+    def conectar(self, dbname="postgres"):
+        conn = psycopg2.connect(dbname=dbname, user="postgres", host=self.socket_dir, port=self.porta)
+        conn.autocommit = True
+        return conn
+
+    def criar_banco(self, nome):
+        conn = self.conectar()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_database WHERE datname=%s", (nome,))
+                if cursor.fetchone():
+                    return False
+                cursor.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(nome)))
+                return True
+        finally:
+            conn.close()
+
+    def vacuum(self, nome):
+        conn = self.conectar(nome)
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("VACUUM ANALYZE")
+        finally:
+            conn.close()
+
+    def database(self, nome, **kwargs):
+        return Database(dbname=nome, user="postgres", password="", host=self.socket_dir, port=str(self.porta), **kwargs)
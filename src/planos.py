@@ -0,0 +1,167 @@
+import argparse
+import hashlib
+import json
+import re
+import sys
+from datetime import datetime
+from psycopg2 import extensions
+from benchmark import TAMANHOS, casos, popular
+from pg_temporario import ClusterTemporario
+
+LIMITE_ESTIMATIVA = 10
+TABELAS_VIGIADAS = {'vendas'}
+
+
+def _normalizar_sql(consulta):
+    return re.sub(r"\s+", " ", consulta).strip()
+
+
+def _cursor_gravador(consultas):
+    class CursorGravador(extensions.cursor):
+        def execute(self, query, vars=None):
+            texto = query.decode() if isinstance(query, bytes) else query
+            consultas.append((_normalizar_sql(texto), self.mogrify(query, vars).decode()))
+            return super().execute(query, vars)
+    return CursorGravador
+
+
+def gravar_consultas(db, funcao):
+    consultas = []
+    anterior = db.cursor_factory
+    db.cursor_factory = _cursor_gravador(consultas)
+    try:
+        funcao(db)
+    finally:
+        db.cursor_factory = anterior
+    return [(modelo, sql) for modelo, sql in consultas if re.match(r"(?is)\s*(SELECT|WITH)\b", sql)]
+
+
+def _nos(plano):
+    yield plano
+    for filho in plano.get('Plans', []):
+        yield from _nos(filho)
+
+
+def _forma(plano):
+    return [
+        plano.get('Node Type'), plano.get('Relation Name'), plano.get('Index Name'),
+        plano.get('Join Type'), plano.get('Strategy'),
+        [_forma(filho) for filho in plano.get('Plans', [])]
+    ]
+
+
+def impressao_digital(dados):
+    return hashlib.sha1(json.dumps(dados, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def alertas_plano(plano):
+    alertas = []
+    for no in _nos(plano):
+        tipo = no.get('Node Type')
+        if tipo == 'Seq Scan' and no.get('Relation Name') in TABELAS_VIGIADAS:
+            alertas.append(f"seq_scan:{no['Relation Name']}")
+        if tipo == 'Hash' and max(no.get('Hash Batches', 1), no.get('Original Hash Batches', 1)) > 1:
+            alertas.append("hash_em_disco")
+        if tipo == 'Sort' and no.get('Sort Space Type') == 'Disk':
+            alertas.append("sort_em_disco")
+        if 'Actual Rows' in no and no.get('Actual Loops', 0) > 0:
+            estimadas = max(no.get('Plan Rows', 0), 1)
+            reais = max(no['Actual Rows'], 1)
+            if max(estimadas / reais, reais / estimadas) > LIMITE_ESTIMATIVA:
+                alertas.append(f"estimativa:{tipo}:{no.get('Relation Name', '-')}")
+    return sorted(set(alertas))
+
+
+def explicar(db, sql):
+    with db.cursor() as cursor:
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql)
+        resultado = cursor.fetchone()[0][0]
+    plano = resultado['Plan']
+    return {
+        'plano': impressao_digital(_forma(plano)),
+        'alertas': alertas_plano(plano),
+        'tempo_ms': round(resultado.get('Execution Time', 0.0), 3),
+        'buffers_lidos': plano.get('Shared Read Blocks', 0),
+        'buffers_cache': plano.get('Shared Hit Blocks', 0),
+        'temp_escritos': plano.get('Temp Written Blocks', 0)
+    }
+
+
+def capturar(db, filtro_metodos=None):
+    capturas = {}
+    for caso, metodo, funcao in casos():
+        if filtro_metodos and metodo not in filtro_metodos:
+            continue
+        consultas = {}
+        for modelo, sql in gravar_consultas(db, funcao):
+            consultas.setdefault(impressao_digital(modelo), explicar(db, sql))
+        capturas[caso] = consultas
+    return capturas
+
+
+def comparar(capturas, baseline):
+    regressoes = []
+    mudancas = []
+    for caso, consultas in capturas.items():
+        base_caso = baseline.get('planos', {}).get(caso, {})
+        for consulta, atual in consultas.items():
+            base = base_caso.get(consulta)
+            if base is None:
+                continue
+            novos = sorted(set(atual['alertas']) - set(base['alertas']))
+            if novos:
+                regressoes.append((caso, consulta, novos))
+            elif atual['plano'] != base['plano']:
+                mudancas.append((caso, consulta))
+    return regressoes, mudancas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Captura e compara os planos de execução das consultas de Database.")
+    parser.add_argument("--tamanho", default="10k", choices=list(TAMANHOS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--metodos", default=None, help="Captura apenas os métodos listados (separados por vírgulas).")
+    parser.add_argument("--diretorio", default=None, help="Mantém o cluster neste diretório para reaproveitar os dados.")
+    parser.add_argument("--saida", default=None, help="Grava os planos capturados como baseline JSON.")
+    parser.add_argument("--baseline", default=None, help="Compara com uma baseline JSON gravada anteriormente.")
+    args = parser.parse_args(argv)
+    filtro_metodos = set(args.metodos.split(",")) if args.metodos else None
+
+    with ClusterTemporario(args.diretorio) as cluster:
+        db = popular(cluster, args.tamanho, args.seed)
+        try:
+            capturas = capturar(db, filtro_metodos)
+        finally:
+            db.disconnect()
+
+    for caso, consultas in capturas.items():
+        for consulta, captura in consultas.items():
+            alertas = ", ".join(captura['alertas']) or "-"
+            print(f"{caso:<50} {consulta} {captura['plano']} {captura['tempo_ms']:>10.2f}ms {alertas}", file=sys.stderr)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump({
+                'meta': {
+                    'data': datetime.now().isoformat(timespec='seconds'),
+                    'tamanho': args.tamanho,
+                    'seed': args.seed
+                },
+                'planos': capturas
+            }, arquivo, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as arquivo:
+            baseline = json.load(arquivo)
+        regressoes, mudancas = comparar(capturas, baseline)
+        for caso, consulta in mudancas:
+            print(f"PLANO ALTERADO {caso} {consulta}", file=sys.stderr)
+        for caso, consulta, novos in regressoes:
+            print(f"REGRESSÃO {caso} {consulta}: {', '.join(novos)}", file=sys.stderr)
+        if regressoes:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
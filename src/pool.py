@@ -0,0 +1,108 @@
+import threading
+import time
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolEsgotado(Exception):
+    pass
+
+
+class PoolConexoes:
+    def __init__(self, minconn=1, maxconn=8, timeout=10.0, verificar_apos=30.0, **parametros):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Tamanhos de pool inválidos.")
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.verificar_apos = verificar_apos
+        self.parametros = parametros
+        self._livres = []
+        self._emprestadas = 0
+        self._fechado = False
+        self._condicao = threading.Condition()
+        for _ in range(minconn):
+            self._livres.append((self._abrir(), time.monotonic()))
+
+    def _abrir(self):
+        return psycopg2.connect(**self.parametros)
+
+    def _fechar(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _saudavel(self, conn, ultimo_uso):
+        if conn.closed:
+            return False
+        if time.monotonic() - ultimo_uso < self.verificar_apos:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        limite = time.monotonic() + self.timeout
+        with self._condicao:
+            while True:
+                if self._fechado:
+                    raise PoolEsgotado("Pool de conexões fechado.")
+                if self._livres:
+                    conn, ultimo_uso = self._livres.pop()
+                    break
+                if self._emprestadas < self.maxconn:
+                    conn, ultimo_uso = None, 0.0
+                    break
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    raise PoolEsgotado(f"Nenhuma conexão livre após {self.timeout}s.")
+                self._condicao.wait(restante)
+            self._emprestadas += 1
+        try:
+            if conn is not None and not self._saudavel(conn, ultimo_uso):
+                self._fechar(conn)
+                conn = None
+            if conn is None:
+                conn = self._abrir()
+        except Exception:
+            with self._condicao:
+                self._emprestadas -= 1
+                self._condicao.notify()
+            raise
+        return conn
+
+    def putconn(self, conn, descartar=False):
+        if not descartar and not conn.closed:
+            if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    descartar = True
+        with self._condicao:
+            self._emprestadas -= 1
+            if self._fechado or descartar or conn.closed:
+                self._fechar(conn)
+            else:
+                self._livres.append((conn, time.monotonic()))
+            self._condicao.notify()
+
+    def closeall(self):
+        with self._condicao:
+            self._fechado = True
+            livres, self._livres = self._livres, []
+            self._condicao.notify_all()
+        for conn, _ in livres:
+            self._fechar(conn)
+
+    def estatisticas(self):
+        with self._condicao:
+            return {
+                'livres': len(self._livres),
+                'emprestadas': self._emprestadas,
+                'maximo': self.maxconn
+            }
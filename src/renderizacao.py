@@ -0,0 +1,198 @@
+import pickle
+import time
+import weakref
+import itertools
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PyQt6.QtWidgets import QWidget, QSizePolicy
+from PyQt6.QtCore import QObject, QSize, QTimer, pyqtSignal
+from PyQt6.QtGui import QImage, QPainter
+from metricas import METRICAS
+
+
+ATRASO_REDIMENSIONAMENTO_MS = 100
+MAX_FIGURAS_PROCESSO = 32
+
+_figuras = OrderedDict()
+_chaves = itertools.count()
+
+
+def rasterizar(chave, versao, figura, nome_memoria, largura, altura):
+    if figura is not None:
+        figura = pickle.loads(figura)
+        _figuras[chave] = (versao, figura)
+        if len(_figuras) > MAX_FIGURAS_PROCESSO:
+            _figuras.popitem(last=False)
+    else:
+        versao_local, figura = _figuras.get(chave, (None, None))
+        if versao_local != versao:
+            return None
+    _figuras.move_to_end(chave)
+    canvas = FigureCanvasAgg(figura)
+    figura.set_size_inches(largura / figura.dpi, altura / figura.dpi)
+    canvas.draw()
+    imagem = canvas.buffer_rgba()
+    altura, largura = imagem.shape[:2]
+    memoria = SharedMemory(name=nome_memoria)
+    try:
+        memoria.buf[:imagem.nbytes] = imagem.tobytes()
+    finally:
+        memoria.close()
+    return largura, altura
+
+
+class SinaisRenderizacao(QObject):
+    concluida = pyqtSignal(object, object)
+    falhou = pyqtSignal(object, str)
+
+
+class RenderizadorProcessos:
+    def __init__(self, processos):
+        self.executor = ProcessPoolExecutor(processos, mp_context=multiprocessing.get_context('spawn'))
+        self.sinais = SinaisRenderizacao()
+        self.canvases = weakref.WeakSet()
+        self.sinais.concluida.connect(self._entregar)
+        self.sinais.falhou.connect(self._falhar)
+
+    def enviar(self, canvas, chave, versao, figura, memoria, largura, altura):
+        self.canvases.add(canvas)
+        try:
+            futuro = self.executor.submit(rasterizar, chave, versao, figura, memoria.name, largura, altura)
+        except RuntimeError:
+            canvas.receber(None, None)
+            return
+        futuro.add_done_callback(lambda futuro: self._concluir(canvas, futuro))
+
+    def _concluir(self, canvas, futuro):
+        try:
+            self.sinais.concluida.emit(canvas, futuro.result())
+        except Exception as e:
+            self.sinais.falhou.emit(canvas, str(e))
+
+    def _entregar(self, canvas, tamanho):
+        if tamanho is None:
+            canvas.reenviar()
+        else:
+            canvas.receber(*tamanho)
+
+    def _falhar(self, canvas, erro):
+        canvas.receber(None, None)
+
+    def encerrar(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        for canvas in list(self.canvases):
+            canvas.liberar()
+
+
+class CanvasRemoto(QWidget):
+    def __init__(self, figure, renderizador):
+        super().__init__()
+        self.figure = figure
+        self.renderizador = renderizador
+        FigureCanvasAgg(figure)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self._memorias = [None, None]
+        self._exibida = 0
+        self._imagem = None
+        self._em_andamento = False
+        self._pendente = False
+        self._inicio = 0.0
+        self._fechado = False
+        self._chave = next(_chaves)
+        self._versao = 0
+        self._figura = None
+        self._redimensionamento = QTimer(self)
+        self._redimensionamento.setSingleShot(True)
+        self._redimensionamento.setInterval(ATRASO_REDIMENSIONAMENTO_MS)
+        self._redimensionamento.timeout.connect(self.draw_idle)
+
+    def sizeHint(self):
+        largura, altura = self.figure.get_size_inches() * self.figure.dpi
+        return QSize(int(largura), int(altura))
+
+    def _memoria(self, indice, tamanho):
+        memoria = self._memorias[indice]
+        if memoria is None or memoria.size < tamanho:
+            self._fechar_memoria(indice)
+            memoria = SharedMemory(create=True, size=tamanho)
+            self._memorias[indice] = memoria
+        return memoria
+
+    def _fechar_memoria(self, indice):
+        memoria = self._memorias[indice]
+        if memoria is None:
+            return
+        if indice == self._exibida and self._imagem is not None:
+            self._imagem = self._imagem.copy()
+        memoria.close()
+        memoria.unlink()
+        self._memorias[indice] = None
+
+    def draw_idle(self, reenvio=False):
+        if self._fechado:
+            return
+        self._redimensionamento.stop()
+        if self._em_andamento:
+            self._pendente = True
+            return
+        razao = self.devicePixelRatioF()
+        largura = max(1, int(self.width() * razao))
+        altura = max(1, int(self.height() * razao))
+        if not self.isVisible():
+            largura, altura = self.sizeHint().width(), self.sizeHint().height()
+        alvo = 1 - self._exibida
+        memoria = self._memoria(alvo, largura * altura * 4)
+        self._em_andamento = True
+        self._pendente = False
+        self._inicio = time.perf_counter()
+        figura = None
+        if self._figura is None or self.figure.stale:
+            self._figura = pickle.dumps(self.figure)
+            self._versao += 1
+            self.figure.stale = False
+            figura = self._figura
+        elif reenvio:
+            figura = self._figura
+        self.renderizador.enviar(self, self._chave, self._versao, figura, memoria, largura, altura)
+
+    def reenviar(self):
+        self._em_andamento = False
+        self.draw_idle(reenvio=True)
+
+    def receber(self, largura, altura):
+        if self._fechado:
+            return
+        self._em_andamento = False
+        if largura is not None:
+            self._exibida = 1 - self._exibida
+            memoria = self._memorias[self._exibida]
+            self._imagem = QImage(memoria.buf, largura, altura, largura * 4, QImage.Format.Format_RGBA8888)
+            self._imagem.setDevicePixelRatio(self.devicePixelRatioF())
+            titulo = self.figure.axes[0].get_title() if self.figure.axes else ""
+            METRICAS.registrar('desenho', titulo or "sem título", (time.perf_counter() - self._inicio) * 1000)
+            self.update()
+        else:
+            self._pendente = False
+        if self._pendente:
+            self.draw_idle()
+
+    def paintEvent(self, evento):
+        if self._imagem is None:
+            return
+        painter = QPainter(self)
+        painter.drawImage(self.rect(), self._imagem)
+        painter.end()
+
+    def resizeEvent(self, evento):
+        super().resizeEvent(evento)
+        self._redimensionamento.start()
+
+    def liberar(self):
+        self._fechado = True
+        self._redimensionamento.stop()
+        self._imagem = None
+        for indice in range(len(self._memorias)):
+            self._fechar_memoria(indice)
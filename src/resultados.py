@@ -0,0 +1,53 @@
+from functools import wraps
+import numpy as np
+
+SERIE = [('periodo', 'datetime64[D]'), ('receita', 'f8')]
+
+ESQUEMAS = {
+    'get_vendas_por_periodo': SERIE,
+    'get_receita_por_periodo': SERIE,
+    'get_vendas_por_dia_semana': [('dia_semana', 'i1'), ('receita', 'f8')],
+    'get_produtos_mais_vendidos': [('nome', 'O'), ('total', 'f8')],
+    'get_correlacoes': [('preco', 'f8'), ('quantidade', 'i8')],
+    'get_giro_estoque': [
+        ('id', 'i8'), ('nome', 'O'), ('estoque_atual', 'f8'), ('quantidade_vendida', 'f8'),
+        ('giro', 'f8'), ('dias_estoque', 'f8'), ('preco', 'f8')
+    ],
+    'get_analise_margem': [
+        ('id', 'i8'), ('nome', 'O'), ('categoria', 'O'), ('preco', 'f8'), ('custo', 'f8'),
+        ('margem_unit', 'f8'), ('margem_percent', 'f8'), ('quantidade', 'i8'), ('receita', 'f8'),
+        ('custo_total', 'f8'), ('lucro_total', 'f8')
+    ],
+    'get_clientes_mais_frequentes': [('id', 'i8'), ('nome', 'O'), ('num_compras', 'i8'), ('total_gasto', 'f8')],
+    'get_clientes_maior_ticket_medio': [
+        ('id', 'i8'), ('nome', 'O'), ('num_compras', 'i8'), ('total_gasto', 'f8'), ('ticket_medio', 'f8')
+    ],
+    'get_vendas_por_cliente': [
+        ('id', 'i8'), ('nome', 'O'), ('num_vendas', 'i8'), ('receita_total', 'f8'), ('ticket_medio', 'f8'),
+        ('primeira_compra', 'datetime64[s]'), ('ultima_compra', 'datetime64[s]')
+    ]
+}
+
+
+def empacotar(linhas, esquema):
+    if isinstance(linhas, np.ndarray):
+        return linhas
+    campos = [campo for campo, _ in esquema]
+    return np.array(
+        [tuple(linha[campo] for campo in campos) if isinstance(linha, dict) else tuple(linha) for linha in linhas],
+        dtype=esquema
+    )
+
+
+def _tipado(db, esquema, metodo):
+    @wraps(metodo)
+    def tipado(*args, **kwargs):
+        with db.modo_analitico():
+            return empacotar(metodo(*args, **kwargs), esquema)
+    return tipado
+
+
+def ativar_resultados_tipados(db):
+    for nome, esquema in ESQUEMAS.items():
+        setattr(db, nome, _tipado(db, esquema, getattr(db, nome)))
+    return db
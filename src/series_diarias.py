@@ -0,0 +1,85 @@
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+import numpy as np
+
+COLUNAS = ('qtd', 'receita_centavos', 'num_vendas')
+MAX_LACUNA_DIAS = 366
+
+
+def serie_densa(inicio, fim, linhas):
+    valores = np.zeros(((fim - inicio).days + 1, len(COLUNAS)), dtype=np.int64)
+    if linhas:
+        indices = np.fromiter(((dia - inicio).days for dia, *_ in linhas), dtype=np.int64, count=len(linhas))
+        valores[indices] = np.array([valores_dia for _, *valores_dia in linhas], dtype=np.int64)
+    return valores
+
+
+class SerieDiaria:
+    def __init__(self, inicio, valores):
+        self.inicio = inicio
+        self.valores = valores
+        self.valores.flags.writeable = False
+
+    @property
+    def fim(self):
+        return self.inicio + timedelta(days=len(self.valores) - 1)
+
+
+class CacheSeriesDiarias:
+    def __init__(self, buscar, max_series=32):
+        self.buscar = buscar
+        self.max_series = max_series
+        self.dias_buscados = 0
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _buscar(self, inicio, fim, categoria):
+        self.dias_buscados += (fim - inicio).days + 1
+        return serie_densa(inicio, fim, self.buscar(inicio, fim, categoria))
+
+    def obter(self, inicio, fim, categoria=None):
+        if fim < inicio:
+            return np.zeros((0, len(COLUNAS)), dtype=np.int64)
+        um_dia = timedelta(days=1)
+        with self._lock:
+            serie = self._series.get(categoria)
+            if (serie is None or inicio > serie.fim + timedelta(days=MAX_LACUNA_DIAS)
+                    or fim < serie.inicio - timedelta(days=MAX_LACUNA_DIAS)):
+                serie = SerieDiaria(inicio, self._buscar(inicio, fim, categoria))
+            elif inicio < serie.inicio or fim > serie.fim:
+                partes = []
+                if inicio < serie.inicio:
+                    partes.append(self._buscar(inicio, serie.inicio - um_dia, categoria))
+                partes.append(serie.valores)
+                if fim > serie.fim:
+                    partes.append(self._buscar(serie.fim + um_dia, fim, categoria))
+                serie = SerieDiaria(min(inicio, serie.inicio), np.concatenate(partes))
+            self._series[categoria] = serie
+            self._series.move_to_end(categoria)
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+        deslocamento = (inicio - serie.inicio).days
+        return serie.valores[deslocamento:deslocamento + (fim - inicio).days + 1]
+
+    def invalidar(self, dias):
+        if not dias:
+            return
+        with self._lock:
+            for categoria, serie in list(self._series.items()):
+                if any(serie.inicio <= dia <= serie.fim for dia in dias):
+                    del self._series[categoria]
+
+    def cortar(self, dia):
+        with self._lock:
+            for categoria, serie in list(self._series.items()):
+                if serie.fim < dia:
+                    continue
+                if serie.inicio >= dia:
+                    del self._series[categoria]
+                else:
+                    self._series[categoria] = SerieDiaria(serie.inicio, serie.valores[:(dia - serie.inicio).days])
+
+    def limpar(self):
+        with self._lock:
+            self._series.clear()
@@ -0,0 +1,29 @@
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+
+class SinaisTarefa(QObject):
+    concluida = pyqtSignal(int, object)
+    falhou = pyqtSignal(int, str)
+
+
+class TarefaConsulta(QRunnable):
+    def __init__(self, db, token, geracao, funcao, *args, contexto=None):
+        super().__init__()
+        self.db = db
+        self.token = token
+        self.geracao = geracao
+        self.funcao = funcao
+        self.args = args
+        self.contexto = contexto
+        self.sinais = SinaisTarefa()
+
+    def run(self):
+        try:
+            with self.db.cancelavel(self.token), self.db.contexto_consulta(self.contexto):
+                resultado = self.funcao(*self.args)
+        except Exception as e:
+            if not self.token.cancelado:
+                self.sinais.falhou.emit(self.geracao, str(e))
+            return
+        if not self.token.cancelado:
+            self.sinais.concluida.emit(self.geracao, resultado)